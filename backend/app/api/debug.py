@@ -0,0 +1,58 @@
+# app/api/debug.py
+"""
+Profiling and spend endpoints for the running process. Off unless DEV_MODE or
+DEBUG_ENDPOINTS is set — they expose internals and a profile blocks a worker
+thread for its whole duration.
+
+    curl 'localhost:8000/debug/profile?seconds=20' > out.folded
+    flamegraph.pl out.folded > out.svg        # or drop out.folded on speedscope.app
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from core.config import get_settings
+from core.profiler import (
+    MAX_PROFILE_SECONDS, collapsed, max_rss_bytes, memory_snapshot, sample_stacks, stop_memory_tracing,
+)
+from core.quota import daily_spend
+from services.redis_cache import cache_stats
+from services.venue_index import venue_index
+
+cfg = get_settings()
+
+def require_debug():
+    if not (cfg.DEV_MODE or cfg.DEBUG_ENDPOINTS):
+        raise HTTPException(status_code=404)  # don't advertise that it exists
+
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_debug)], include_in_schema=False)
+
+@router.get("/profile", response_class=PlainTextResponse)
+def profile(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+):
+    # Sync on purpose: it sleeps in a threadpool worker, not on the event loop
+    return collapsed(sample_stacks(seconds, interval_ms / 1000))
+
+@router.get("/memory")
+def memory(top: int = Query(25, ge=1, le=500), group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+    snapshot = memory_snapshot(top, group_by)
+    stats = cache_stats()
+    return {
+        "max_rss_bytes": max_rss_bytes(),
+        "tracemalloc": snapshot or "started; call again after some traffic",
+        "l1_cache": {k: stats[k] for k in ("l1_items", "l1_bytes", "l1_evictions")} | {"max_bytes": cfg.L1_CACHE_MB << 20},
+        "venue_index": venue_index.memory_stats(),
+    }
+
+@router.get("/quota")
+def quota(day: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$")):
+    return daily_spend(day)
+
+@router.delete("/memory")
+def stop_memory():
+    # tracemalloc roughly doubles allocation cost; switch it off when done
+    stop_memory_tracing()
+    return {"tracing": False}
@@ -1,56 +1,188 @@
-from fastapi import APIRouter
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from datetime import datetime, timezone
+from typing import List, Optional
+from core.config import get_settings
+from core.timing import note, span
+from app.responses import etag_matches, json_response, not_modified, parse_fields, project, query_etag
 from services.firestore_utils import db
-from services.redis_cache import get_or_set
-from geopy.distance import geodesic
+from services.redis_cache import get_or_set_many, geo_tag, invalidate_venue
+from services.venue_index import venue_index, INDEX_FIELDS
+from services.venue_replica import VenueReplica, dataset_version
+from services.pagination import CursorKey, StaleCursor, next_cursor, resume_after, top_k
+from services.venue_filters import VenueFilters
+from services.geo import (
+    bounding_box, coords_array, within_radius, geohash_cover, geohash_ranges, DISCOVER_RADIUS_M,
+)
 
+cfg = get_settings()
 router = APIRouter()
 
+def venue_filters(
+    category: Optional[str] = None,
+    price_level: Optional[List[int]] = Query(None),
+    min_rating: Optional[float] = None,
+    nightlife: Optional[bool] = None,
+    open_now: bool = False,
+    open_at: Optional[datetime] = None,
+) -> VenueFilters:
+    if open_now:
+        # Minute resolution, so a minute's worth of requests share ETags
+        open_at = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    return VenueFilters(
+        category=category or None,
+        price_levels=tuple(price_level or ()),
+        min_rating=min_rating,
+        nightlife=nightlife,
+        open_at=open_at,
+    )
+
+def _search_cells(lat: float, lng: float) -> List[str]:
+    """
+    Geohash cells covering the search circle. The cover's precision depends only
+    on the radius (and latitude), so nearby users land on the same cells.
+    """
+    return geohash_cover(*bounding_box(lat, lng, DISCOVER_RADIUS_M))
+
+def _cell_params(cells: List[str], category: Optional[str]) -> List[dict]:
+    return [{"cell": cell, "category": (category or "").lower()} for cell in cells]
+
+def _cell_query(collection, cell: str):
+    ((start, end),) = geohash_ranges([cell])
+    return collection.where("geohash", ">=", start).where("geohash", "<", end).select(INDEX_FIELDS)
+
+def _cell_tags(params: dict, candidates: list) -> list:
+    """A venue write anywhere in the cell evicts it."""
+    return [geo_tag(params["cell"])]
+
+def _cell_candidates(params: dict, docs) -> list:
+    keep = VenueFilters(category=params["category"] or None)
+    candidates = []
+    for doc in docs:
+        data = doc.to_dict()
+        loc = data.get("location") or {}
+        if loc.get("lat") is not None and loc.get("lng") is not None and keep.matches(data):
+            candidates.append(data | {"id": doc.id})
+    return candidates
+
+def _load_cells(params_list: List[dict]) -> List[list]:
+    with span("firestore"):
+        collection = db.collection("venues")
+        return [_cell_candidates(p, _cell_query(collection, p["cell"]).stream()) for p in params_list]
+
+def _cached_cells(lat: float, lng: float, category: Optional[str]) -> list:
+    """Candidates from every cell around the user: one MGET, one loader call for the missing cells."""
+    cells = get_or_set_many(
+        "venue_cell", _cell_params(_search_cells(lat, lng), category),
+        cfg.TILE_CACHE_TTL_HOURS, _load_cells, stale_hours=cfg.TILE_CACHE_STALE_HOURS, tags=_cell_tags,
+    )
+    return [c for cell in cells for c in cell]
+
+def _nearby(candidates: list, lat: float, lng: float) -> list:
+    # ✅ exact per-user distances from the full-precision user location
+    with span("distance"):
+        lats, lngs = coords_array((c["location"]["lat"], c["location"]["lng"]) for c in candidates)
+        pos, dists = within_radius(lat, lng, lats, lngs, DISCOVER_RADIUS_M)
+        nearby = [candidates[i] | {"distance": d} for i, d in zip(pos.tolist(), dists.tolist())]
+    note(nearby=len(nearby))
+    return nearby
+
+def _parse_cursor(cursor: Optional[str], version: int) -> Optional[CursorKey]:
+    """The key to resume after; a cursor from another dataset version can't resume safely."""
+    if not cursor:
+        return None
+    try:
+        return resume_after(cursor, version)
+    except StaleCursor:
+        raise HTTPException(status_code=409, detail="Venues changed since this cursor was issued; start from the first page")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _index_page(lat: float, lng: float, filters: VenueFilters, k: int, after: Optional[CursorKey]) -> list:
+    return venue_index.top_k(lat, lng, k, after=after, filters=filters)
+
+def _cell_page(candidates: list, lat: float, lng: float, filters: VenueFilters, k: int, after: Optional[CursorKey]) -> list:
+    # Cells are cached per category; the remaining filters apply per row
+    note(candidates=len(candidates))
+    with span("filter"):
+        candidates = [c for c in candidates if filters.matches(c)] if filters else candidates
+    nearby = _nearby(candidates, lat, lng)
+    with span("sort"):
+        return top_k(nearby, k, after=after)
+
+def _index_etag(request: Request, version: int, filters: VenueFilters):
+    """(etag, 304 response or None) for an index-served query, before any work."""
+    # open_now resolves to a different instant on every call, so it's part of the tag
+    etag = query_etag(version, request, filters.open_at or "")
+    if etag_matches(request, etag):
+        return etag, not_modified(etag, {"X-Dataset-Version": str(version)})
+    return etag, None
+
+def _finish_page(
+    request: Request, page: list, skip: int, limit: int, version: int,
+    fields: Optional[str], etag: Optional[str],
+) -> Response:
+    page = page[skip:]
+    headers = {"X-Dataset-Version": str(version)}
+    token = next_cursor(page, limit, version)
+    if token:
+        headers["X-Next-Cursor"] = token
+    with span("serialize"):
+        return json_response(request, project(page, parse_fields(fields)), headers, etag)
+
 @router.get("/venues/discover")
 def discover_venues(
+    request: Request,
     lat: float,
     lng: float,
-    category: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 20,
+    filters: VenueFilters = Depends(venue_filters),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
 ):
-    # Round for cache key stability
-    rounded_lat = round(lat, 3)
-    rounded_lng = round(lng, 3)
-
-    params = {
-        "lat": rounded_lat,
-        "lng": rounded_lng,
-        "category": category or ""
-    }
-
-    def load_from_firestore():
-        venues_ref = db.collection("venues")
-        docs = (
-            venues_ref
-            .select(["name", "location", "categories", "city"])
-            .order_by("name")
-            .stream()
-        )
-
-        user_coords = (lat, lng)  # ✅ use the full-precision user location
-        nearby = []
-
-        for doc in docs:
-            data = doc.to_dict()
-            venue_coords = data.get("location", {}).get("lat"), data.get("location", {}).get("lng")
-            if None in venue_coords:
-                continue
-            if category and category.lower() not in " ".join(data.get("categories", [])).lower():
-                continue
-            dist_meters = geodesic(user_coords, venue_coords).meters
-            if dist_meters > 48280:  # ~30 miles
-                continue
-            data["distance"] = dist_meters
-            nearby.append(data | {"id": doc.id})
-
-        nearby.sort(key=lambda v: v["distance"])
-        return nearby
-    
-    all_venues = load_from_firestore()
-    return all_venues[skip : skip + limit]
+    # Serve from the in-memory index once it's built; only visits nearby cells
+    use_index = cfg.VENUE_INDEX_ENABLED and venue_index.ready
+    version = venue_index.version if use_index else 0
+
+    # A cursor resumes after the last (distance, id) served; it supersedes skip
+    after = _parse_cursor(cursor, version)
+    if after is not None:
+        skip = 0
+
+    if use_index:
+        etag, unchanged = _index_etag(request, version, filters)
+        if unchanged:
+            return unchanged
+        page = _index_page(lat, lng, filters, skip + limit, after)
+    else:
+        # Users in the same area share the cached cells around them
+        etag = None
+        with span("tile_cache"):
+            candidates = _cached_cells(lat, lng, filters.category)
+        page = _cell_page(candidates, lat, lng, filters, skip + limit, after)
+
+    return _finish_page(request, page, skip, limit, version, fields, etag)
+
+venue_replica = VenueReplica(venue_index, db.collection("venues"))
+
+def _invalidate_changed(changes, version):
+    # Scripts invalidate what they write, but console edits and other tools don't;
+    # every worker sees the change, the first to get here clears the tags (the rest find them empty)
+    for venue_id, old, new in changes:
+        invalidate_venue(venue_id, old, new)
+
+venue_replica.subscribe(_invalidate_changed)
+
+def load_venue_index():
+    if not cfg.VENUE_INDEX_ENABLED:
+        return
+    if cfg.VENUE_REPLICA_LIVE:
+        if not venue_replica.start():
+            print("⚠️ Venue replica still loading; serving from tile cache until it lands")
+        return
+    docs = list(db.collection("venues").select(INDEX_FIELDS).stream())
+    venue_index.build(docs, dataset_version(docs))
+    print(f"📦 Venue index built with {len(venue_index)} venues (v{venue_index.version})")
+
+def stop_venue_index():
+    venue_replica.stop()
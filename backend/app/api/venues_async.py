@@ -0,0 +1,72 @@
+# app/api/venues_async.py
+"""
+Async twin of app/api/venues.py, mounted under /api/async.
+
+Experimental. On a cache miss the sync handler holds a threadpool worker for
+the whole blocking Firestore stream, while this one awaits the async
+Firestore and Redis clients. Nobody has measured whether that helps yet:
+scripts/bench_discover_load.py compares the two but has not been run against
+real Firestore or Redis. Until it has, clients stay on /api/venues/discover.
+Ranking, filtering and pagination are shared with the sync router.
+"""
+import asyncio
+from fastapi import APIRouter, Depends, Query, Request
+from typing import List, Optional
+from core.config import get_settings
+from core.timing import span
+from services.firestore_utils import async_db
+from services.redis_cache import get_or_set_many_async
+from services.venue_index import venue_index
+from services.venue_filters import VenueFilters
+from app.api.venues import (
+    venue_filters, _cell_candidates, _cell_params, _cell_query, _cell_tags, _search_cells, _parse_cursor,
+    _index_etag, _index_page, _cell_page, _finish_page,
+)
+
+cfg = get_settings()
+router = APIRouter()
+
+async def _load_cells_async(params_list: List[dict]) -> List[list]:
+    collection = async_db.collection("venues")
+
+    # Cell queries are independent; run them concurrently
+    async def run(params):
+        return _cell_candidates(params, [doc async for doc in _cell_query(collection, params["cell"]).stream()])
+
+    with span("firestore"):
+        return list(await asyncio.gather(*(run(p) for p in params_list)))
+
+@router.get("/venues/discover")
+async def discover_venues(
+    request: Request,
+    lat: float,
+    lng: float,
+    filters: VenueFilters = Depends(venue_filters),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    use_index = cfg.VENUE_INDEX_ENABLED and venue_index.ready
+    version = venue_index.version if use_index else 0
+    after = _parse_cursor(cursor, version)
+    if after is not None:
+        skip = 0
+
+    # Index lookups are pure CPU and sub-millisecond, so they run inline
+    if use_index:
+        etag, unchanged = _index_etag(request, version, filters)
+        if unchanged:
+            return unchanged
+        page = _index_page(lat, lng, filters, skip + limit, after)
+    else:
+        etag = None
+        with span("tile_cache"):
+            cells = await get_or_set_many_async(
+                "venue_cell", _cell_params(_search_cells(lat, lng), filters.category),
+                cfg.TILE_CACHE_TTL_HOURS, _load_cells_async, stale_hours=cfg.TILE_CACHE_STALE_HOURS, tags=_cell_tags,
+            )
+        candidates = [c for cell in cells for c in cell]
+        page = _cell_page(candidates, lat, lng, filters, skip + limit, after)
+
+    return _finish_page(request, page, skip, limit, version, fields, etag)
@@ -1,10 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.venues import router as venues_router
+from app.api.venues import router as venues_router, load_venue_index, stop_venue_index
+from app.api.venues_async import router as venues_async_router
 from app.api.reports import router as reports_router
+from app.api.metrics import router as metrics_router, MetricsMiddleware
+from app.api.debug import router as debug_router
+from app.responses import ORJSONResponse
+from core.timing import TimingMiddleware
+from services.redis_cache import start_invalidation_listener, stop_invalidation_listener
+from services.http_client import close_clients
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_invalidation_listener()
+    load_venue_index()
+    yield
+    stop_venue_index()
+    stop_invalidation_listener()
+    close_clients()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(venues_router, prefix="/api")
+app.include_router(venues_async_router, prefix="/api/async")
 app.include_router(reports_router, prefix="/api")
+app.include_router(metrics_router)
+app.include_router(debug_router)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TimingMiddleware)
 @app.get("/favicon.ico")
 async def favicon():
     return FileResponse("path/to/favicon.ico")
@@ -0,0 +1,128 @@
+# app/responses.py
+"""
+Optimized JSON responses for venue endpoints.
+
+orjson encoding, optional `fields=` projection, gzip/brotli negotiated from
+Accept-Encoding above a size threshold, and ETag / If-None-Match so a
+pull-to-refresh on an unchanged dataset costs a 304 instead of a payload.
+"""
+import gzip
+import hashlib
+from typing import Iterable, List, Optional
+
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional; gzip still works without it
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+ALWAYS_FIELDS = {"id", "distance"}
+
+
+def _default(obj):
+    # Firestore timestamps are datetime subclasses; anything else falls back to str
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return str(obj)
+
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+# ───────────────────  PROJECTION  ────────────────────
+def parse_fields(fields: Optional[str]) -> Optional[set]:
+    if not fields:
+        return None
+    return {f.strip() for f in fields.split(",") if f.strip()} | ALWAYS_FIELDS
+
+
+def project(items: Iterable[dict], fields: Optional[set]) -> List[dict]:
+    if fields is None:
+        return list(items)
+    return [{k: v for k, v in item.items() if k in fields} for item in items]
+
+
+# ───────────────────  ETAGS  ────────────────────
+def query_etag(version: int, request: Request, *extra) -> str:
+    """
+    Weak ETag for a query against a given dataset version, known before any work
+    is done. `extra` covers inputs that aren't in the URL, like the current time.
+    """
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    salt = "|".join(map(str, extra))
+    digest = hashlib.blake2b(f"{request.url.path}?{query}|{salt}".encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    return f'W/"b-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    # If-None-Match compares weakly: W/"x" and "x" are the same tag
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or _opaque(etag) in {_opaque(t) for t in header.split(",")}
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), "ETag": etag})
+
+
+# ───────────────────  ENCODING  ────────────────────
+def _accepts(request: Request, coding: str) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == coding:
+            return _quality(params) > 0
+    return False
+
+
+def _quality(params: str) -> float:
+    for param in params.split(";"):
+        key, _, value = param.strip().partition("=")
+        if key.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def json_response(
+    request: Request,
+    content,
+    headers: Optional[dict] = None,
+    etag: Optional[str] = None,
+) -> Response:
+    """
+    Encode `content` with orjson, tag it, and compress it if the client allows.
+    Without a precomputed ETag, one is derived from the body so 304s still work.
+    """
+    body = ORJSONResponse(content).body
+    headers = dict(headers or {})
+    headers["ETag"] = etag or body_etag(body)
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers["ETag"], headers)
+
+    headers["Vary"] = "Accept-Encoding"
+    if len(body) >= COMPRESS_MIN_BYTES:
+        if brotli is not None and _accepts(request, "br"):
+            body, headers["Content-Encoding"] = brotli.compress(body, quality=4), "br"
+        elif _accepts(request, "gzip"):
+            body, headers["Content-Encoding"] = gzip.compress(body, compresslevel=5), "gzip"
+
+    return Response(content=body, media_type="application/json", headers=headers)
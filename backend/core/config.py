@@ -7,8 +7,46 @@ class Settings(BaseSettings):
     FOURSQUARE_API_KEY: str
     APIS_ENABLED: bool = True
     CACHE_TTL_HOURS: int = 12
+    CACHE_STALE_HOURS: int = 6  # past the ttl, served stale while one worker refreshes
     DEV_MODE: bool = False
 
+    # Discover serving: in-process venue index, else shared Redis tile cache
+    VENUE_INDEX_ENABLED: bool = True
+    VENUE_REPLICA_LIVE: bool = True  # keep the index fresh via Firestore listeners
+    TILE_CACHE_TTL_HOURS: int = 6  # venue writes evict affected tiles (invalidate_venue)
+    TILE_CACHE_STALE_HOURS: int = 1  # past the ttl, served stale while one worker refreshes
+
+    # Shared Redis (cache, leases, invalidation)
+    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50
+
+    # In-process L1 in front of Redis
+    L1_CACHE_MB: int = 64
+    L1_CACHE_TTL_S: int = 30
+
+    # Cached value encoding (services/codecs.py)
+    CACHE_CODEC: str = "msgpack"          # or "json"
+    CACHE_COMPRESSION: str = "auto"       # zstd if installed, else zlib; or "none"
+    CACHE_COMPRESS_MIN_BYTES: int = 1024
+
+    # Requests slower than this are logged with their phase timings (core/timing.py)
+    SLOW_REQUEST_MS: int = 500
+
+    # /debug/profile and /debug/memory; always on in DEV_MODE
+    DEBUG_ENDPOINTS: bool = False
+
+    # Daily third-party spend (core/quota.py); 0 = unlimited
+    GOOGLE_DAILY_BUDGET_USD: float = 25.0
+    FOURSQUARE_DAILY_BUDGET_USD: float = 10.0
+    QUOTA_BATCH_SHARE: float = 0.8  # batch jobs stop here; the rest is kept for serving
+
+    # Calls per minute per provider, shared across processes (core/rate_limiter.py)
+    RATE_LIMITS_PER_MIN: dict = {"google": 600, "foursquare": 600}
+
+    # On-disk cache of place details / searches shared by scripts (services/response_cache.py)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_PATH: str = ".cache/responses.sqlite3"
+
     # --- add this ---
     INSTAGRAM_TOKEN: str | None = None
 
@@ -0,0 +1,194 @@
+# core/metrics.py
+"""
+In-process metrics with a Prometheus text exposition.
+
+Every thread records into its own shard (a plain dict reached through
+threading.local), so the hot path is a dict update with no lock and no
+contention between uvicorn's threadpool workers. A scrape walks all shards
+and sums them; shards of finished threads are kept so nothing is lost.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+
+# Seconds; covers sub-ms cache hits up to slow third-party calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REGISTRY: List["_Metric"] = []
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()  # only taken once per thread
+        REGISTRY.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot_shards(self) -> List[list]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        snaps = []
+        for shard in shards:
+            while True:
+                try:
+                    snaps.append(list(shard.items()))
+                    break
+                except RuntimeError:  # resized by its thread mid-copy; retry
+                    continue
+        return snaps
+
+    def _fmt_labels(self, values: Labels, extra: str = "") -> str:
+        pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        totals: Dict[Labels, float] = {}
+        for items in self._snapshot_shards():
+            for labels, v in items:
+                totals[labels] = totals.get(labels, 0) + v
+        return totals
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._fmt_labels(l)} {_num(v)}" for l, v in sorted(self.values().items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            # per-bucket counts (+Inf last), then sum and count
+            cell = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        cell[0][bisect.bisect_left(self.buckets, value)] += 1
+        cell[1] += value
+        cell[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def values(self) -> Dict[Labels, list]:
+        totals: Dict[Labels, list] = {}
+        for items in self._snapshot_shards():
+            for labels, (counts, total, n) in items:
+                agg = totals.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                agg[0] = [a + b for a, b in zip(agg[0], counts)]
+                agg[1] += total
+                agg[2] += n
+        return totals
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, n) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else _num(bound)
+                bucket_labels = self._fmt_labels(labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._fmt_labels(labels)} {_num(total)}")
+            lines.append(f"{self.name}_count{self._fmt_labels(labels)} {n}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _num(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) and not float(v).is_integer() else str(int(v))
+
+
+def render_prometheus() -> str:
+    out = []
+    for metric in REGISTRY:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.render())
+    return "\n".join(out) + "\n"
+
+
+# ───────────────────  METRICS  ────────────────────
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups by namespace and tier that answered (l1, l2, miss)",
+    ["namespace", "result"],
+)
+CACHE_EVENTS = Counter(
+    "cache_events_total", "Loads, refreshes, stale serves and coalesced waits by namespace",
+    ["namespace", "event"],
+)
+CACHE_LOAD_SECONDS = Histogram(
+    "cache_load_seconds", "Time spent in cache loaders by namespace", ["namespace"],
+)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Requests by route template, method and status", ["route", "method", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ["route", "method"],
+)
+
+OUTBOUND_REQUESTS = Counter(
+    "outbound_requests_total", "Third-party API calls by API and outcome (status class or error)",
+    ["api", "outcome"],
+)
+OUTBOUND_LATENCY = Histogram(
+    "outbound_request_duration_seconds", "Third-party API latency", ["api"],
+)
+
+
+class _Call:
+    status = None
+
+
+@contextmanager
+def track_outbound(api: str):
+    """
+    Time a third-party call. Set `.status` on the yielded object to record the
+    HTTP status class; an exception is recorded as "error" and re-raised.
+    """
+    call = _Call()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield call
+        outcome = f"{call.status // 100}xx" if call.status else "ok"
+    finally:
+        OUTBOUND_LATENCY.observe(time.perf_counter() - start, api)
+        OUTBOUND_REQUESTS.inc(api, outcome)
@@ -0,0 +1,87 @@
+# core/profiler.py
+"""
+Statistical sampling profiler and tracemalloc snapshots for a live process.
+
+The sampler walks sys._current_frames() every few milliseconds from its own
+thread, so nothing has to be installed in the code being profiled and the
+overhead is one stack walk per thread per tick. Stacks come out in
+Brendan Gregg's collapsed format ("thread;frame;frame… count"), which
+flamegraph.pl and speedscope read directly.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Optional
+
+MAX_PROFILE_SECONDS = 60
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+def _stack(frame) -> List[str]:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()  # root first
+    return names
+
+def sample_stacks(seconds: float, interval_s: float = 0.005) -> Counter:
+    """Collapsed stack -> number of samples, across every thread but the caller's."""
+    seconds = min(max(seconds, 0.0), MAX_PROFILE_SECONDS)
+    me = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    while True:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = names.get(ident, str(ident)).replace(";", "_").replace(" ", "_")
+            counts[";".join([thread] + _stack(frame))] += 1
+        if time.perf_counter() >= deadline:
+            return counts
+        time.sleep(interval_s)
+
+def collapsed(counts: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+# ───────────────────  MEMORY  ────────────────────
+def memory_snapshot(top: int = 25, group_by: str = "lineno") -> Optional[dict]:
+    """
+    Top allocation sites since tracing started. The first call starts
+    tracemalloc and returns None — it only sees allocations made after that.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(25)
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    )).statistics(group_by)
+    return {
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {"site": str(s.traceback[0]), "bytes": s.size, "blocks": s.count}
+            for s in stats[:top]
+        ],
+    }
+
+def stop_memory_tracing():
+    tracemalloc.stop()
+
+def max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # Linux reports KiB
@@ -0,0 +1,209 @@
+# core/quota.py
+"""
+Daily spend accounting and budgets for paid third-party APIs.
+
+Every Google / Foursquare call is charged here first, by endpoint (SKU). One
+Redis hash per day holds call counts and cost in micro-dollars for each
+endpoint and a running total per provider, so the API workers and every
+script draw down the same budget. Check-and-charge is one Lua script, so two
+processes can't both squeeze in the last call.
+
+Budgets are per provider per day. Batch jobs stop at QUOTA_BATCH_SHARE of the
+budget; the remainder is held back for calls made while serving users.
+Scripts mark themselves as batch and get a spend report by running inside
+`script_run`:
+
+    with script_run("add_hours"):
+        add_hours_to_venues(city)
+
+Days roll over at midnight Pacific, when Google resets its own quotas.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from zoneinfo import ZoneInfo
+
+import redis
+
+from core.config import get_settings
+
+cfg = get_settings()
+
+SERVING, BATCH = "serving", "batch"
+QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+DAY_KEY_TTL_S = 40 * 86400  # keep ~a billing month of history
+RUNS_KEY, RUNS_KEPT = "quota:runs", 200
+REDIS_RETRY_S = 30
+
+# List price per call in USD; check against the current price sheets
+SKU_COST_USD = {
+    "google_nearby": 0.032,
+    "google_text_search": 0.032,
+    "google_find_place": 0.017,
+    "google_details": 0.017,      # Basic; contact/atmosphere fields add on top
+    "fsq_search": 0.015,
+    "fsq_details": 0.01875,       # rating/popularity/stats are premium fields
+    "fsq_tips": 0.01875,
+}
+GOOGLE_CONTACT_FIELDS = {
+    "current_opening_hours", "formatted_phone_number", "international_phone_number",
+    "opening_hours", "secondary_opening_hours", "website",
+}
+GOOGLE_ATMOSPHERE_FIELDS = {
+    "curbside_pickup", "delivery", "dine_in", "editorial_summary", "price_level", "rating",
+    "reservable", "reviews", "serves_beer", "serves_wine", "serves_cocktails", "takeout",
+    "user_ratings_total",
+}
+GOOGLE_CONTACT_USD, GOOGLE_ATMOSPHERE_USD = 0.003, 0.005
+
+_rds = redis.Redis.from_url(cfg.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+# → new provider total in micros, or -1 if the charge would pass `limit`
+_CHARGE_LUA = """
+local provider, endpoint = ARGV[1], ARGV[2]
+local micros, limit = tonumber(ARGV[3]), tonumber(ARGV[4])
+local spent = tonumber(redis.call("HGET", KEYS[1], provider .. ":micros") or "0")
+if limit >= 0 and spent + micros > limit then
+    redis.call("HINCRBY", KEYS[1], endpoint .. ":denied", 1)
+    return -1
+end
+redis.call("HINCRBY", KEYS[1], provider .. ":micros", micros)
+redis.call("HINCRBY", KEYS[1], endpoint .. ":calls", 1)
+redis.call("HINCRBY", KEYS[1], endpoint .. ":micros", micros)
+redis.call("EXPIRE", KEYS[1], ARGV[5])
+return spent + micros
+"""
+
+
+class QuotaExceeded(Exception):
+    """The provider's daily budget (for this priority) is spent."""
+
+
+# ───────────────────  COST  ────────────────────
+def provider(endpoint: str) -> str:
+    return "google" if endpoint.startswith("google") else "foursquare"
+
+def google_details_cost(fields: Iterable[str]) -> float:
+    """Place Details is billed as Basic plus a surcharge per data tier requested."""
+    fields = set(fields)
+    cost = SKU_COST_USD["google_details"]
+    if fields & GOOGLE_CONTACT_FIELDS:
+        cost += GOOGLE_CONTACT_USD
+    if fields & GOOGLE_ATMOSPHERE_FIELDS:
+        cost += GOOGLE_ATMOSPHERE_USD
+    return cost
+
+def daily_budget_usd(name: str) -> float:
+    """0 or less means unlimited."""
+    return cfg.GOOGLE_DAILY_BUDGET_USD if name == "google" else cfg.FOURSQUARE_DAILY_BUDGET_USD
+
+def _micros(usd: float) -> int:
+    return round(usd * 1_000_000)
+
+def _day_key(day: Optional[str] = None) -> str:
+    return f"quota:{day or datetime.now(QUOTA_TZ).date().isoformat()}"
+
+
+# ───────────────────  CHARGING  ────────────────────
+_priority = SERVING
+_local: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))  # used while Redis is down
+_run: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))    # this process's spend
+_lock = threading.Lock()
+_redis_down_until = 0.0
+
+def _charge_local(key: str, name: str, endpoint: str, micros: int, limit: int) -> int:
+    with _lock:
+        day = _local[key]
+        if limit >= 0 and day[f"{name}:micros"] + micros > limit:
+            return -1
+        day[f"{name}:micros"] += micros
+        return day[f"{name}:micros"]
+
+def charge(endpoint: str, cost: Optional[float] = None, priority: Optional[str] = None):
+    """
+    Record one call to `endpoint` against today's budget before making it.
+    Raises QuotaExceeded instead if it would pass the budget for `priority`.
+    """
+    global _redis_down_until
+    name = provider(endpoint)
+    micros = _micros(SKU_COST_USD[endpoint] if cost is None else cost)
+    budget = daily_budget_usd(name)
+    if (priority or _priority) == BATCH:
+        budget *= cfg.QUOTA_BATCH_SHARE
+    limit = _micros(budget) if budget > 0 else -1
+
+    key = _day_key()
+    total = None
+    if time.monotonic() >= _redis_down_until:
+        try:
+            total = int(_rds.eval(_CHARGE_LUA, 1, key, name, endpoint, micros, limit, DAY_KEY_TTL_S))
+        except redis.RedisError as e:
+            print(f"⚠️ Quota tracking for {name} is per-process, Redis unavailable: {e}")
+            _redis_down_until = time.monotonic() + REDIS_RETRY_S
+    if total is None:
+        total = _charge_local(key, name, endpoint, micros, limit)
+
+    with _lock:
+        stats = _run[endpoint]
+        if total < 0:
+            stats["denied"] += 1
+        else:
+            stats["calls"] += 1
+            stats["micros"] += micros
+    if total < 0:
+        raise QuotaExceeded(f"{name} daily budget of ${budget:.2f} reached ({priority or _priority})")
+
+
+# ───────────────────  REPORTING  ────────────────────
+def daily_spend(day: Optional[str] = None) -> dict:
+    """Calls and USD per endpoint and per provider for a day (default today)."""
+    raw = {k.decode(): int(v) for k, v in _rds.hgetall(_day_key(day)).items()}
+    endpoints: Dict[str, dict] = {}
+    for field, value in raw.items():
+        endpoint, stat = field.rsplit(":", 1)
+        if endpoint in SKU_COST_USD:
+            entry = endpoints.setdefault(endpoint, {"calls": 0, "usd": 0.0, "denied": 0})
+            if stat == "micros":
+                entry["usd"] = value / 1_000_000
+            else:
+                entry[stat] = value
+    providers = {
+        name: {"usd": raw.get(f"{name}:micros", 0) / 1_000_000, "budget_usd": daily_budget_usd(name)}
+        for name in ("google", "foursquare")
+    }
+    return {"day": _day_key(day).split(":", 1)[1], "providers": providers, "endpoints": endpoints}
+
+def run_report() -> dict:
+    with _lock:
+        endpoints = {
+            e: {"calls": s["calls"], "usd": s["micros"] / 1_000_000, "denied": s["denied"]}
+            for e, s in _run.items()
+        }
+    return {"endpoints": endpoints, "usd": sum(e["usd"] for e in endpoints.values())}
+
+@contextmanager
+def script_run(name: str):
+    """Charge calls in this block as batch work and print what they cost."""
+    global _priority
+    previous, _priority = _priority, BATCH
+    with _lock:
+        _run.clear()
+    started = datetime.now(QUOTA_TZ)
+    try:
+        yield
+    finally:
+        _priority = previous
+        report = run_report() | {"script": name, "started": started.isoformat()}
+        print(f"\n💸 {name}: ${report['usd']:.2f} in API calls")
+        for endpoint, stats in sorted(report["endpoints"].items()):
+            denied = f", {stats['denied']} over budget" if stats["denied"] else ""
+            print(f"   • {endpoint}: {stats['calls']} calls, ${stats['usd']:.2f}{denied}")
+        try:
+            _rds.lpush(RUNS_KEY, json.dumps(report))
+            _rds.ltrim(RUNS_KEY, 0, RUNS_KEPT - 1)
+        except redis.RedisError:
+            pass  # the printed report is the one that matters
@@ -1,18 +1,163 @@
+# core/rate_limiter.py
+"""
+Per-provider token buckets shared by every API worker and script through Redis.
+
+Each provider gets CALL_LIMIT calls per WINDOW seconds, refilled continuously.
+The bucket is one Redis hash (tokens, last refill) updated by a Lua script
+against Redis's own clock, so a check is O(1) and atomic no matter how many
+processes share it. If Redis is unreachable the limiter falls back to an
+in-process bucket with the same budget and retries Redis a little later.
+
+acquire() waits for a token rather than failing, up to a timeout:
+
+    if not acquire("google", timeout=5):
+        raise RateLimited("google")
+"""
+import asyncio
+import random
+import threading
 import time
-from threading import Lock
-from collections import defaultdict
+from typing import Dict, Optional
+
+import redis
+
+from core.config import get_settings
+
+cfg = get_settings()
 
 WINDOW = 60  # seconds
 CALL_LIMIT = 90  # calls per window (leave headroom)
+LIMITS: Dict[str, int] = dict(cfg.RATE_LIMITS_PER_MIN)  # per-provider overrides of CALL_LIMIT
+
+REDIS_RETRY_S = 30  # after a Redis error, use the local bucket this long
+
+# Short socket timeout: a hung Redis must not stall every outbound call
+_rds = redis.Redis.from_url(cfg.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+# → 0 if a token was taken, else milliseconds until one will be available
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate)
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate) + 1000)
+return wait
+"""
+
+
+class RateLimited(Exception):
+    """No capacity for `api` within the caller's timeout."""
+
+
+class TokenBucket:
+    """In-process bucket; the fallback when Redis is down."""
+
+    def __init__(self, capacity: int, window_s: float):
+        self.capacity = capacity
+        self.rate = capacity / window_s  # tokens per second
+        self.tokens = float(capacity)
+        self.ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """0 if a token was taken, else seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, api: str, limit: int = CALL_LIMIT, window_s: float = WINDOW, client=None):
+        self.api = api
+        self.limit = limit
+        self.window_s = window_s
+        self.key = f"ratelimit:{api}"
+        self._client = client or _rds
+        self._local = TokenBucket(limit, window_s)
+        self._redis_down_until = 0.0
+
+    def _take(self) -> float:
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                wait_ms = self._client.eval(
+                    _TOKEN_BUCKET_LUA, 1, self.key, self.limit / (self.window_s * 1000), self.limit,
+                )
+                return int(wait_ms) / 1000
+            except redis.RedisError as e:
+                print(f"⚠️ Rate limiter for {self.api} using local budget, Redis unavailable: {e}")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_S
+        return self._local.take()
+
+    def try_acquire(self) -> bool:
+        return self._take() == 0
+
+    def _next_wait(self, deadline: Optional[float]) -> Optional[float]:
+        """0 once a token is taken, seconds to sleep before retrying, or None to give up."""
+        wait = self._take()
+        if wait == 0:
+            return 0.0
+        # jitter so waiters across processes don't all retry on the same tick
+        wait *= 1 + random.random() * 0.1
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or wait > remaining:
+                return None
+        return wait
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take a token, waiting up to `timeout` seconds (forever if None)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._next_wait(deadline)
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """acquire() without blocking the event loop while waiting (the Redis check itself is one round trip)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._next_wait(deadline)
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            await asyncio.sleep(wait)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def limiter(api_name: str) -> RateLimiter:
+    with _limiters_lock:
+        if api_name not in _limiters:
+            _limiters[api_name] = RateLimiter(api_name, LIMITS.get(api_name, CALL_LIMIT))
+        return _limiters[api_name]
+
+def acquire(api_name: str, timeout: Optional[float] = None) -> bool:
+    return limiter(api_name).acquire(timeout)
 
-_lock = Lock()
-_calls = defaultdict(list)
+async def acquire_async(api_name: str, timeout: Optional[float] = None) -> bool:
+    return await limiter(api_name).acquire_async(timeout)
 
 def is_allowed(api_name: str) -> bool:
-    now = time.time()
-    with _lock:
-        _calls[api_name] = [t for t in _calls[api_name] if now - t < WINDOW]
-        if len(_calls[api_name]) < CALL_LIMIT:
-            _calls[api_name].append(now)
-            return True
-    return False
+    """Non-blocking check; prefer acquire() so work waits instead of being dropped."""
+    return limiter(api_name).try_acquire()
@@ -0,0 +1,117 @@
+# core/timing.py
+"""
+Per-request phase timings.
+
+TimingMiddleware opens a RequestTimer for every HTTP request and parks it in a
+contextvar, so handlers and services can wrap a phase in `span("firestore")`
+or attach a count with `note(candidates=412)` without threading anything
+through their signatures. Starlette copies the context into the threadpool
+for sync endpoints, so spans recorded there land on the same timer.
+
+On the way out the phases go into a `Server-Timing` header (browser devtools
+show it next to the request), and requests slower than SLOW_REQUEST_MS are
+logged as one JSON line with their query params, spans and notes. Outside a
+request both helpers are no-ops.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from urllib.parse import parse_qsl
+
+import orjson
+
+from core.config import get_settings
+
+cfg = get_settings()
+log = logging.getLogger("clubview.slow_requests")
+
+_current: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}   # name -> seconds; repeats accumulate
+        self.notes: Dict[str, object] = {}
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={secs * 1000:.1f}" for name, secs in self.spans.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def current() -> Optional[RequestTimer]:
+    return _current.get()
+
+@contextmanager
+def span(name: str):
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+def note(**fields):
+    timer = _current.get()
+    if timer is not None:
+        timer.notes.update(fields)
+
+
+# ───────────────────  MIDDLEWARE  ────────────────────
+class TimingMiddleware:
+    """Plain ASGI, so the header can be added as the response starts."""
+
+    def __init__(self, app, slow_ms: Optional[float] = None):
+        self.app = app
+        self.slow_ms = cfg.SLOW_REQUEST_MS if slow_ms is None else slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timer = RequestTimer()
+        token = _current.set(timer)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total_ms = timer.elapsed() * 1000
+            if total_ms >= self.slow_ms:
+                log.warning(orjson.dumps(_slow_record(scope, status, total_ms, timer)).decode())
+
+
+def _slow_record(scope, status: int, total_ms: float, timer: RequestTimer) -> dict:
+    return {
+        "event": "slow_request",
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": getattr(scope.get("route"), "path", None),
+        "params": dict(parse_qsl(scope.get("query_string", b"").decode())),
+        "status": status,
+        "total_ms": round(total_ms, 1),
+        "spans_ms": {name: round(secs * 1000, 1) for name, secs in timer.spans.items()},
+        "notes": timer.notes,
+    }
@@ -1,8 +1,10 @@
 import os
 import firebase_admin
 from firebase_admin import credentials, firestore
-import requests
 from core.config import get_settings
+from core.quota import script_run
+from services.foursquare import find_fsq_id, search_params
+from services.redis_cache import invalidate_venue
 
 cfg = get_settings()
 
@@ -15,28 +17,13 @@ if not firebase_admin._apps:
 db = firestore.client()
 
 def fetch_fsq_id(name: str, lat: float, lng: float):
-    url = "https://api.foursquare.com/v3/places/search"
-    headers = {
-        "Authorization": cfg.FOURSQUARE_API_KEY,
-        "Accept": "application/json"
-    }
-    params = {
-        "query": name,
-        "ll": f"{lat},{lng}",
-        "limit": 1
-    }
-
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=20)
-        if response.status_code == 200:
-            results = response.json().get("results")
-            if results:
-                return results[0]["fsq_id"]
+        return find_fsq_id(search_params(name, lat, lng), timeout=20)
     except Exception as e:
         print(f"🔴 Foursquare search error: {e}")
     return None
 
-def add_missing_fsq_ids():
+def add_missing_fsq_ids(city: str = "Los Angeles"):
     print("🔍 Scanning venues...")
     venues_ref = db.collection("cities").document(city).collection("venues")
     docs = venues_ref.stream()
@@ -59,6 +46,7 @@ def add_missing_fsq_ids():
 
         if fsq_id:
             doc.reference.update({"foursquare_id": fsq_id})
+            invalidate_venue(doc.id, data)
             print(f"✅ Added Foursquare ID to {name}: {fsq_id}")
         else:
             print(f"⚠️ No Foursquare match found for {name}")
@@ -66,4 +54,5 @@ def add_missing_fsq_ids():
     print("✅ Done assigning Foursquare IDs.")
 
 if __name__ == "__main__":
-    add_missing_fsq_ids()
+    with script_run("add_fsq_ids"):
+        add_missing_fsq_ids()
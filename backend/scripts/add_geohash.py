@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+scripts/add_geohash.py
+Backfill the `geohash` field on every venue document, in both the flat `venues`
+collection and every `cities/*/venues` subcollection, so discover can range-query
+by neighbourhood instead of reading the whole collection.
+"""
+
+import firebase_admin
+from firebase_admin import credentials, firestore, initialize_app
+
+from services.geo import geohash_encode, GEOHASH_PRECISION
+
+# Initialize Firebase
+if not firebase_admin._apps:
+    cred = credentials.Certificate("firebase_key.json")
+    initialize_app(cred)
+db = firestore.client()
+
+BATCH_SIZE = 400  # Firestore caps a write batch at 500 operations
+
+def add_geohashes():
+    # Collection group query: flat `venues` and `cities/*/venues` share the id
+    docs = db.collection_group("venues").select(["name", "location", "geohash"]).stream()
+
+    batch, pending = db.batch(), 0
+    updated = skipped = missing = 0
+
+    for doc in docs:
+        data = doc.to_dict()
+        loc = data.get("location") or {}
+        lat, lng = loc.get("lat"), loc.get("lng")
+        if lat is None or lng is None:
+            missing += 1
+            continue
+
+        gh = geohash_encode(lat, lng, GEOHASH_PRECISION)
+        if data.get("geohash") == gh:
+            skipped += 1
+            continue
+
+        batch.update(doc.reference, {"geohash": gh})
+        pending += 1
+        updated += 1
+        print(f"📍 {data.get('name')} ({doc.reference.path}) → {gh}")
+
+        if pending >= BATCH_SIZE:
+            batch.commit()
+            batch, pending = db.batch(), 0
+
+    if pending:
+        batch.commit()
+
+    print(f"\n🏁 Done. Updated {updated}, already current {skipped}, no coordinates {missing}.")
+
+if __name__ == "__main__":
+    add_geohashes()
@@ -1,8 +1,12 @@
-import requests
+import argparse
 from core.config import get_settings
+from services.google_places import place_details
+from services.hours import hours_fields
+from services.place_details import HOURS, weekday_hours
+from services.redis_cache import invalidate_venue
+from core.quota import script_run
 from firebase_admin import credentials, firestore, initialize_app
 import firebase_admin
-import time
 
 cfg = get_settings()
 
@@ -13,26 +17,13 @@ if not firebase_admin._apps:
 db = firestore.client()
 
 def get_google_hours(place_id):
-    url = (
-        "https://maps.googleapis.com/maps/api/place/details/json"
-        f"?place_id={place_id}&fields=opening_hours"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
     try:
-        res = requests.get(url, timeout=5)
-        result = res.json().get("result", {})
-        weekday_text = result.get("opening_hours", {}).get("weekday_text")
-        if weekday_text:
-            days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            return {
-                day.lower(): text.split(": ", 1)[1]
-                for day, text in zip(days, weekday_text)
-            }
+        return weekday_hours(place_details(place_id, HOURS.fields, timeout=5) or {})
     except Exception as e:
         print(f"Google hours error for {place_id}: {e}")
     return None
 
-def add_hours_to_venues():
+def add_hours_to_venues(city: str = "Los Angeles"):
     print("\n🕒 Starting hours enrichment...")
     venues_ref = db.collection("cities").document(city).collection("venues")
     docs = list(venues_ref.stream())
@@ -49,6 +40,7 @@ def add_hours_to_venues():
         if hours:
             doc.reference.update({
                 "hours": hours,
+                **hours_fields(hours, data.get("city") or city),
                 "hours_note": firestore.DELETE_FIELD  # clear any old note
             })
             print(f"✅ Updated {data.get('name')} with hours.")
@@ -57,7 +49,43 @@ def add_hours_to_venues():
                 "hours_note": "See website for hours"
             })
             print(f"❌ No hours found for {data.get('name')} — added fallback note.")
-        time.sleep(0.1)  # rate limit safety
+        invalidate_venue(doc.id, data)
+
+def reparse_stored_hours():
+    """Recompute hours_intervals/timezone from the `hours` already on every venue."""
+    print("\n🕒 Reparsing stored hours...")
+    docs = db.collection_group("venues").select(
+        ["name", "city", "hours", "hours_intervals", "timezone", "location", "geohash"]  # location: cache tags
+    ).stream()
+
+    def commit(batch, pending):
+        batch.commit()
+        for doc_id, data in pending:
+            invalidate_venue(doc_id, data)
+
+    batch, pending, updated = db.batch(), [], 0
+    for doc in docs:
+        data = doc.to_dict()
+        fields = hours_fields(data.get("hours"), data.get("city"))
+        if all(data.get(k) == v for k, v in fields.items()):
+            continue
+        batch.update(doc.reference, fields)
+        pending.append((doc.id, data))
+        updated += 1
+        if len(pending) >= 400:  # Firestore caps a write batch at 500 operations
+            commit(batch, pending)
+            batch, pending = db.batch(), []
+    if pending:
+        commit(batch, pending)
+    print(f"🏁 Updated hours intervals on {updated} venues.")
 
 if __name__ == "__main__":
-    add_hours_to_venues()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--city", default="Los Angeles")
+    parser.add_argument("--reparse", action="store_true", help="only rebuild intervals from stored hours")
+    args = parser.parse_args()
+    if args.reparse:
+        reparse_stored_hours()
+    else:
+        with script_run("add_hours"):
+            add_hours_to_venues(args.city)
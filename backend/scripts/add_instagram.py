@@ -1,5 +1,5 @@
-import requests
 from bs4 import BeautifulSoup
+from services import http_client
 from firebase_admin import credentials, firestore, initialize_app
 import firebase_admin
 
@@ -15,7 +15,7 @@ def find_instagram_link(website_url):
         return None
 
     try:
-        res = requests.get(website_url, timeout=6, headers={"User-Agent": "Mozilla/5.0"})
+        res = http_client.get("web", website_url, timeout=6, retries=1)
         soup = BeautifulSoup(res.text, "html.parser")
         for a in soup.find_all("a", href=True):
             href = a["href"]
@@ -5,13 +5,17 @@ scripts/backfill_missing_venues.py
 Search for missing known venues by name and insert them directly into Firestore (skip validation).
 """
 
-import time, requests, firebase_admin
+import firebase_admin
 from firebase_admin import credentials, firestore, initialize_app
 from core.config import get_settings
+from core.quota import script_run
+from services.google_places import text_search
 from scripts.add_fsq_ids import fetch_fsq_id
-from scripts.add_hours import get_google_hours
 from scripts.add_instagram import find_instagram_link
 from services.foursquare import enrich_with_foursquare
+from services.firestore_utils import venue_geohash
+from services.place_details import HOURS, SUMMARY, details_updates
+from services.redis_cache import invalidate_venue
 
 cfg = get_settings()
 
@@ -23,30 +27,7 @@ db = firestore.client()
 
 # ──────── Google Places Text Search ────────
 def search_google_place(name: str, location="34.0522,-118.2437", radius=25000):
-    url = (
-        "https://maps.googleapis.com/maps/api/place/textsearch/json"
-        f"?query={requests.utils.quote(name)}"
-        f"&location={location}&radius={radius}"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
-    res = requests.get(url, timeout=10).json()
-    return res.get("results", [])[0] if res.get("results") else None
-
-def get_google_details(place_id: str):
-    url = (
-        "https://maps.googleapis.com/maps/api/place/details/json"
-        f"?place_id={place_id}&fields=website,editorial_summary"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
-    try:
-        res = requests.get(url, timeout=10).json()
-        r = res.get("result", {})
-        return {
-            "website": r.get("website"),
-            "summary": r.get("editorial_summary", {}).get("overview")
-        }
-    except:
-        return {}
+    return text_search(name, location, radius, timeout=10)
 
 # ──────── Backfill logic ────────
 def backfill_venue(name: str, city: str = "Los Angeles"):
@@ -65,6 +46,7 @@ def backfill_venue(name: str, city: str = "Los Angeles"):
         "price_level": result.get("price_level"),
         "types": result.get("types", []),
         "location": {"lat": loc.get("lat"), "lng": loc.get("lng")},
+        "geohash": venue_geohash({"location": loc}),
         "distance": 0,
         "foursquare_id": None,
         "categories": [],
@@ -93,15 +75,16 @@ def backfill_venue(name: str, city: str = "Los Angeles"):
             ref.update(enrich)
             print("   • enriched from Foursquare")
 
-    patch = get_google_details(doc["place_id"])
+    # website/summary and hours from one Details request
+    try:
+        patch = details_updates(doc, [SUMMARY, HOURS], timeout=10)
+    except Exception as e:
+        print(f"   ⚠️ Google details error: {e}")
+        patch = {}
     if patch:
         ref.update(patch)
-        print("   • added website/summary from Google")
-
-    hrs = get_google_hours(doc["place_id"])
-    if hrs:
-        ref.update({"hours": hrs})
-        print("   • added hours")
+        doc.update(patch)
+        print(f"   • added {', '.join(k for k in ('website', 'summary', 'hours') if k in patch)} from Google")
 
     if doc.get("website"):
         insta = find_instagram_link(doc["website"])
@@ -109,7 +92,7 @@ def backfill_venue(name: str, city: str = "Los Angeles"):
             ref.update({"instagram_url": insta})
             print("   • added Instagram")
 
-    time.sleep(0.3)
+    invalidate_venue(ref.id, doc)
 
 # ──────── List of known missing venues ────────
 missing_venues = [
@@ -143,4 +126,5 @@ def main():
         backfill_venue(name)
 
 if __name__ == "__main__":
-    main()
+    with script_run("backfill_missing_venues"):
+        main()
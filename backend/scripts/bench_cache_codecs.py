@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_cache_codecs.py
+Bytes stored and encode/decode time for cached venue lists under each codec
+in services/codecs.py, against the old json.dumps text entries, using the
+real venue rows in full_venues_export.csv.
+
+    python -m scripts.bench_cache_codecs
+"""
+
+import csv, json, os, time
+
+from services.codecs import Codec, zstandard
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "full_venues_export.csv")
+SIZES = [20, 100, None]  # one discover page, a busy tile, the whole export
+
+class LegacyJSON:
+    """What redis_cache stored before codecs: json.dumps text."""
+    def encode(self, obj):
+        text = json.dumps(obj)
+        return text, len(text)
+
+CODECS = {
+    "json text (old)": LegacyJSON(),
+    "json+zlib": Codec("json", "zlib"),
+    "msgpack": Codec("msgpack", "none"),
+    "msgpack+zlib": Codec("msgpack", "zlib"),
+}
+if zstandard is not None:
+    CODECS["msgpack+zstd"] = Codec("msgpack", "zstd")
+
+def load_rows():
+    with open(CSV_PATH, newline="", encoding="utf-8") as f:
+        rows = []
+        for row in csv.DictReader(f):
+            venue = {k: v for k, v in row.items() if v not in ("", None)}
+            if "lat" in venue and "lng" in venue:
+                venue["location"] = {"lat": float(venue.pop("lat")), "lng": float(venue.pop("lng"))}
+            for num in ("rating", "price_level", "popularity", "distance"):
+                if num in venue:
+                    venue[num] = float(venue[num])
+            rows.append(venue)
+        return rows
+
+def timed(fn, *args, runs=20) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000  # ms
+
+def main():
+    rows = load_rows()
+    print(f"📦 Loaded {len(rows)} venues from CSV")
+
+    for size in SIZES:
+        payload = rows[:size] if size else rows
+        print(f"\n{len(payload)} venues")
+        print(f"{'codec':>16} {'bytes':>9} {'vs json':>8} {'encode ms':>10} {'decode ms':>10}")
+        baseline = None
+        for name, codec in CODECS.items():
+            data, _ = codec.encode(payload)
+            assert Codec.decode(data)[0] == payload
+            baseline = baseline or len(data)
+            enc = timed(codec.encode, payload)
+            dec = timed(Codec.decode, data)
+            print(f"{name:>16} {len(data):>9} {len(data) / baseline:>7.0%} {enc:>10.3f} {dec:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_discover_load.py
+Load comparison of the sync (/api/venues/discover) and async
+(/api/async/venues/discover) discover handlers against a running server.
+
+Start a single worker first, with the in-memory index off so both handlers
+actually wait on Redis/Firestore:
+
+    VENUE_INDEX_ENABLED=false uvicorn app.main:app --workers 1
+    python -m scripts.bench_discover_load --concurrency 200 --requests 2000
+
+Requires httpx. No results are recorded yet; the async router stays
+experimental until this has been run against real Firestore and Redis.
+"""
+
+import argparse, asyncio, random, statistics, time
+
+import httpx
+
+PATHS = {
+    "sync": "/api/venues/discover",
+    "async": "/api/async/venues/discover",
+}
+
+async def run(client: httpx.AsyncClient, path: str, total: int, concurrency: int, spread: float):
+    sem = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    rnd = random.Random(0)
+
+    async def one():
+        nonlocal errors
+        params = {
+            "lat": 34.0983 + rnd.uniform(-spread, spread),   # Hollywood / WeHo
+            "lng": -118.3452 + rnd.uniform(-spread, spread),
+            "limit": 20,
+        }
+        async with sem:
+            start = time.perf_counter()
+            try:
+                res = await client.get(path, params=params)
+                if res.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start, latencies, errors
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--spread", type=float, default=0.05, help="± degrees around Hollywood")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        print(f"🚦 {args.requests} requests @ concurrency {args.concurrency} → {args.base_url}\n")
+        print(f"{'handler':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for name, path in PATHS.items():
+            await client.get(path, params={"lat": 34.0983, "lng": -118.3452})  # warm up
+            elapsed, lat, errors = await run(client, path, args.requests, args.concurrency, args.spread)
+            print(
+                f"{name:>8} {args.requests / elapsed:>8.0f} {statistics.median(lat):>8.1f} "
+                f"{pct(lat, 95):>8.1f} {pct(lat, 99):>8.1f} {errors:>7}"
+            )
+
+if __name__ == "__main__":
+    asyncio.run(main())
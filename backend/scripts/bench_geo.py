@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_geo.py
+Benchmark the old per-row geopy loop against the batched NumPy radius filter
+in services/geo.py, on real venue coordinates from full_venues_export.csv
+(replicated with jitter to simulate more cities' worth of candidates).
+"""
+
+import csv, os, random, time
+
+from geopy.distance import geodesic
+
+from services.geo import coords_array, haversine_m, within_radius, DISCOVER_RADIUS_M
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "full_venues_export.csv")
+USER = (34.0983, -118.3452)  # Hollywood
+REPEATS = [1, 10, 100]
+
+def load_points():
+    with open(CSV_PATH, newline="", encoding="utf-8") as f:
+        return [
+            (float(row["lat"]), float(row["lng"]))
+            for row in csv.DictReader(f)
+            if row.get("lat") and row.get("lng")
+        ]
+
+def geopy_loop(points):
+    return [i for i, p in enumerate(points) if geodesic(USER, p).meters <= DISCOVER_RADIUS_M]
+
+def haversine_loop(points):
+    return [i for i, p in enumerate(points) if haversine_m(*USER, *p) <= DISCOVER_RADIUS_M]
+
+def numpy_batch(lats, lngs):
+    pos, _ = within_radius(*USER, lats, lngs, DISCOVER_RADIUS_M)
+    return pos
+
+def timed(fn, *args, runs=3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000  # ms
+
+def main():
+    base = load_points()
+    rnd = random.Random(0)
+    print(f"📦 Loaded {len(base)} venue coordinates from CSV\n")
+    print(f"{'rows':>8} {'geopy ms':>10} {'haversine ms':>13} {'numpy ms':>9} {'vs geopy':>9}")
+
+    for rep in REPEATS:
+        points = [(lat + rnd.uniform(-0.2, 0.2), lng + rnd.uniform(-0.2, 0.2)) for lat, lng in base * rep]
+        lats, lngs = coords_array(points)
+
+        geo_ms = timed(geopy_loop, points, runs=1)
+        hav_ms = timed(haversine_loop, points)
+        np_ms = timed(numpy_batch, lats, lngs)
+        print(f"{len(points):>8} {geo_ms:>10.2f} {hav_ms:>13.2f} {np_ms:>9.3f} {geo_ms / np_ms:>8.0f}x")
+
+if __name__ == "__main__":
+    main()
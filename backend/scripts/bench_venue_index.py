@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_venue_index.py
+Compare per-query cost of the in-memory venue index against a full linear scan
+as the collection grows. The collection grows by adding cities (each about the
+size of our LA set) rather than densifying LA, which is how real growth looks.
+Uses synthetic venues, so no Firebase credentials are needed.
+"""
+
+import random, time
+from types import SimpleNamespace
+
+from services.venue_index import VenueIndex
+from services.geo import haversine_m, DISCOVER_RADIUS_M
+
+LA = (34.0522, -118.2437)
+VENUES_PER_CITY = 400
+SIZES = [400, 4_000, 40_000]
+QUERIES = 200
+
+def synthetic_docs(n: int):
+    rnd = random.Random(n)
+    # LA first, then made-up metros scattered across the continental US
+    metros = [LA] + [
+        (rnd.uniform(26, 48), rnd.uniform(-122, -72))
+        for _ in range(n // VENUES_PER_CITY - 1)
+    ]
+    docs = []
+    for i in range(n):
+        lat, lng = metros[i % len(metros)]
+        data = {
+            "name": f"Venue {i}",
+            "location": {"lat": lat + rnd.uniform(-0.3, 0.3), "lng": lng + rnd.uniform(-0.3, 0.3)},
+            "categories": [rnd.choice(["Bar", "Nightclub", "Lounge", "Pub"])],
+            "city": "Synthetic",
+        }
+        docs.append(SimpleNamespace(id=f"v{i}", to_dict=lambda d=data: d))
+    return docs
+
+def linear_scan(docs, lat, lng):
+    nearby = []
+    for doc in docs:
+        data = doc.to_dict()
+        dist = haversine_m(lat, lng, data["location"]["lat"], data["location"]["lng"])
+        if dist <= DISCOVER_RADIUS_M:
+            nearby.append(data | {"id": doc.id, "distance": dist})
+    nearby.sort(key=lambda v: v["distance"])
+    return nearby
+
+def timed(fn, points) -> float:
+    start = time.perf_counter()
+    for lat, lng in points:
+        fn(lat, lng)
+    return (time.perf_counter() - start) / len(points) * 1e6  # µs per query
+
+def main():
+    rnd = random.Random(0)
+    # Hollywood / WeHo area
+    points = [(34.09 + rnd.uniform(-0.05, 0.05), -118.34 + rnd.uniform(-0.05, 0.05)) for _ in range(QUERIES)]
+
+    print(f"{'venues':>8} {'scan µs/q':>12} {'index µs/q':>12} {'speedup':>8}")
+    for n in SIZES:
+        docs = synthetic_docs(n)
+        index = VenueIndex()
+        index.build(docs)
+
+        # Both paths must agree on what's nearby
+        lat, lng = points[0]
+        assert [v["id"] for v in index.query(lat, lng)] == [v["id"] for v in linear_scan(docs, lat, lng)]
+
+        scan_us = timed(lambda lat, lng: linear_scan(docs, lat, lng), points)
+        index_us = timed(lambda lat, lng: index.query(lat, lng), points)
+        print(f"{n:>8} {scan_us:>12.1f} {index_us:>12.1f} {scan_us / index_us:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,31 @@
-import requests
-import time
+"""
+scripts/enrich_all_venues.py
+Enrich every venue in a city with Foursquare details/tips and Google website/summary.
+
+Venues are enriched concurrently (services/enrichment.py): each provider has
+its own in-flight cap and shares the cross-process rate limits and daily
+quota, and Firestore writes go out in batches as results arrive. Lookups go
+through the on-disk response cache, so a re-run only pays for what changed.
+"""
+import argparse
+import asyncio
 import firebase_admin
 from typing import Optional
 from firebase_admin import credentials, firestore, initialize_app
 from core.config import get_settings
+from core.quota import QuotaExceeded, script_run
+from core.rate_limiter import RateLimited
+from services import foursquare, http_client
+from services.enrichment import BatchWriter, ProviderGates, map_unordered
+from services.google_places import aplace_details
+from services.http_client import UpstreamError
+from services.place_details import SUMMARY, website_and_summary
 
 cfg = get_settings()
 
+VENUE_CONCURRENCY = 24
+
+
 # ─── Firebase Setup ─────────────────────────────────────────
 if not firebase_admin._apps:
     cred = credentials.Certificate("firebase_key.json")
@@ -15,20 +34,10 @@ if not firebase_admin._apps:
 db = firestore.client()
 
 # ─── Google Enrichment ──────────────────────────────────────
-def get_google_website_and_summary(place_id: str) -> dict:
-    url = (
-        "https://maps.googleapis.com/maps/api/place/details/json"
-        f"?place_id={place_id}&fields=website,editorial_summary"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
+async def get_google_website_and_summary(gates: ProviderGates, place_id: str) -> dict:
     try:
-        res = requests.get(url, timeout=5)
-        result = res.json().get("result", {})
-        return {
-            "website": result.get("website"),
-            "summary": result.get("editorial_summary", {}).get("overview")
-        }
-    except Exception as e:
+        return website_and_summary(await aplace_details(gates, place_id, SUMMARY.fields, timeout=5) or {})
+    except (UpstreamError, RateLimited) as e:
         print(f"❌ Google details error: {e}")
         return {}
 
@@ -44,126 +53,116 @@ def generate_fallback_summary(categories):
     return "A nightlife venue in downtown LA."
 
 # ─── Foursquare Search (for missing fsq_id) ─────────────────
-def search_foursquare(name: str, lat: Optional[float] = None, lng: Optional[float] = None) -> Optional[str]:
-    url = "https://api.foursquare.com/v3/places/search"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": cfg.FOURSQUARE_API_KEY,
-    }
-
-    params = {
-        "query": name,
-        "near": "Los Angeles",
-        "limit": 1,
-    }
-
-    if lat and lng:
-        params["ll"] = f"{lat},{lng}"
-
+async def search_foursquare(
+    gates: ProviderGates, name: str, lat: Optional[float] = None, lng: Optional[float] = None,
+) -> Optional[str]:
+    params = foursquare.search_params(name, lat, lng, near="Los Angeles")
     try:
-        res = requests.get(url, headers=headers, params=params, timeout=5)
-        res.raise_for_status()
-        data = res.json()
-        results = data.get("results")
-        if results and isinstance(results, list):
-            return results[0].get("fsq_id")
-    except Exception as e:
+        return await foursquare.afind_fsq_id(gates, params, timeout=5)
+    except (UpstreamError, RateLimited) as e:
         print(f"❌ Foursquare search error for '{name}': {e}")
 
     return None
 
 # ─── Foursquare Enrichment ──────────────────────────────────
-def enrich_with_foursquare(fsq_id: str) -> dict:
-    base_url = f"https://api.foursquare.com/v3/places/{fsq_id}"
-    tips_url = f"{base_url}/tips"
-
-    headers = {
-        "Accept": "application/json",
-        "Authorization": cfg.FOURSQUARE_API_KEY,
-    }
-
+async def foursquare_details(gates: ProviderGates, fsq_id: str) -> dict:
     enrichment = {}
-
     try:
-        res = requests.get(base_url, headers=headers, timeout=5)
-        res.raise_for_status()
-        data = res.json()
+        data = await foursquare.aplace_details(gates, fsq_id, timeout=5)
+        if data is None:
+            return enrichment
 
         enrichment["website"] = data.get("website")
-        enrichment["categories"] = [cat["name"] for cat in data.get("categories", [])]
+        enrichment["categories"] = [cat["name"] for cat in data.get("categories") or []]
         enrichment["rating"] = data.get("rating")
         enrichment["popularity"] = data.get("popularity")
 
-        stats = data.get("stats", {})
+        stats = data.get("stats") or {}
         if "totalLikes" in stats:
             enrichment["likes"] = stats["totalLikes"]
-    except Exception as e:
+    except (UpstreamError, RateLimited) as e:
         print(f"❌ Foursquare details error for {fsq_id}: {e}")
+    return enrichment
 
+async def foursquare_tips(gates: ProviderGates, fsq_id: str) -> list:
     try:
-        tips_res = requests.get(tips_url, headers=headers, timeout=5)
-        tips_res.raise_for_status()
-        tips_data = tips_res.json()
-
-        if isinstance(tips_data, list):
-            tips = [t["text"] for t in tips_data if "text" in t]
-        else:
-            tips = [t["text"] for t in tips_data.get("tips", []) if "text" in t]
-
-        if tips:
-            enrichment["tips"] = tips[:3]
-    except Exception as e:
+        tips = await foursquare.atips(gates, fsq_id, timeout=5)
+    except (UpstreamError, RateLimited) as e:
         print(f"❌ Foursquare tips error for {fsq_id}: {e}")
-
-    return enrichment
+        return []
+    return tips[:3]
+
+# ─── Per-venue Enrichment ───────────────────────────────────
+async def enrich_venue(gates: ProviderGates, data: dict) -> Optional[dict]:
+    """The fields to write for one venue, or None to skip it."""
+    name = data.get("name")
+    fsq_id = data.get("foursquare_id")
+    found = {}
+
+    # Search Foursquare if ID is missing
+    if not fsq_id:
+        loc = data.get("location", {})
+        fsq_id = await search_foursquare(gates, name, loc.get("lat"), loc.get("lng"))
+        if not fsq_id:
+            print(f"🚫 Skipping {name} — no Foursquare match found.")
+            return None
+        found["foursquare_id"] = fsq_id
+        print(f"📌 Found Foursquare ID for {name}: {fsq_id}")
+
+    # Details, tips and Google are independent of each other
+    place_id = data.get("place_id")
+    enriched, tips, google_data = await asyncio.gather(
+        foursquare_details(gates, fsq_id),
+        foursquare_tips(gates, fsq_id),
+        get_google_website_and_summary(gates, place_id) if place_id else asyncio.sleep(0, {}),
+    )
+    if tips:
+        enriched["tips"] = tips
+    if not enriched.get("website") and google_data.get("website"):
+        enriched["website"] = google_data["website"]
+    if not enriched.get("summary") and google_data.get("summary"):
+        enriched["summary"] = google_data["summary"]
+
+    if not enriched.get("summary"):
+        enriched["summary"] = generate_fallback_summary(
+            enriched.get("categories") or data.get("categories", [])
+        )
+    return found | enriched
 
 # ─── Main Enrichment Routine ────────────────────────────────
-def enrich_all_venues(city: str = "Los Angeles"):
+async def enrich_all_venues_async(city: str = "Los Angeles", concurrency: int = VENUE_CONCURRENCY):
     print("🔍 Script started...")
     venues_ref = db.collection("cities").document(city).collection("venues")
-    docs = list(venues_ref.stream())
+    docs = await asyncio.to_thread(lambda: list(venues_ref.stream()))
     print(f"📦 Found {len(docs)} venues.")
 
-    for doc in docs:
-        data = doc.to_dict()
-        name = data.get("name")
-        fsq_id = data.get("foursquare_id")
-
-        # Search Foursquare if ID is missing
-        if not fsq_id:
-            print(f"🔎 Searching for {name}...")
-            lat = data.get("location", {}).get("lat")
-            lng = data.get("location", {}).get("lng")
-            fsq_id = search_foursquare(name, lat, lng)
-
-            if fsq_id:
-                doc.reference.update({"foursquare_id": fsq_id})
-                print(f"📌 Found Foursquare ID for {name}: {fsq_id}")
-            else:
-                print(f"🚫 Skipping {name} — no Foursquare match found.")
-                continue
-
-        enriched = enrich_with_foursquare(fsq_id)
-
-        if data.get("place_id"):
-            google_data = get_google_website_and_summary(data["place_id"])
-            if not enriched.get("website") and google_data.get("website"):
-                enriched["website"] = google_data["website"]
-            if not enriched.get("summary") and google_data.get("summary"):
-                enriched["summary"] = google_data["summary"]
-
-        if not enriched.get("summary"):
-            enriched["summary"] = generate_fallback_summary(
-                enriched.get("categories") or data.get("categories", [])
-            )
-
-        if enriched:
-            doc.reference.update(enriched)
-            print(f"✅ Updated {name} with: {list(enriched.keys())}")
-            time.sleep(0.2)  # Optional rate limit
-        else:
-            print(f"⚠️  No enrichment data for {name}.")
+    gates = ProviderGates()
+    writer = BatchWriter(db)
+    failed = 0
+    try:
+        async for doc, result in map_unordered(lambda d: enrich_venue(gates, d.to_dict()), docs, concurrency):
+            name = doc.to_dict().get("name")
+            if isinstance(result, QuotaExceeded):
+                raise result  # budget gone; stop the pass, keep what's done
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"⚠️  {name} failed: {result}")
+            elif result:
+                await writer.add(doc, doc.to_dict(), result)
+                print(f"✅ Enriched {name} with: {list(result.keys())}")
+    finally:
+        await writer.flush()
+        await http_client.aclose_clients()
+        print(f"🏁 Updated {writer.written} venues ({failed} failed).")
+
+def enrich_all_venues(city: str = "Los Angeles", concurrency: int = VENUE_CONCURRENCY):
+    asyncio.run(enrich_all_venues_async(city, concurrency))
 
 # ─── Entry Point ────────────────────────────────────────────
 if __name__ == "__main__":
-    enrich_all_venues("Los Angeles")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--city", default="Los Angeles")
+    parser.add_argument("--concurrency", type=int, default=VENUE_CONCURRENCY)
+    args = parser.parse_args()
+    with script_run("enrich_all_venues"):
+        enrich_all_venues(args.city, args.concurrency)
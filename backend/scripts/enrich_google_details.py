@@ -0,0 +1,71 @@
+"""
+scripts/enrich_google_details.py
+Fill every Google-sourced field a venue is missing — website/summary, hours,
+price level, address/location/types/rating — with one Place Details request
+per venue.
+
+Each venue asks Google only for the union of the fields its missing steps
+read (services/place_details.py), instead of one request per step as
+add_hours / enrich_price_level / enrich_google_fields each make on their own.
+
+    python -m scripts.enrich_google_details --city "Los Angeles" --steps hours,price_level
+"""
+import argparse
+import asyncio
+import firebase_admin
+from firebase_admin import credentials, firestore, initialize_app
+from core.quota import QuotaExceeded, script_run
+from services import http_client
+from services.enrichment import BatchWriter, ProviderGates
+from services.place_details import STEPS, fetch_batch
+
+VENUE_CONCURRENCY = 16
+
+# ─── Firebase Setup ─────────────────────────────────────────
+if not firebase_admin._apps:
+    cred = credentials.Certificate("firebase_key.json")
+    initialize_app(cred)
+
+db = firestore.client()
+
+async def enrich_google_details_async(city: str = "Los Angeles", steps=tuple(STEPS), concurrency: int = VENUE_CONCURRENCY):
+    venues_ref = db.collection("cities").document(city).collection("venues")
+    docs = await asyncio.to_thread(lambda: list(venues_ref.stream()))
+    print(f"📦 Found {len(docs)} venues; steps: {', '.join(steps)}")
+
+    gates = ProviderGates()
+    writer = BatchWriter(db)
+    failed = 0
+    batch = fetch_batch(gates, docs, lambda d: {"city": city} | d.to_dict(), [STEPS[s] for s in steps], concurrency)
+    try:
+        async for doc, updates in batch:
+            name = doc.to_dict().get("name")
+            if isinstance(updates, QuotaExceeded):
+                raise updates  # budget gone; stop the pass, keep what's done
+            if isinstance(updates, Exception):
+                failed += 1
+                print(f"⚠️  {name} failed: {updates}")
+            elif updates:
+                await writer.add(doc, doc.to_dict(), updates)
+                print(f"✅ {name}: {list(updates.keys())}")
+    finally:
+        await batch.aclose()  # cancel in-flight requests if we stopped early
+        await writer.flush()
+        await http_client.aclose_clients()
+        print(f"🏁 Updated {writer.written} venues ({failed} failed).")
+
+def enrich_google_details(city: str = "Los Angeles", steps=tuple(STEPS), concurrency: int = VENUE_CONCURRENCY):
+    asyncio.run(enrich_google_details_async(city, steps, concurrency))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--city", default="Los Angeles")
+    parser.add_argument("--steps", default=",".join(STEPS), help=f"comma-separated subset of {', '.join(STEPS)}")
+    parser.add_argument("--concurrency", type=int, default=VENUE_CONCURRENCY)
+    args = parser.parse_args()
+    steps = [s.strip() for s in args.steps.split(",") if s.strip()]
+    unknown = set(steps) - set(STEPS)
+    if unknown:
+        parser.error(f"unknown steps: {', '.join(sorted(unknown))}")
+    with script_run("enrich_google_details"):
+        enrich_google_details(args.city, steps, args.concurrency)
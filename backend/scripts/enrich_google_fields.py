@@ -1,9 +1,12 @@
-import requests
-import time
 import firebase_admin
 from bs4 import BeautifulSoup
 from firebase_admin import credentials, firestore, initialize_app
 from core.config import get_settings
+from core.quota import script_run
+from services import http_client
+from services.google_places import find_place_id, place_details
+from services.place_details import CORE_FIELDS, core_fields
+from services.redis_cache import invalidate_venue
 
 cfg = get_settings()
 
@@ -19,7 +22,7 @@ def find_instagram_link(website_url):
     if not website_url:
         return None
     try:
-        res = requests.get(website_url, timeout=6, headers={"User-Agent": "Mozilla/5.0"})
+        res = http_client.get("web", website_url, timeout=6, retries=1)
         soup = BeautifulSoup(res.text, "html.parser")
         for a in soup.find_all("a", href=True):
             href = a["href"]
@@ -31,40 +34,18 @@ def find_instagram_link(website_url):
 
 # ─── Google Place Search + Details ────────────────
 def search_google_place_id(name, city):
-    query = f"{name}, {city}"
-    url = (
-        f"https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
-        f"?input={requests.utils.quote(query)}&inputtype=textquery&fields=place_id"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
     try:
-        res = requests.get(url, timeout=6).json()
-        candidates = res.get("candidates")
-        if candidates:
-            return candidates[0].get("place_id")
+        return find_place_id(f"{name}, {city}", timeout=6)
     except Exception as e:
         print(f"❌ Google Place search error for {name}: {e}")
     return None
 
 def get_google_details(place_id):
-    url = (
-        f"https://maps.googleapis.com/maps/api/place/details/json"
-        f"?place_id={place_id}&fields=formatted_address,geometry,types,website,rating,price_level,name"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
     try:
-        res = requests.get(url, timeout=6).json()
-        result = res.get("result", {})
-        return {
-            "address": result.get("formatted_address"),
-            "lat": result.get("geometry", {}).get("location", {}).get("lat"),
-            "lng": result.get("geometry", {}).get("location", {}).get("lng"),
-            "types": result.get("types"),
-            "website": result.get("website"),
-            "rating": result.get("rating"),
-            "price_level": result.get("price_level"),
-            "place_id": place_id
-        }
+        result = place_details(place_id, CORE_FIELDS.fields, timeout=6)
+        if result is None:
+            return {}
+        return {**core_fields(result), "place_id": place_id}
     except Exception as e:
         print(f"❌ Google Details error for {place_id}: {e}")
         return {}
@@ -99,6 +80,7 @@ def enrich_google_fields(city="Los Angeles"):
         details = get_google_details(place_id)
         if details:
             doc.reference.update(details)
+            invalidate_venue(doc.id, data)
             print(f"📍 Updated {name} with Google fields.")
 
         # 📸 Enrich Instagram if missing
@@ -106,10 +88,10 @@ def enrich_google_fields(city="Los Angeles"):
             insta = find_instagram_link(details["website"])
             if insta:
                 doc.reference.update({"instagram_url": insta})
+                invalidate_venue(doc.id, data)
                 print(f"📸 Added Instagram for {name} → {insta}")
 
-        time.sleep(0.2)  # Optional rate limit
-
 # ─── Entry Point ─────────────────────────────
 if __name__ == "__main__":
-    enrich_google_fields("Los Angeles")
\ No newline at end of file
+    with script_run("enrich_google_fields"):
+        enrich_google_fields("Los Angeles")
\ No newline at end of file
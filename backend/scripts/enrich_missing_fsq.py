@@ -1,9 +1,11 @@
-import time
 import firebase_admin
 from firebase_admin import credentials, firestore, initialize_app
 from core.config import get_settings
+from core.quota import script_run
 from services.foursquare import enrich_with_foursquare
 from scripts.add_hours import get_google_hours
+from services.hours import hours_fields
+from services.redis_cache import invalidate_venue
 from scripts.add_fsq_ids import fetch_fsq_id
 from services.instagram import find_instagram_link
 
@@ -71,6 +73,7 @@ def enrich_venue_data():
                 hrs = get_google_hours(place_id)
                 if hrs:
                     updates["hours"] = hrs
+                    updates.update(hours_fields(hrs, data.get("city")))
                     print(f"   • Hours added for {name}")
 
         # Add Instagram if missing
@@ -83,11 +86,11 @@ def enrich_venue_data():
         # Save to Firestore
         if updates:
             doc.reference.update(updates)
+            invalidate_venue(doc.id, data)
             print(f"✅ Updated {name} with: {list(updates.keys())}")
         else:
             print(f"⏭️  Skipped {name} — no updates needed.")
 
-        time.sleep(0.2)
-
 if __name__ == "__main__":
-    enrich_venue_data()
\ No newline at end of file
+    with script_run("enrich_missing_fsq"):
+        enrich_venue_data()
\ No newline at end of file
@@ -1,7 +1,10 @@
 import firebase_admin
-import requests
 from firebase_admin import credentials, firestore, initialize_app
 from core.config import get_settings
+from core.quota import script_run
+from services.google_places import place_details
+from services.place_details import PRICE_LEVEL
+from services.redis_cache import invalidate_venue
 
 cfg = get_settings()
 
@@ -14,14 +17,8 @@ db = firestore.client()
 
 # ─── Google Price Level Fetch ───────────────────────────────
 def fetch_price_level(place_id: str) -> int:
-    url = (
-        "https://maps.googleapis.com/maps/api/place/details/json"
-        f"?place_id={place_id}&fields=price_level"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
     try:
-        res = requests.get(url, timeout=5).json()
-        return res.get("result", {}).get("price_level")
+        return (place_details(place_id, PRICE_LEVEL.fields, timeout=5) or {}).get("price_level")
     except Exception as e:
         print(f"❌ Error fetching price level for {place_id}: {e}")
         return None
@@ -55,6 +52,7 @@ def enrich_missing_price_levels(city: str = "Los Angeles"):
 
         if fetched is not None:
             doc.reference.update({"price_level": fetched})
+            invalidate_venue(doc.id, data)
             print(f"✅ Updated {data.get('name')} with price_level: {fetched}")
             updated += 1
 
@@ -62,4 +60,5 @@ def enrich_missing_price_levels(city: str = "Los Angeles"):
 
 # ─── Entry Point ────────────────────────────────────────────
 if __name__ == "__main__":
-    enrich_missing_price_levels("Los Angeles")
+    with script_run("enrich_price_level"):
+        enrich_missing_price_levels("Los Angeles")
@@ -4,43 +4,28 @@ scripts/fetch_and_enrich_nearby.py
 Fetch Google venues and enrich with Foursquare, only storing validated nightlife spots.
 """
 
-import argparse, time, requests, firebase_admin
+import argparse, time, firebase_admin
 from datetime import datetime, timedelta, UTC
-from math import radians, sin, cos, sqrt, atan2
 from typing import Dict, Any
 from firebase_admin import credentials, firestore, initialize_app
 
 from core.config import get_settings
+from core.quota import charge, script_run
+from services import http_client
 from scripts.add_fsq_ids import fetch_fsq_id
-from scripts.add_hours import get_google_hours
 from scripts.add_instagram import find_instagram_link
 from services.foursquare import enrich_with_foursquare
+from services.google_places import take_token
+from services.geo import haversine_m, geohash_encode, GEOHASH_PRECISION
+from services.place_details import HOURS, SUMMARY, details_updates
+from services.redis_cache import invalidate_venue
 from services.venue_validation import validate_venue
 
 cfg = get_settings()
 
 # ──────────────────────── Helpers ─────────────────────────
 def distance_m(lat1, lng1, lat2, lng2):
-    R = 6_371_000
-    dlat, dlng = radians(lat2 - lat1), radians(lng2 - lng1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlng / 2) ** 2
-    return int(2 * R * atan2(sqrt(a), sqrt(1 - a)))
-
-def get_google_details(place_id: str) -> Dict[str, Any]:
-    url = (
-        "https://maps.googleapis.com/maps/api/place/details/json"
-        f"?place_id={place_id}&fields=website,editorial_summary"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
-    try:
-        res = requests.get(url, timeout=10).json()
-        r = res.get("result", {})
-        return {
-            "website": r.get("website"),
-            "summary": r.get("editorial_summary", {}).get("overview")
-        }
-    except Exception:
-        return {}
+    return int(haversine_m(lat1, lng1, lat2, lng2))
 
 # ──────────────────────── Firestore ─────────────────────────
 if not firebase_admin._apps:
@@ -50,19 +35,19 @@ db = firestore.client()
 
 # ───────────────────── Google Places API ─────────────────────
 def fetch_google_nearby(lat: float, lng: float, radius: int = 3000, limit: int = 60):
-    url = (
-        "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-        f"?location={lat},{lng}&radius={radius}&type=bar|night_club"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
+    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    params = {"location": f"{lat},{lng}", "radius": radius, "type": "bar|night_club", "key": cfg.GOOGLE_KEY}
     results, token = [], None
     while len(results) < limit:
-        res = requests.get(url + (f"&pagetoken={token}" if token else ""), timeout=10).json()
+        take_token()  # the shared Google bucket; each page is a request
+        charge("google_nearby")  # and is billed as one
+        page = {"pagetoken": token} if token else {}
+        res = http_client.get_json("google", url, params=params | page, timeout=10)
         results.extend(res.get("results", []))
         token = res.get("next_page_token")
         if not token:
             break
-        time.sleep(2)
+        time.sleep(2)  # Google needs a moment before a next_page_token is valid
     return results[:limit]
 
 # ────────────── Simplify record ─────────────────────
@@ -91,6 +76,7 @@ def simplify(place: Dict[str, Any], user_lat: float, user_lng: float) -> Dict[st
         "price_level": place.get("price_level"),
         "types": place.get("types", []),
         "location": {"lat": v_lat, "lng": v_lng},
+        "geohash": geohash_encode(v_lat, v_lng, GEOHASH_PRECISION),
         "distance": distance_m(user_lat, user_lng, v_lat, v_lng),
         "foursquare_id": None,
         "categories": [],
@@ -143,17 +129,16 @@ def upsert_and_enrich(doc: Dict[str, Any], city: str):
             data.update(enrichment)
             print("   • enriched from Foursquare")
 
-    if data.get("place_id") and (not data.get("website") or not data.get("summary")):
-        gdata = get_google_details(data["place_id"])
-        if gdata:
-            ref.update(gdata)
-            print("   • added website/summary from Google")
-
-    if not data.get("hours"):
-        hrs = get_google_hours(pid)
-        if hrs:
-            ref.update({"hours": hrs})
-            print("   • added hours")
+    # website/summary and hours, whichever are missing, from one Details request
+    try:
+        gdata = details_updates({**data, "place_id": pid, "city": city}, [SUMMARY, HOURS], timeout=10)
+    except Exception as e:
+        print(f"   ⚠️ Google details error: {e}")
+        gdata = {}
+    if gdata:
+        ref.update(gdata)
+        data.update(gdata)
+        print(f"   • added {', '.join(k for k in ('website', 'summary', 'hours') if k in gdata)} from Google")
 
     if not data.get("instagram_url") and data.get("website"):
         insta = find_instagram_link(data["website"])
@@ -161,6 +146,8 @@ def upsert_and_enrich(doc: Dict[str, Any], city: str):
             ref.update({"instagram_url": insta})
             print("   • added Instagram")
 
+    invalidate_venue(pid, data)
+
 # ────────────── CLI Entrypoint ─────────────────────
 def main():
     radius = 3000
@@ -175,7 +162,6 @@ def main():
             simplified = simplify(place, lat, lng)
             upsert_and_enrich(simplified, simplified["city"])
             total += 1
-            time.sleep(0.2)
 
     print(f"\n✅ Finished populating Menlo Park with {total} venues enriched.")
 
@@ -186,4 +172,5 @@ MENLO_GRID_COORDS = [
 ]
 
 if __name__ == "__main__":
-    main()
+    with script_run("fetch_and_enrich_nearby"):
+        main()
@@ -2,6 +2,7 @@
 
 import firebase_admin
 from firebase_admin import credentials, firestore, initialize_app
+from services.redis_cache import invalidate_venue
 
 # Initialize Firestore
 if not firebase_admin._apps:
@@ -36,6 +37,7 @@ def delete_venue_by_name(name):
     found = False
     for doc in docs:
         doc.reference.delete()
+        invalidate_venue(doc.id, doc.to_dict())
         print(f"🗑️ Deleted '{name}' (ID: {doc.id})")
         found = True
     if not found:
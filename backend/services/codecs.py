@@ -0,0 +1,100 @@
+# services/codecs.py
+"""
+Byte codecs for cached values.
+
+A binary entry is MAGIC + one flags byte + body. The flags say which
+serializer wrote the body and how it was compressed, so entries written
+under different settings (or by older workers) all stay readable. Anything
+without the magic prefix is a plain JSON text entry from before codecs.
+
+0xC1 is never emitted by msgpack and can't start JSON text, so the prefix
+can't be mistaken for either.
+"""
+import json
+import zlib
+from typing import Any, Tuple
+
+import msgpack
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib still works without it
+    zstandard = None
+
+MAGIC = b"\xc1"
+
+# flags: low nibble = serializer, high nibble = compression
+SERIALIZERS = {"json": 0x01, "msgpack": 0x02}
+COMPRESSORS = {"none": 0x00, "zlib": 0x10, "zstd": 0x20}
+
+
+# ───────────────────  SERIALIZERS  ────────────────────
+def _json_dumps(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def _msgpack_dumps(obj) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+def _msgpack_loads(body: bytes):
+    return msgpack.unpackb(body, raw=False, strict_map_key=False)
+
+_DUMPS = {0x01: _json_dumps, 0x02: _msgpack_dumps}
+_LOADS = {0x01: json.loads, 0x02: _msgpack_loads}
+
+
+# ───────────────────  COMPRESSION  ────────────────────
+if zstandard is not None:
+    _zstd_c = zstandard.ZstdCompressor(level=3)
+    _zstd_d = zstandard.ZstdDecompressor()
+
+def _compress(flag: int, body: bytes) -> bytes:
+    if flag == 0x20:
+        return _zstd_c.compress(body)
+    if flag == 0x10:
+        return zlib.compress(body, 1)  # speed over ratio; zstd does better on both
+    return body
+
+def _decompress(flag: int, body: bytes) -> bytes:
+    if flag == 0x20:
+        if zstandard is None:
+            raise ValueError("zstd-compressed cache entry but zstandard isn't installed")
+        return _zstd_d.decompress(body)
+    if flag == 0x10:
+        return zlib.decompress(body)
+    return body
+
+
+# ───────────────────  CODEC  ────────────────────
+class Codec:
+    """
+    serializer:    "msgpack" or "json"
+    compression:   "zstd", "zlib", "none", or "auto" (zstd if installed, else zlib)
+    compress_min:  bodies smaller than this are stored uncompressed
+    """
+
+    def __init__(self, serializer: str = "msgpack", compression: str = "auto", compress_min: int = 1024):
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "zlib"
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.serializer = SERIALIZERS[serializer]
+        self.compression = COMPRESSORS[compression]
+        self.compress_min = compress_min
+
+    def encode(self, obj) -> Tuple[bytes, int]:
+        """(entry bytes, uncompressed size)."""
+        body = _DUMPS[self.serializer](obj)
+        flag = self.compression if len(body) >= self.compress_min else 0x00
+        return MAGIC + bytes([self.serializer | flag]) + _compress(flag, body), len(body)
+
+    @staticmethod
+    def decode(data) -> Tuple[Any, int]:
+        """(value, uncompressed size). Reads every format, including legacy JSON text."""
+        if isinstance(data, str):
+            return json.loads(data), len(data)
+        if not data.startswith(MAGIC):
+            return json.loads(data), len(data)
+        flags = data[1]
+        body = _decompress(flags & 0xF0, data[2:])
+        return _LOADS[flags & 0x0F](body), len(body)
+
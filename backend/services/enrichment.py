@@ -0,0 +1,125 @@
+# services/enrichment.py
+"""
+Concurrent fan-out for batch enrichment jobs.
+
+Each provider gets its own semaphore (how many of its requests may be in
+flight) and goes through the shared rate limiter (how many may start per
+minute) and the quota manager (what they may cost), so one slow or tight
+provider never holds up calls to the others. Venues are processed by a
+bounded pool of workers and come back in completion order, and their updates
+are written back in Firestore batches by a BatchWriter.
+
+    gates, writer = ProviderGates(), BatchWriter(db)
+    async for doc, updates in map_unordered(lambda d: enrich(gates, d), docs, 24):
+        await writer.add(doc, doc.to_dict(), updates)
+    await writer.flush()
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from core.quota import charge
+from core.rate_limiter import RateLimited, acquire_async
+from services import http_client
+from services.redis_cache import invalidate_venue
+
+# In-flight requests per provider
+PROVIDER_CONCURRENCY = {"google": 8, "foursquare": 8, "instagram": 4, "web": 16}
+RATE_LIMITED = {"google", "foursquare"}  # paid APIs share the cross-process token buckets
+RATE_LIMIT_WAIT_S = 120  # batch jobs can afford to wait for a token
+WRITE_BATCH = 400  # Firestore caps a write batch at 500 operations
+
+
+class ProviderGates:
+    """Create inside the running event loop."""
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None):
+        limits = PROVIDER_CONCURRENCY | (concurrency or {})
+        self._sems = {api: asyncio.Semaphore(n) for api, n in limits.items()}
+
+    @asynccontextmanager
+    async def slot(self, api: str):
+        async with self._sems[api]:
+            if api in RATE_LIMITED and not await acquire_async(api, RATE_LIMIT_WAIT_S):
+                raise RateLimited(api)
+            yield
+
+    async def get_json(self, api: str, endpoint: str, url: str, cost: Optional[float] = None, **kwargs) -> dict:
+        """Charge `endpoint` to the daily quota, then fetch once a slot and a token are free."""
+        async with self.slot(api):
+            charge(endpoint, cost)
+            return await http_client.aget_json(api, url, **kwargs)
+
+    async def get(self, api: str, url: str, **kwargs):
+        """Unmetered fetch (venue websites and the like)."""
+        async with self.slot(api):
+            return await http_client.aget(api, url, **kwargs)
+
+
+async def map_unordered(
+    fn: Callable[[Any], Awaitable[Any]],
+    items: Iterable,
+    concurrency: int,
+) -> AsyncIterator[Tuple[Any, Any]]:
+    """
+    Yield (item, result) as each call finishes, with at most `concurrency` running.
+    A call that raised yields its exception as the result, so one bad item
+    doesn't stop the rest; closing the generator cancels whatever is in flight.
+    """
+    items = iter(items)
+    running: Dict[asyncio.Task, Any] = {}
+
+    def fill():
+        while len(running) < concurrency:
+            item = next(items, _END)
+            if item is _END:
+                return
+            running[asyncio.ensure_future(fn(item))] = item
+
+    try:
+        fill()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item = running.pop(task)
+                yield item, (task.exception() or task.result())
+            fill()
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+_END = object()
+
+
+class BatchWriter:
+    """
+    Venue updates, committed to `db` in batches of `size` off the event loop.
+    Each committed venue's cached discover tiles are invalidated.
+    """
+
+    def __init__(self, db, size: int = WRITE_BATCH):
+        self.db = db
+        self.size = size
+        self.pending = []  # (doc, data, updates)
+        self.written = 0
+
+    async def add(self, doc, data: dict, updates: dict):
+        self.pending.append((doc, data, updates))
+        if len(self.pending) >= self.size:
+            await self.flush()
+
+    async def flush(self):
+        pending, self.pending = self.pending, []
+        if pending:
+            await asyncio.to_thread(self._commit, pending)
+            self.written += len(pending)
+
+    def _commit(self, pending):
+        batch = self.db.batch()
+        for doc, _, updates in pending:
+            batch.update(doc.reference, updates)
+        batch.commit()
+        for doc, data, _ in pending:
+            invalidate_venue(doc.id, data)
@@ -5,16 +5,11 @@ from services.firestore_utils import add_venue_to_firestore
 from services.foursquare import enrich_with_foursquare
 from datetime import datetime
 from typing import Dict, Any
-from math import radians, cos, sin, sqrt, atan2
+from services.geo import haversine_m
 
 # Haversine formula to compute distance in km
 def compute_distance_km(lat1, lng1, lat2, lng2):
-    R = 6371  # Earth radius in km
-    dlat = radians(lat2 - lat1)
-    dlng = radians(lng2 - lng1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlng / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
+    return haversine_m(lat1, lng1, lat2, lng2) / 1000
 
 def simplify_venue(venue: Dict[str, Any], user_lat: float, user_lng: float, city: str = "Los Angeles") -> Dict[str, Any]:
     loc = venue.get("geometry", {}).get("location", {})
@@ -1,6 +1,8 @@
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 from core.config import get_settings
+from services.geo import geohash_encode, GEOHASH_PRECISION
+from services.redis_cache import invalidate_venue
 import os
 
 cfg = get_settings()
@@ -12,8 +14,20 @@ if not firebase_admin._apps:
 
 
 db = firestore.client()
+async_db = firestore_async.client()  # for async handlers; same app & credentials
+
+def venue_geohash(data: dict):
+    """Geohash for a venue's location, or None if it has no coordinates."""
+    loc = data.get("location") or {}
+    if loc.get("lat") is None or loc.get("lng") is None:
+        return None
+    return geohash_encode(loc["lat"], loc["lng"], GEOHASH_PRECISION)
 
 def add_venue_to_firestore(data: dict):
     city = data.get("city", "Unknown")  # fallback if city is somehow missing
+    gh = venue_geohash(data)
+    if gh:
+        data = data | {"geohash": gh}  # lets discover range-query by neighbourhood
     doc_ref = db.collection("cities").document(city).collection("venues").document(data["place_id"])
     doc_ref.set(data, merge=True)
+    invalidate_venue(data["place_id"], data)
@@ -1,6 +1,11 @@
 # foresquare.py (updated)
-import requests
+from typing import Optional, Sequence
 from core.config import get_settings
+from core.quota import charge
+from core.rate_limiter import RateLimited, acquire
+from services import http_client
+from services.http_client import UpstreamError
+from services.response_cache import response_cache
 
 cfg = get_settings()
 
@@ -16,16 +21,101 @@ NIGHTLIFE_CATEGORY_IDS = {
     '4bf58dd8d48988d1d6941735'   # Dive Bar
 }
 
-def enrich_with_foursquare(fsq_id: str) -> dict:
-    base_url = f"https://api.foursquare.com/v3/places/{fsq_id}"
-    headers = {"Authorization": cfg.FOURSQUARE_API_KEY}
-    
+RATE_LIMIT_WAIT_S = 60  # lookups run from batch scripts, which can wait for a token
+
+FSQ_URL = "https://api.foursquare.com/v3/places"
+DETAIL_FIELDS = ["categories", "website", "rating", "popularity", "social_media", "description", "stats"]
+
+# ───────────────────  CACHED LOOKUPS  ────────────────────
+# Served from the on-disk response cache; only misses are charged and fetched.
+
+def take_token(timeout: float = RATE_LIMIT_WAIT_S):
+    """A token from the shared Foursquare bucket, or RateLimited."""
+    if not acquire("foursquare", timeout=timeout):
+        raise RateLimited("foursquare")
+
+def headers() -> dict:
+    return {"Accept": "application/json", "Authorization": cfg.FOURSQUARE_API_KEY}
+
+def search_params(name: str, lat: Optional[float] = None, lng: Optional[float] = None, near: Optional[str] = None) -> dict:
+    params = {"query": name, "limit": 1}
+    if near:
+        params["near"] = near
+    if lat and lng:
+        params["ll"] = f"{lat},{lng}"
+    return params
+
+def _search_key(params: dict) -> str:
+    return "|".join(str(params.get(k) or "") for k in ("query", "ll", "near")).lower()
+
+def _not_found(e: UpstreamError) -> bool:
+    return e.status == 404  # a 400 is our bad request, not a missing place; don't cache it
+
+def place_details(
+    fsq_id: str, fields: Sequence[str] = DETAIL_FIELDS, timeout: Optional[float] = None, wait: float = RATE_LIMIT_WAIT_S,
+) -> Optional[dict]:
+    """{field: value} for a place, or None if Foursquare doesn't know the id. Waits up to `wait` seconds for a rate-limit token."""
+    def fetch(_):
+        take_token(wait)
+        charge("fsq_details")
+        try:
+            return http_client.get_json("foursquare", f"{FSQ_URL}/{fsq_id}", headers=headers(), timeout=timeout)
+        except UpstreamError as e:
+            if _not_found(e):
+                return None
+            raise
+    return response_cache.fields("fsq_details", fsq_id, fields, fetch)
+
+def find_fsq_id(params: dict, timeout: Optional[float] = None, wait: float = RATE_LIMIT_WAIT_S) -> Optional[str]:
+    """fsq_id of the top search hit for search_params(...)."""
+    def fetch(_):
+        take_token(wait)
+        charge("fsq_search")
+        results = http_client.get_json("foursquare", f"{FSQ_URL}/search", headers=headers(), params=params, timeout=timeout).get("results")
+        return {"fsq_id": results[0].get("fsq_id")} if results else None
+    found = response_cache.fields("fsq_search", _search_key(params), ["fsq_id"], fetch)
+    return found and found["fsq_id"]
+
+def _tip_texts(data) -> list:
+    tips = data if isinstance(data, list) else data.get("tips", [])
+    return [t["text"] for t in tips if "text" in t]
+
+async def aplace_details(gates, fsq_id: str, fields: Sequence[str] = DETAIL_FIELDS, timeout: Optional[float] = None) -> Optional[dict]:
+    """place_details() through services.enrichment.ProviderGates."""
+    async def fetch(_):
+        try:
+            return await gates.get_json("foursquare", "fsq_details", f"{FSQ_URL}/{fsq_id}", headers=headers(), timeout=timeout)
+        except UpstreamError as e:
+            if _not_found(e):
+                return None
+            raise
+    return await response_cache.afields("fsq_details", fsq_id, fields, fetch)
+
+async def afind_fsq_id(gates, params: dict, timeout: Optional[float] = None) -> Optional[str]:
+    async def fetch(_):
+        data = await gates.get_json("foursquare", "fsq_search", f"{FSQ_URL}/search", headers=headers(), params=params, timeout=timeout)
+        results = data.get("results")
+        return {"fsq_id": results[0].get("fsq_id")} if results and isinstance(results, list) else None
+    found = await response_cache.afields("fsq_search", _search_key(params), ["fsq_id"], fetch)
+    return found and found["fsq_id"]
+
+async def atips(gates, fsq_id: str, timeout: Optional[float] = None) -> list:
+    """Tip texts for a place, newest first as Foursquare returns them."""
+    async def fetch(_):
+        data = await gates.get_json("foursquare", "fsq_tips", f"{FSQ_URL}/{fsq_id}/tips", headers=headers(), timeout=timeout)
+        return {"tips": _tip_texts(data)}
+    found = await response_cache.afields("fsq_tips", fsq_id, ["tips"], fetch)
+    return (found or {}).get("tips") or []
+
+# ───────────────────  ENRICHMENT  ────────────────────
+def enrich_with_foursquare(fsq_id: str, wait: float = RATE_LIMIT_WAIT_S) -> dict:
     try:
-        detail_resp = requests.get(base_url, headers=headers, timeout=8)
-        detail_data = detail_resp.json() if detail_resp.ok else {}
-        
+        detail_data = place_details(fsq_id, wait=wait)
+        if detail_data is None:
+            return {"is_nightlife": False}
+
         # Extract category IDs for validation
-        categories = detail_data.get("categories", [])
+        categories = detail_data.get("categories") or []
         category_ids = {cat["id"] for cat in categories}
         
         return {
@@ -35,8 +125,8 @@ def enrich_with_foursquare(fsq_id: str) -> dict:
             "website": detail_data.get("website"),
             "rating": detail_data.get("rating"),
             "popularity": detail_data.get("popularity"),
-            "social_media": detail_data.get("social_media", {}),
-            "description": detail_data.get("description", "")
+            "social_media": detail_data.get("social_media") or {},
+            "description": detail_data.get("description") or ""
         }
     except Exception as e:
         print(f"Foursquare error: {e}")
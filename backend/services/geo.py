@@ -0,0 +1,166 @@
+# services/geo.py
+"""
+Shared distance math for the API and the scripts.
+
+Scalar helpers for one-off distances, plus batched NumPy versions that work
+on contiguous float arrays of venue coordinates so a whole candidate set is
+prefiltered, measured and cut off in one pass.
+"""
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000
+METERS_PER_DEG_LAT = math.pi * EARTH_RADIUS_M / 180  # ~111.2 km, same sphere as haversine
+DISCOVER_RADIUS_M = 48_280    # ~30 miles
+
+
+# ───────────────────  SCALAR  ────────────────────
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def bounding_box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """(lat_lo, lat_hi, lng_lo, lng_hi) enclosing the circle; never misses a point inside it."""
+    dlat = radius_m / METERS_PER_DEG_LAT
+    dlng = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+# ───────────────────  BATCHED  ────────────────────
+def haversine_m_np(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Distances in meters from (lat, lng) to every (lats[i], lngs[i])."""
+    lat_r = math.radians(lat)
+    lats_r = np.radians(lats)
+    dlat = lats_r - lat_r
+    dlng = np.radians(lngs - lng)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat_r) * np.cos(lats_r) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def within_radius(
+    lat: float,
+    lng: float,
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    radius_m: float = DISCOVER_RADIUS_M,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Positions (into lats/lngs) of the points within `radius_m`, and their distances.
+
+    A cheap bounding-box mask runs first so trig only touches plausible rows.
+    """
+    lat_lo, lat_hi, lng_lo, lng_hi = bounding_box(lat, lng, radius_m)
+    in_box = np.flatnonzero(
+        (lats >= lat_lo) & (lats <= lat_hi) & (lngs >= lng_lo) & (lngs <= lng_hi)
+    )
+    dists = haversine_m_np(lat, lng, lats[in_box], lngs[in_box])
+    keep = dists <= radius_m
+    return in_box[keep], dists[keep]
+
+
+def coords_array(points) -> Tuple[np.ndarray, np.ndarray]:
+    """Split an iterable of (lat, lng) pairs into two contiguous float64 arrays."""
+    arr = np.asarray(list(points), dtype=np.float64).reshape(-1, 2)
+    return np.ascontiguousarray(arr[:, 0]), np.ascontiguousarray(arr[:, 1])
+
+
+# ───────────────────  GEOHASH  ────────────────────
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {c: i for i, c in enumerate(_BASE32)}
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 9) -> str:
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:  # longitude bit
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = (ch << 1) | 1, mid
+            else:
+                ch, lng_hi = ch << 1, mid
+        else:     # latitude bit
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = (ch << 1) | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars)
+
+
+def geohash_bbox(gh: str) -> Tuple[float, float, float, float]:
+    """(lat_lo, lat_hi, lng_lo, lng_hi) of a geohash cell."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for c in gh:
+        val = _BASE32_INDEX[c]
+        for shift in range(4, -1, -1):
+            bit = (val >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def expanded_bbox(gh: str, radius_m: float) -> Tuple[float, float, float, float]:
+    """Bounding box of every point within `radius_m` of anywhere in the geohash cell."""
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bbox(gh)
+    dlat = radius_m / METERS_PER_DEG_LAT
+    # Longitude degrees shrink toward the poles, so size the margin at the poleward edge
+    poleward = max(abs(lat_lo - dlat), abs(lat_hi + dlat))
+    dlng = dlat / max(math.cos(math.radians(min(poleward, 89.9))), 1e-6)
+    return lat_lo - dlat, lat_hi + dlat, lng_lo - dlng, lng_hi + dlng
+
+
+GEOHASH_PRECISION = 9  # stored on venue docs (~4.8 m cells); any shorter prefix is a coarser cell
+
+
+def _geohash_cell_deg(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell at `precision`."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def geohash_cover(
+    lat_lo: float, lat_hi: float, lng_lo: float, lng_hi: float, max_cells: int = 9
+) -> List[str]:
+    """
+    The finest set of at most `max_cells` geohash prefixes whose cells cover the box.
+    Each prefix maps to one Firestore range query on the `geohash` field.
+    """
+    best = [""]
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        h, w = _geohash_cell_deg(precision)
+        i_lo, i_hi = math.floor((lat_lo + 90) / h), math.floor((lat_hi + 90) / h)
+        j_lo, j_hi = math.floor((lng_lo + 180) / w), math.floor((lng_hi + 180) / w)
+        if (i_hi - i_lo + 1) * (j_hi - j_lo + 1) > max_cells:
+            break
+        # Encode each covered cell's center
+        best = sorted(
+            geohash_encode(-90 + (i + 0.5) * h, -180 + (j + 0.5) * w, precision)
+            for i in range(i_lo, i_hi + 1)
+            for j in range(j_lo, j_hi + 1)
+        )
+    return best
+
+
+def geohash_ranges(prefixes: List[str]) -> List[Tuple[str, str]]:
+    """[start, end) string ranges matching every geohash that starts with each prefix."""
+    return [(p, p + "~") for p in prefixes]
@@ -1,56 +1,136 @@
-import requests
+from typing import Optional, Sequence
 from core.config import get_settings
+from services import http_client
 from services.cache import get_or_set
-from core.rate_limiter import is_allowed
-from services.foursquare import enrich_with_foursquare
+from services.http_client import UpstreamError
+from services.response_cache import response_cache
+from core.rate_limiter import RateLimited, acquire
+from core.quota import QuotaExceeded, charge, google_details_cost
+from services.foursquare import enrich_with_foursquare, find_fsq_id, search_params
 
 cfg = get_settings()
 
+RATE_LIMIT_WAIT_S = 5  # stays well inside the cache lease (LEASE_TTL_MS)
+LOOKUP_RATE_LIMIT_WAIT_S = 60  # lookups run from batch scripts, which can wait for a token
+
+PLACES_URL = "https://maps.googleapis.com/maps/api/place"
+NOT_FOUND_STATUSES = {"NOT_FOUND", "ZERO_RESULTS"}  # negatively cached; any other status raises
+
+def take_token(timeout: float = LOOKUP_RATE_LIMIT_WAIT_S):
+    """A token from the shared Google bucket, or RateLimited — never an empty result to cache."""
+    if not acquire("google", timeout=timeout):
+        raise RateLimited("google")
+
 def _fetch_nearby(lat, lng, radius=2000):
-    if not cfg.APIS_ENABLED or not is_allowed("google"):
+    if not cfg.APIS_ENABLED:
         return []
+    take_token(RATE_LIMIT_WAIT_S)
+    charge("google_nearby")
+
+    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    params = {"location": f"{lat},{lng}", "radius": radius, "type": "night_club|bar", "key": cfg.GOOGLE_KEY}
+
+    # No catch-all here: an UpstreamError must reach get_google_venues, past
+    # the cache, so a failed fetch isn't stored as an empty result for hours
+    response = http_client.get_json("google", url, params=params)
+    enriched_results = []
+    for place in places_result(response, "results") or []:
+        # Get Foursquare ID from Google's metadata if available
+        fsq_id = place.get("external_ids", {}).get("foursquare")
 
-    url = (
-        "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-        f"?location={lat},{lng}&radius={radius}&type=night_club|bar"
-        f"&key={cfg.GOOGLE_KEY}"
-    )
-    
+        # Fallback: Search Foursquare using name + coordinates
+        if not fsq_id:
+            location = place["geometry"]["location"]
+            fsq_id = find_fsq_id(search_params(place.get("name"), location["lat"], location["lng"]), wait=RATE_LIMIT_WAIT_S)
+
+        if fsq_id:
+            fsq_data = enrich_with_foursquare(fsq_id, wait=RATE_LIMIT_WAIT_S)
+            place["foursquare_id"] = fsq_id
+            place["categories"] = fsq_data.get("categories")
+            place["is_nightlife"] = fsq_data.get("is_nightlife", False)
+
+            enriched_results.append(place)
+
+    return enriched_results
+
+def get_google_venues(lat: float, lng: float, radius=2000):
     try:
-        response = requests.get(url, timeout=8).json()
-        google_results = response.get("results", [])
-        
-        enriched_results = []
-        for place in google_results:
-            # Get Foursquare ID from Google's metadata if available
-            fsq_id = place.get("external_ids", {}).get("foursquare")
-            
-            # Fallback: Search Foursquare using name + coordinates
-            if not fsq_id:
-                fsq_data = enrich_with_foursquare(
-                    name=place.get("name"),
-                    lat=place["geometry"]["location"]["lat"],
-                    lng=place["geometry"]["location"]["lng"]
-                )
-                fsq_id = fsq_data.get("foursquare_id")
-
-            if fsq_id:
-                place["foursquare_id"] = fsq_id
-                place["categories"] = fsq_data.get("categories")
-                place["is_nightlife"] = fsq_data.get("is_nightlife", False)
-                
-                enriched_results.append(place)
-
-        return enriched_results
-
-    except Exception as e:
-        print(f"Google Places error: {e}")
+        return get_or_set(
+            "google_nearby",
+            {"lat": lat, "lng": lng, "r": radius},
+            cfg.CACHE_TTL_HOURS,
+            lambda: _fetch_nearby(lat, lng, radius),
+            stale_hours=cfg.CACHE_STALE_HOURS,
+        )
+    except RateLimited:
+        print("⚠️ Google rate limit reached; try again shortly")
+        return []
+    except QuotaExceeded as e:
+        print(f"⚠️ {e}")
+        return []
+    except UpstreamError as e:
+        print(f"⚠️ Google Places error: {e}")
         return []
 
-def get_google_venues(lat: float, lng: float, radius=2000):
-    return get_or_set(
-        "google_nearby",
-        {"lat": lat, "lng": lng, "r": radius},
-        cfg.CACHE_TTL_HOURS,
-        lambda: _fetch_nearby(lat, lng, radius)
-    )
\ No newline at end of file
+# ───────────────────  CACHED LOOKUPS  ────────────────────
+# Served from the on-disk response cache where possible; only cache misses
+# are charged to the quota and sent to Google.
+
+def places_result(response: dict, key: str = "result"):
+    """The payload of a Places response, None for "not found", UpstreamError otherwise."""
+    status = response.get("status", "OK")
+    if status in NOT_FOUND_STATUSES:
+        return None
+    if status != "OK":
+        raise UpstreamError("google", f"{status}: {response.get('error_message', '')}".rstrip(": "))
+    return response.get(key)
+
+def _details_params(place_id: str, fields: Sequence[str]) -> dict:
+    return {"place_id": place_id, "fields": ",".join(fields), "key": cfg.GOOGLE_KEY}
+
+def _pick(result: Optional[dict], fields: Sequence[str]) -> Optional[dict]:
+    return None if result is None else {f: result.get(f) for f in fields}
+
+def place_details(place_id: str, fields: Sequence[str], timeout: float = 8) -> Optional[dict]:
+    """{field: value} for a place (None where Google has no value), or None if the place is gone."""
+    def fetch(missing):
+        take_token()
+        charge("google_details", google_details_cost(missing))
+        res = http_client.get_json("google", f"{PLACES_URL}/details/json", params=_details_params(place_id, missing), timeout=timeout)
+        return _pick(places_result(res), missing)
+    return response_cache.fields("google_details", place_id, fields, fetch)
+
+async def aplace_details(gates, place_id: str, fields: Sequence[str], timeout: float = 8) -> Optional[dict]:
+    """place_details() through services.enrichment.ProviderGates."""
+    async def fetch(missing):
+        res = await gates.get_json(
+            "google", "google_details", f"{PLACES_URL}/details/json", cost=google_details_cost(missing),
+            params=_details_params(place_id, missing), timeout=timeout,
+        )
+        return _pick(places_result(res), missing)
+    return await response_cache.afields("google_details", place_id, fields, fetch)
+
+def find_place_id(query: str, timeout: float = 6) -> Optional[str]:
+    def fetch(_):
+        take_token()
+        charge("google_find_place")
+        params = {"input": query, "inputtype": "textquery", "fields": "place_id", "key": cfg.GOOGLE_KEY}
+        candidates = places_result(http_client.get_json(
+            "google", f"{PLACES_URL}/findplacefromtext/json", params=params, timeout=timeout,
+        ), "candidates")
+        return {"place_id": candidates[0].get("place_id")} if candidates else None
+    found = response_cache.fields("google_find_place", query.lower(), ["place_id"], fetch)
+    return found and found["place_id"]
+
+def text_search(query: str, location: str, radius: int, timeout: float = 10) -> Optional[dict]:
+    """Top Text Search hit for `query` near `location`."""
+    def fetch(_):
+        take_token()
+        charge("google_text_search")
+        params = {"query": query, "location": location, "radius": radius, "key": cfg.GOOGLE_KEY}
+        results = places_result(http_client.get_json(
+            "google", f"{PLACES_URL}/textsearch/json", params=params, timeout=timeout,
+        ), "results")
+        return {"result": results[0]} if results else None
+    found = response_cache.fields("google_text_search", f"{query.lower()}|{location}|{radius}", ["result"], fetch)
+    return found and found["result"]
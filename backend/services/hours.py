@@ -0,0 +1,174 @@
+# services/hours.py
+"""
+Opening hours as a flat minutes-of-week interval list.
+
+Google hands us one display string per day ("5:00 PM – 2:00 AM", "Closed",
+"Open 24 hours", several ranges comma-separated). Those are parsed once at
+ingest into sorted boundaries [open0, close0, open1, close1, …] counted in
+local minutes from Monday 00:00, so "is it open at minute m" is a single
+bisect: an odd number of boundaries at or before m means we're inside a range.
+It's a flat list of ints because Firestore can't store nested arrays.
+"""
+import re
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+DEFAULT_TIMEZONE = "America/Los_Angeles"
+CITY_TIMEZONES = {
+    "los angeles": "America/Los_Angeles",
+    "san francisco": "America/Los_Angeles",
+    "menlo park": "America/Los_Angeles",
+}
+
+_TIME_RE = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*([AP]M)?$", re.IGNORECASE)
+_RANGE_SPLIT_RE = re.compile(r"\s*[–—-]\s*")
+
+Interval = Tuple[int, int]
+
+
+# ───────────────────  PARSING  ────────────────────
+def _clean(text: str) -> str:
+    # Google uses narrow no-break / thin spaces around the dash and before AM/PM
+    return text.replace("\u202f", " ").replace("\u2009", " ").replace("\xa0", " ").strip()
+
+def _parse_time(token: str, meridiem: Optional[str] = None) -> Optional[Tuple[int, Optional[str]]]:
+    """(minutes after midnight, AM/PM seen) for '5:00 PM', '17:00' or '5' + inherited meridiem."""
+    m = _TIME_RE.match(token.strip())
+    if not m:
+        return None
+    hour, minute = int(m.group(1)), int(m.group(2) or 0)
+    meridiem = (m.group(3) or meridiem or "").upper() or None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "PM" else 0)
+    if hour > 24 or minute > 59:
+        return None
+    return hour * 60 + minute, m.group(3)
+
+def _parse_range(open_str: str, close_str: str) -> Optional[Interval]:
+    # "5:00 – 10:00 PM": the opening time borrows the closing time's AM/PM
+    close = _parse_time(close_str)
+    if close is None:
+        return None
+    opening = _parse_time(open_str, close[1])
+    if opening is None:
+        return None
+    start, end = opening[0], close[0]
+    if end <= start:
+        end += MINUTES_PER_DAY  # closes after midnight
+    return start, end
+
+def parse_day(blocks) -> List[Interval]:
+    """
+    Same-day (open, close) minutes for one day; close may run past 1440.
+
+    Accepts Google's display text ("5:00 PM – 2:00 AM, …", "Closed",
+    "Open 24 hours") as well as the older list shapes — [('11:00', '02:00')]
+    and ['11:00-02:00']. Anything unparseable is skipped.
+    """
+    if not blocks:
+        return []
+    if isinstance(blocks, str):
+        text = _clean(blocks)
+        if text.lower().startswith("open 24"):
+            return [(0, MINUTES_PER_DAY)]
+        blocks = text.split(",")
+    elif len(blocks) == 2 and all(isinstance(b, str) for b in blocks) and not any("-" in b for b in blocks):
+        blocks = [tuple(blocks)]  # orphaned two-item list
+
+    intervals = []
+    for block in blocks:
+        if isinstance(block, (list, tuple)) and len(block) == 2:
+            parts = [_clean(str(p)) for p in block]
+        elif isinstance(block, str):
+            parts = _RANGE_SPLIT_RE.split(_clean(block), maxsplit=1)
+        else:
+            continue
+        if len(parts) != 2:
+            continue  # "Closed" and friends
+        interval = _parse_range(*parts)
+        if interval:
+            intervals.append(interval)
+    return intervals
+
+
+# ───────────────────  WEEKLY INTERVALS  ────────────────────
+def _merge(intervals: Iterable[Interval]) -> List[int]:
+    merged: List[List[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [b for pair in merged for b in pair]
+
+def hours_intervals(hours: Optional[dict]) -> Optional[List[int]]:
+    """
+    Flatten a {day: hours} dict into sorted minutes-of-week boundaries.
+    Sunday-night ranges wrap into Monday morning. None if nothing parsed.
+    """
+    if not hours:
+        return None
+
+    intervals, parsed_any = [], False
+    for key, blocks in hours.items():
+        day = next((i for i, d in enumerate(DAYS) if str(key).lower().startswith(d[:3])), None)
+        if day is None:
+            continue
+        day_intervals = parse_day(blocks)
+        if day_intervals or (isinstance(blocks, str) and _clean(blocks).lower() == "closed"):
+            parsed_any = True
+        for start, end in day_intervals:
+            start, end = day * MINUTES_PER_DAY + start, day * MINUTES_PER_DAY + end
+            if end > MINUTES_PER_WEEK:
+                intervals.append((0, end - MINUTES_PER_WEEK))
+                end = MINUTES_PER_WEEK
+            intervals.append((start, end))
+
+    return _merge(intervals) if parsed_any else None
+
+def city_timezone(city: Optional[str]) -> str:
+    return CITY_TIMEZONES.get((city or "").strip().lower(), DEFAULT_TIMEZONE)
+
+
+# ───────────────────  LOOKUP  ────────────────────
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+def minute_of_week(when: datetime, tz: str = DEFAULT_TIMEZONE) -> int:
+    """Local minutes since Monday 00:00. Naive datetimes are taken as local wall time."""
+    if when.tzinfo is not None:
+        when = when.astimezone(_zone(tz))
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+def is_open_at(intervals: List[int], minute: int) -> bool:
+    return bisect_right(intervals, minute) % 2 == 1
+
+def venue_open_at(data: dict, when: datetime) -> bool:
+    """Open at `when` in the venue's own timezone; unknown hours count as closed."""
+    intervals = data.get("hours_intervals")
+    if not intervals:
+        return False
+    tz = data.get("timezone") or city_timezone(data.get("city"))
+    return is_open_at(intervals, minute_of_week(when, tz))
+
+def closes_late(intervals: List[int]) -> bool:
+    """True if any range closes between 23:00 and 06:00."""
+    for close in intervals[1::2]:
+        t = close % MINUTES_PER_DAY
+        if t >= 23 * 60 or t < 6 * 60:
+            return True
+    return False
+
+def hours_fields(hours: Optional[dict], city: Optional[str]) -> dict:
+    """The precomputed fields to store next to `hours` on a venue document."""
+    return {"hours_intervals": hours_intervals(hours), "timezone": city_timezone(city)}
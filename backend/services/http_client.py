@@ -0,0 +1,194 @@
+# services/http_client.py
+"""
+Shared outbound HTTP for every third-party API.
+
+One pooled httpx client per provider, so calls reuse kept-alive connections
+(and HTTP/2 where the server offers it and `h2` is installed) instead of
+paying DNS + TCP + TLS on every request. Transient failures — connection
+errors, timeouts, 429 and 5xx — are retried with capped exponential backoff
+and full jitter, waiting at least as long as the server's Retry-After says
+(or giving up at once if that is longer than MAX_RETRY_AFTER_S).
+
+    from services import http_client
+    data = http_client.get_json("google", url, params={"place_id": pid})
+
+Anything still failing after the retries raises UpstreamError, so callers
+see one exception type whatever went wrong. Each attempt is recorded in the
+outbound metrics under the provider name. aget / aget_json are the asyncio
+twins, on per-provider AsyncClients.
+"""
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from core.metrics import track_outbound
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:  # optional; HTTP/1.1 keep-alive still works without it
+    HTTP2 = False
+
+DEFAULT_TIMEOUT = httpx.Timeout(8.0, connect=3.0)
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 20.0
+MAX_RETRY_AFTER_S = 20.0  # a server asking us to wait longer gets an UpstreamError instead
+
+USER_AGENT = "Mozilla/5.0"  # venue sites block obvious bots
+
+
+class UpstreamError(Exception):
+    def __init__(self, api: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{api}: {message}")
+        self.api = api
+        self.status = status
+
+
+# ───────────────────  CLIENTS  ────────────────────
+_clients: Dict[str, httpx.Client] = {}
+_clients_lock = threading.Lock()
+
+def client(api: str) -> httpx.Client:
+    """The pooled client for `api`, created on first use."""
+    with _clients_lock:
+        if api not in _clients:
+            _clients[api] = httpx.Client(
+                http2=HTTP2, timeout=DEFAULT_TIMEOUT, limits=LIMITS,
+                follow_redirects=True, headers={"User-Agent": USER_AGENT},
+            )
+        return _clients[api]
+
+def close_clients():
+    with _clients_lock:
+        for c in _clients.values():
+            c.close()
+        _clients.clear()
+
+_aclients: Dict[str, httpx.AsyncClient] = {}
+
+def aclient(api: str) -> httpx.AsyncClient:
+    """Async twin of client(); bound to the running event loop, so close before it ends."""
+    if api not in _aclients:
+        _aclients[api] = httpx.AsyncClient(
+            http2=HTTP2, timeout=DEFAULT_TIMEOUT, limits=LIMITS,
+            follow_redirects=True, headers={"User-Agent": USER_AGENT},
+        )
+    return _aclients[api]
+
+async def aclose_clients():
+    clients = list(_aclients.values())
+    _aclients.clear()
+    for c in clients:
+        await c.aclose()
+
+
+# ───────────────────  RETRIES  ────────────────────
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date)."""
+    value = resp.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full jitter over a doubling window, but never sooner than Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def _settle(api: str, attempt: int, retries: int, resp=None, error=None) -> Tuple[bool, Optional[float]]:
+    """
+    (done, Retry-After) for one attempt: done means return `resp` as is. Raises
+    UpstreamError for non-retryable failures and once the retries are used up.
+    """
+    if error is not None:
+        if attempt == retries:
+            raise UpstreamError(api, f"{type(error).__name__}: {error}") from error
+        return False, None
+    if resp.status_code not in RETRY_STATUSES:
+        if resp.is_error:
+            raise UpstreamError(api, f"HTTP {resp.status_code}", resp.status_code)
+        return True, None
+    if attempt == retries:
+        raise UpstreamError(api, f"HTTP {resp.status_code} after {retries + 1} attempts", resp.status_code)
+    retry_after = _retry_after(resp)
+    if retry_after is not None and retry_after > MAX_RETRY_AFTER_S:
+        raise UpstreamError(api, f"HTTP {resp.status_code}, Retry-After {retry_after:.0f}s", resp.status_code)
+    return False, retry_after
+
+def _json(api: str, resp: httpx.Response) -> dict:
+    try:
+        return resp.json()
+    except ValueError as e:
+        raise UpstreamError(api, "invalid JSON", resp.status_code) from e
+
+
+def get(
+    api: str,
+    url: str,
+    *,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    timeout: Optional[float] = None,
+    retries: int = MAX_RETRIES,
+) -> httpx.Response:
+    """GET with retries; the response is always 2xx/3xx/non-retryable 4xx, else UpstreamError."""
+    for attempt in range(retries + 1):
+        resp, error = None, None
+        try:
+            with track_outbound(api) as call:
+                resp = client(api).get(url, params=params, headers=headers, timeout=timeout or DEFAULT_TIMEOUT)
+                call.status = resp.status_code
+        except httpx.TransportError as e:
+            error = e
+        done, retry_after = _settle(api, attempt, retries, resp, error)
+        if done:
+            return resp
+        time.sleep(backoff(attempt, retry_after))
+
+def get_json(api: str, url: str, **kwargs) -> dict:
+    return _json(api, get(api, url, **kwargs))
+
+
+async def aget(
+    api: str,
+    url: str,
+    *,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    timeout: Optional[float] = None,
+    retries: int = MAX_RETRIES,
+) -> httpx.Response:
+    for attempt in range(retries + 1):
+        resp, error = None, None
+        try:
+            with track_outbound(api) as call:
+                resp = await aclient(api).get(url, params=params, headers=headers, timeout=timeout or DEFAULT_TIMEOUT)
+                call.status = resp.status_code
+        except httpx.TransportError as e:
+            error = e
+        done, retry_after = _settle(api, attempt, retries, resp, error)
+        if done:
+            return resp
+        await asyncio.sleep(backoff(attempt, retry_after))
+
+async def aget_json(api: str, url: str, **kwargs) -> dict:
+    return _json(api, await aget(api, url, **kwargs))
@@ -1,5 +1,5 @@
-import requests
 from core.config import get_settings
+from services import http_client
 from bs4 import BeautifulSoup
 
 cfg = get_settings()
@@ -14,8 +14,10 @@ def validate_instagram(handle: str) -> bool:
         return False
         
     try:
-        url = f"https://graph.instagram.com/{handle}?fields=biography&access_token={cfg.INSTAGRAM_TOKEN}"
-        response = requests.get(url, timeout=8).json()
+        response = http_client.get_json(
+            "instagram", f"https://graph.instagram.com/{handle}",
+            params={"fields": "biography", "access_token": cfg.INSTAGRAM_TOKEN},
+        )
         bio = response.get("biography", "").lower()
         return any(kw in bio for kw in INSTAGRAM_KEYWORDS)
     except Exception as e:
@@ -27,7 +29,7 @@ def find_instagram_link(website_url):
     if not website_url:
         return None
     try:
-        res = requests.get(website_url, timeout=6, headers={"User-Agent": "Mozilla/5.0"})
+        res = http_client.get("web", website_url, timeout=6, retries=1)
         soup = BeautifulSoup(res.text, "html.parser")
         for a in soup.find_all("a", href=True):
             href = a["href"]
@@ -0,0 +1,72 @@
+# services/local_cache.py
+"""
+Bounded in-process LRU that sits in front of Redis (the L1 tier).
+
+Entries hold already-decoded values, so an L1 hit skips both the Redis round
+trip and json.loads. The cache is bounded by entry count and by an
+approximate byte budget (the size of the JSON payload the value came from),
+and every entry has its own TTL so a missed invalidation only lingers briefly.
+Values are shared between callers — treat them as read-only.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+
+class Entry(NamedTuple):
+    value: Any
+    soft: Optional[float]   # SWR soft expiry carried over from Redis
+    delta: float            # seconds the loader took
+    expires: float          # L1 expiry (monotonic)
+    size: int               # approximate bytes
+
+
+class LocalCache:
+    def __init__(self, max_bytes: int, max_items: int = 10_000):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value, size: int, ttl_s: float, soft: Optional[float] = None, delta: float = 0.0):
+        if ttl_s <= 0 or size > self.max_bytes:
+            return  # not worth holding (or would flush everything else)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = Entry(value, soft, delta, time.monotonic() + ttl_s, size)
+            self.bytes += size
+            while self._entries and (self.bytes > self.max_bytes or len(self._entries) > self.max_items):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def pop(self, key: str):
+        with self._lock:
+            self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
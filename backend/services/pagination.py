@@ -0,0 +1,62 @@
+# services/pagination.py
+"""
+Keyset pagination for distance-ordered venue lists.
+
+Venues are totally ordered by (distance, id). A page's cursor encodes the last
+key it returned plus the dataset version it was computed from, so the next
+page selects only what sorts after that key — a bounded heap of `limit`
+items instead of sorting the whole nearby list and slicing. A cursor from a
+different version is refused rather than resumed against changed data.
+"""
+import base64
+import heapq
+import json
+from typing import Iterable, List, Optional, Tuple
+
+CursorKey = Tuple[float, str]
+
+
+class StaleCursor(ValueError):
+    """The cursor was issued against a different dataset version."""
+
+
+def encode_cursor(distance: float, venue_id: str, version: int) -> str:
+    raw = json.dumps([distance, venue_id, version], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[CursorKey, int]:
+    """Returns ((distance, id), version). Raises ValueError on a malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        distance, venue_id, version = json.loads(raw)
+        return (float(distance), str(venue_id)), int(version)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid cursor: {token!r}") from e
+
+
+def resume_after(token: str, version: int) -> CursorKey:
+    """The key to resume after. ValueError if malformed, StaleCursor if from another version."""
+    after, cursor_version = decode_cursor(token)
+    if cursor_version != version:
+        raise StaleCursor(f"cursor is for version {cursor_version}, data is at {version}")
+    return after
+
+
+def sort_key(venue: dict) -> CursorKey:
+    return venue["distance"], venue["id"]
+
+
+def top_k(venues: Iterable[dict], k: int, after: Optional[CursorKey] = None) -> List[dict]:
+    """The k nearest venues sorting strictly after `after`, in order. O(n log k)."""
+    if after is not None:
+        venues = (v for v in venues if sort_key(v) > after)
+    return heapq.nsmallest(k, venues, key=sort_key)
+
+
+def next_cursor(page: List[dict], limit: int, version: int) -> Optional[str]:
+    """Cursor for the page after `page`, or None when it came back short."""
+    if len(page) < limit or not page:
+        return None
+    last = page[-1]
+    return encode_cursor(last["distance"], last["id"], version)
@@ -0,0 +1,149 @@
+# services/place_details.py
+"""
+One Google Place Details request per venue, shared by every enrichment step.
+
+Each step (website/summary, hours, price level, core Google fields) declares
+which Details fields it reads, when a venue still needs it and how to turn a
+Details result into venue updates. For a venue the wanted steps are planned
+first, Google is asked once for the union of their fields (through the
+response cache, so fields already on disk aren't re-requested), and the
+result is fanned out to each step:
+
+    steps = plan(venue)                     # e.g. [SUMMARY, HOURS]
+    details = place_details(pid, union_fields(steps))
+    updates = fan_out(steps, details, venue)
+
+details_updates() does all three for one venue; fetch_batch() does them for
+a batch of venues concurrently.
+"""
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.enrichment import ProviderGates, map_unordered
+from services.google_places import aplace_details, place_details
+from services.hours import hours_fields
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+@dataclass(frozen=True)
+class DetailsStep:
+    name: str
+    fields: Tuple[str, ...]
+    needed: Callable[[dict], bool]  # venue -> does this step have work to do
+    parse: Callable[[dict, dict], dict]  # (details, venue) -> venue updates; {} if Google has nothing
+
+
+# ───────────────────  PARSERS  ────────────────────
+def weekday_hours(details: dict) -> Optional[dict]:
+    """{"monday": "5:00 PM – 2:00 AM", ...} from opening_hours.weekday_text."""
+    weekday_text = (details.get("opening_hours") or {}).get("weekday_text")
+    if not weekday_text:
+        return None
+    return {day: text.split(": ", 1)[1] for day, text in zip(WEEKDAYS, weekday_text)}
+
+def website_and_summary(details: dict) -> dict:
+    return {
+        "website": details.get("website"),
+        "summary": (details.get("editorial_summary") or {}).get("overview"),
+    }
+
+def core_fields(details: dict) -> dict:
+    location = (details.get("geometry") or {}).get("location", {})
+    return {
+        "address": details.get("formatted_address"),
+        "lat": location.get("lat"),
+        "lng": location.get("lng"),
+        "types": details.get("types"),
+        "website": details.get("website"),
+        "rating": details.get("rating"),
+        "price_level": details.get("price_level"),
+    }
+
+def _present(fields: dict) -> dict:
+    return {k: v for k, v in fields.items() if v is not None}
+
+def _hours_updates(details: dict, venue: dict) -> dict:
+    hours = weekday_hours(details)
+    return {"hours": hours, **hours_fields(hours, venue.get("city"))} if hours else {}
+
+
+# ───────────────────  STEPS  ────────────────────
+SUMMARY = DetailsStep(
+    "summary", ("website", "editorial_summary"),
+    needed=lambda v: not v.get("website") or not v.get("summary"),
+    parse=lambda d, v: {k: val for k, val in _present(website_and_summary(d)).items() if not v.get(k)},
+)
+HOURS = DetailsStep(
+    "hours", ("opening_hours",),
+    needed=lambda v: not v.get("hours"),
+    parse=_hours_updates,
+)
+PRICE_LEVEL = DetailsStep(
+    "price_level", ("price_level",),
+    needed=lambda v: v.get("price_level") is None,
+    parse=lambda d, v: _present({"price_level": d.get("price_level")}),
+)
+CORE_FIELDS = DetailsStep(
+    "core_fields", ("formatted_address", "geometry", "types", "website", "rating", "price_level", "name"),
+    needed=lambda v: any(not v.get(f) for f in ("address", "lat", "lng", "types", "rating")),
+    parse=lambda d, v: _present(core_fields(d)),
+)
+STEPS = {step.name: step for step in (SUMMARY, HOURS, PRICE_LEVEL, CORE_FIELDS)}
+
+
+def union_fields(steps: Iterable[DetailsStep]) -> List[str]:
+    """Every field the steps read, each once, in a stable order."""
+    return list(dict.fromkeys(f for step in steps for f in step.fields))
+
+def plan(venue: dict, steps: Sequence[DetailsStep] = tuple(STEPS.values())) -> List[DetailsStep]:
+    """The steps that still have work to do for `venue` (none without a place_id)."""
+    if not venue.get("place_id"):
+        return []
+    return [step for step in steps if step.needed(venue)]
+
+def fan_out(steps: Iterable[DetailsStep], details: Optional[dict], venue: dict) -> dict:
+    """Merged updates from each step; later steps don't overwrite earlier ones."""
+    updates: Dict[str, Any] = {}
+    if details is None:
+        return updates
+    for step in steps:
+        for key, value in step.parse(details, venue).items():
+            updates.setdefault(key, value)
+    return updates
+
+def details_updates(venue: dict, steps: Sequence[DetailsStep] = tuple(STEPS.values()), timeout: float = 8) -> dict:
+    """Updates for one venue from a single Details request (no request if no step needs one)."""
+    wanted = plan(venue, steps)
+    if not wanted:
+        return {}
+    return fan_out(wanted, place_details(venue["place_id"], union_fields(wanted), timeout=timeout), venue)
+
+
+async def fetch_batch(
+    gates: ProviderGates,
+    venues: Iterable[Any],
+    to_dict: Callable[[Any], dict] = lambda v: v,
+    steps: Sequence[DetailsStep] = tuple(STEPS.values()),
+    concurrency: int = 16,
+    timeout: float = 8,
+) -> AsyncIterator[Tuple[Any, Any]]:
+    """
+    Yield (venue, updates) as each venue's single Details request finishes.
+    Venues with nothing to do are skipped; a failed request yields its
+    exception as the updates, as map_unordered does.
+    """
+    planned = []
+    for venue in venues:
+        data = to_dict(venue)
+        wanted = plan(data, steps)
+        if wanted:
+            planned.append((venue, data, wanted))
+
+    async def one(entry):
+        _, data, wanted = entry
+        details = await aplace_details(gates, data["place_id"], union_fields(wanted), timeout=timeout)
+        return fan_out(wanted, details, data)
+
+    async for (venue, _, _), updates in map_unordered(one, planned, concurrency):
+        yield venue, updates
@@ -1,18 +1,844 @@
-import json, redis, hashlib
+import json, redis, hashlib, threading, time, uuid, asyncio, math, random
+import redis.asyncio as aioredis
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple, Union
 
-rds = redis.Redis(host="localhost", port=6379, decode_responses=True)
+from core import metrics
+from core.config import get_settings
+from services.local_cache import LocalCache
+from services.codecs import Codec
+from services.geo import geohash_encode, GEOHASH_PRECISION
+
+cfg = get_settings()
+
+# One bounded pool per process for each client; callers block briefly for a
+# free connection instead of erroring under load. Values are binary (see
+# services/codecs.py), so responses stay as bytes.
+pool = redis.BlockingConnectionPool.from_url(
+    cfg.REDIS_URL, max_connections=cfg.REDIS_MAX_CONNECTIONS, timeout=5,
+)
+apool = aioredis.BlockingConnectionPool.from_url(
+    cfg.REDIS_URL, max_connections=cfg.REDIS_MAX_CONNECTIONS, timeout=5,
+)
+rds = redis.Redis(connection_pool=pool)
+ards = aioredis.Redis(connection_pool=apool)
+codec = Codec(cfg.CACHE_CODEC, cfg.CACHE_COMPRESSION, cfg.CACHE_COMPRESS_MIN_BYTES)
+
+# Two tiers: a per-process LRU (L1) in front of Redis (L2). Writes and
+# invalidations are broadcast so other workers drop their L1 copies; the
+# short L1 TTL bounds staleness if a message is ever missed.
+l1 = LocalCache(cfg.L1_CACHE_MB * 1024 * 1024)
+L1_TTL_S = cfg.L1_CACHE_TTL_S
+INVALIDATE_CHANNEL = "cache:invalidate"
+WORKER_ID = uuid.uuid4().hex
+_listener = None
+
+# Single-flight: one loader per key per process (in-flight futures) and one per
+# fleet (a short Redis lease). Everyone else waits for, or is served, its result.
+LEASE_TTL_MS = 10_000   # a dead leader only blocks a key this long
+LEASE_POLL_S = 0.05
+
+# Stale-while-revalidate: entries carry a soft expiry (ttl_hours) and live in
+# Redis until a hard one (ttl + stale_hours; callers that don't pass a stale
+# window get none, so the key lives exactly ttl). Past soft, the stale value is
+# served at once while a background refresh runs; shortly before it, hot keys
+# refresh early with a probability that rises as expiry nears (XFetch).
+EARLY_REFRESH_BETA = 1.0  # 0 disables early refresh; >1 refreshes earlier
+ENVELOPE = "__swr__"
+
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+_refreshing: set = set()
+_arefresh_tasks: set = set()
+
+_RELEASE_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_inflight: dict = {}
+_ainflight: dict = {}
+_inflight_lock = threading.Lock()
+
+_stats = Counter()
+_stats_lock = threading.Lock()
 
 def _key(name: str, params: dict) -> str:
     h = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
     return f"{name}:{h}"
 
-def get_or_set(name: str, params: dict, ttl_hours: int, loader):
-    k = _key(name, params)
+def _lease_key(k: str) -> str:
+    return f"lease:{k}"
+
+_TIERS = {"l1_hits": "l1", "l2_hits": "l2", "misses": "miss"}
+
+def _count(stat: str, k: str):
+    """Process-wide totals for cache_stats(), plus per-namespace metrics."""
+    with _stats_lock:
+        _stats[stat] += 1
+    namespace = k.split(":", 1)[0]
+    if stat in _TIERS:
+        metrics.CACHE_LOOKUPS.inc(namespace, _TIERS[stat])
+    else:
+        metrics.CACHE_EVENTS.inc(namespace, stat)
+
+def cache_stats() -> dict:
+    """
+    loads:             loader() actually ran on a miss
+    coalesced_local:   waited on a load already in flight in this process
+    coalesced_remote:  served a value another worker loaded under its lease
+    lease_timeouts:    gave up waiting on a lease and loaded anyway
+    stale_served:      returned a value past its soft expiry
+    early_refreshes:   refreshed ahead of soft expiry (XFetch)
+    refreshes:         background refreshes that ran the loader
+    l1_hits / l2_hits / misses, and each tier's hit rate over the lookups it saw
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["suppressed"] = stats.get("coalesced_local", 0) + stats.get("coalesced_remote", 0)
+
+    l1_hits, l2_hits, misses = (stats.get(s, 0) for s in ("l1_hits", "l2_hits", "misses"))
+    lookups = l1_hits + l2_hits + misses
+    stats["l1_hit_rate"] = l1_hits / lookups if lookups else 0.0
+    stats["l2_hit_rate"] = l2_hits / (l2_hits + misses) if l2_hits + misses else 0.0
+    stats.update(l1_items=len(l1), l1_bytes=l1.bytes, l1_evictions=l1.evictions)
+    return stats
+
+# ───────────────────  ENVELOPE  ────────────────────
+def _wrap(value, ttl_hours: float, stale_hours: Optional[float], delta: float) -> Tuple[bytes, int, float, int]:
+    """
+    (payload, Redis EX seconds, soft expiry, decoded size): soft expiry inside,
+    hard expiry on the key.
+    """
+    ttl = ttl_hours * 3600
+    stale = (stale_hours or 0) * 3600
+    soft = time.time() + ttl
+    payload, size = codec.encode({ENVELOPE: 1, "v": value, "soft": soft, "delta": delta})
+    return payload, max(1, int(ttl + stale)), soft, size
+
+def _unwrap(data):
+    """(value, soft expiry, load seconds, decoded size); plain JSON from before SWR counts as fresh."""
+    value, size = Codec.decode(data)
+    if isinstance(value, dict) and value.get(ENVELOPE) == 1:
+        return value["v"], value["soft"], value["delta"], size
+    return value, None, 0.0, size
+
+def _needs_refresh(soft: Optional[float], delta: float) -> Optional[str]:
+    """'stale' past soft expiry, 'early' if XFetch fires, else None."""
+    if soft is None:
+        return None
+    now = time.time()
+    if now >= soft:
+        return "stale"
+    # -log(U) is Exp(1): slow-to-load keys start refreshing further ahead
+    if EARLY_REFRESH_BETA > 0 and delta > 0:
+        if now - delta * EARLY_REFRESH_BETA * math.log(1.0 - random.random()) >= soft:
+            return "early"
+    return None
+
+def _note_refresh(k: str, reason: str):
+    if reason == "stale":
+        print(f"[CACHE STALE] {k}")
+        _count("stale_served", k)
+    else:
+        print(f"[CACHE EARLY] {k}")
+        _count("early_refreshes", k)
+
+# ───────────────────  TIERS  ────────────────────
+def _decode(k: str, data):
+    """Unwrap a Redis payload and keep the decoded value in L1."""
+    value, soft, delta, size = _unwrap(data)
+    l1.put(k, value, size, L1_TTL_S, soft, delta)
+    return value, soft, delta
+
+def _lookup(k: str):
+    entry = l1.get(k)
+    if entry is not None:
+        _count("l1_hits", k)
+        return entry.value, entry.soft, entry.delta
     data = rds.get(k)
     if data:
-        print(f"[CACHE HIT] {k}")
-        return json.loads(data)
-    print(f"[CACHE MISS] {k}")
+        _count("l2_hits", k)
+        return _decode(k, data)
+    _count("misses", k)
+    return None
+
+async def _alookup(k: str):
+    entry = l1.get(k)
+    if entry is not None:
+        _count("l1_hits", k)
+        return entry.value, entry.soft, entry.delta
+    data = await ards.get(k)
+    if data:
+        _count("l2_hits", k)
+        return _decode(k, data)
+    _count("misses", k)
+    return None
+
+def _invalidation(k: str) -> str:
+    return json.dumps({"k": k, "from": WORKER_ID})
+
+def _on_invalidate(message):
+    msg = json.loads(message["data"])
+    if msg.get("from") == WORKER_ID:
+        return  # our own L1 is already current
+    l1.pop(msg["k"])
+
+def invalidate(name: str, params: dict):
+    """Drop one entry from Redis and from every worker's L1."""
+    k = _key(name, params)
+    l1.pop(k)
+    rds.delete(k)
+    rds.publish(INVALIDATE_CHANNEL, _invalidation(k))
+
+def start_invalidation_listener():
+    global _listener
+    if _listener is not None:
+        return
+    try:
+        pubsub = rds.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATE_CHANNEL: _on_invalidate})
+        _listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+    except redis.RedisError as e:
+        print(f"⚠️ Cache invalidation listener unavailable ({e}); L1 entries will just expire")
+
+def stop_invalidation_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# ───────────────────  TAGS  ────────────────────
+# Each tag is a Redis set of the cache keys that depend on it. Writes to a
+# venue invalidate every geohash prefix containing it, which catches exactly
+# the tiles whose range queries would have returned it.
+Tags = Union[None, Iterable[str], Callable[[Any], Iterable[str]]]
+
+def geo_tag(prefix: str) -> str:
+    return f"geo:{prefix}"
+
+def venue_write_tags(data: Optional[dict]) -> List[str]:
+    """Tags touched by writing (or deleting) a venue with this data; none without a location."""
+    data = data or {}
+    gh = data.get("geohash")
+    loc = data.get("location") or {}
+    if not gh and loc.get("lat") is not None and loc.get("lng") is not None:
+        gh = geohash_encode(loc["lat"], loc["lng"], GEOHASH_PRECISION)
+    if not gh:
+        return []
+    return [geo_tag(gh[:p]) for p in range(1, len(gh) + 1)]
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+def _resolve_tags(tags: Tags, value) -> List[str]:
+    if tags is None:
+        return []
+    return list(tags(value) if callable(tags) else tags)
+
+def _tag_entry(pipe, k: str, tags: List[str], ex: int):
+    for tag in tags:
+        tk = _tag_key(tag)
+        pipe.sadd(tk, k)
+        # the set lives as long as its longest-lived entry (EXPIRE NX/GT, Redis 7+)
+        pipe.expire(tk, ex, nx=True)
+        pipe.expire(tk, ex, gt=True)
+
+def invalidate_tags(tags: Iterable[str]) -> int:
+    """Evict every entry carrying any of `tags`, from Redis and every worker's L1."""
+    tag_keys = [_tag_key(t) for t in set(tags)]
+    if not tag_keys:
+        return 0
+
+    pipe = rds.pipeline(transaction=False)
+    for tk in tag_keys:
+        pipe.smembers(tk)
+    keys = {m.decode() if isinstance(m, bytes) else m for members in pipe.execute() for m in members}
+
+    pipe = rds.pipeline(transaction=False)
+    for k in keys:
+        l1.pop(k)
+        pipe.delete(k)
+        pipe.publish(INVALIDATE_CHANNEL, _invalidation(k))
+    pipe.delete(*tag_keys)
+    pipe.execute()
+    if keys:
+        print(f"🧹 Invalidated {len(keys)} cache entries for {len(tag_keys)} tags")
+    return len(keys)
+
+def invalidate_venue(venue_id: str, *versions: Optional[dict]) -> int:
+    """
+    invalidate_tags for a venue write; pass the old and new data when a move is
+    possible. Write paths call this, so a Redis outage only logs a warning.
+    """
+    tags = {tag for data in versions for tag in venue_write_tags(data)}
+    try:
+        return invalidate_tags(tags)
+    except redis.RedisError as e:
+        print(f"⚠️ Cache invalidation for {venue_id} failed: {e}")
+        return 0
+
+# ───────────────────  SYNC  ────────────────────
+def _release(k: str, token: str):
+    rds.eval(_RELEASE_LUA, 1, _lease_key(k), token)
+
+def _store(k: str, ttl_hours: float, stale_hours: Optional[float], loader, tags: Tags = None):
+    start = time.perf_counter()
     value = loader()
-    rds.set(k, json.dumps(value), ex=ttl_hours * 3600)
-    return value
\ No newline at end of file
+    delta = time.perf_counter() - start
+    metrics.CACHE_LOAD_SECONDS.observe(delta, k.split(":", 1)[0])
+    payload, ex, soft, size = _wrap(value, ttl_hours, stale_hours, delta)
+    pipe = rds.pipeline(transaction=False)
+    pipe.set(k, payload, ex=ex)
+    _tag_entry(pipe, k, _resolve_tags(tags, value), ex)
+    pipe.publish(INVALIDATE_CHANNEL, _invalidation(k))
+    pipe.execute()
+    l1.put(k, value, size, L1_TTL_S, soft, delta)
+    return value
+
+def _refresh(k: str, ttl_hours: float, stale_hours: Optional[float], loader, tags: Tags = None):
+    token = uuid.uuid4().hex
+    try:
+        if not rds.set(_lease_key(k), token, nx=True, px=LEASE_TTL_MS):
+            return  # another worker is already on it
+        try:
+            _count("refreshes", k)
+            _store(k, ttl_hours, stale_hours, loader, tags)
+        finally:
+            _release(k, token)
+    except Exception as e:
+        print(f"⚠️ Background refresh failed for {k}: {e}")
+    finally:
+        with _inflight_lock:
+            _refreshing.discard(k)
+
+def _schedule_refresh(k: str, ttl_hours: float, stale_hours: Optional[float], loader, tags: Tags = None):
+    with _inflight_lock:
+        if k in _refreshing:
+            return
+        _refreshing.add(k)
+    _refresh_pool.submit(_refresh, k, ttl_hours, stale_hours, loader, tags)
+
+def _load_under_lease(k: str, ttl_hours: float, stale_hours: Optional[float], loader, tags: Tags = None):
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LEASE_TTL_MS / 1000
+    while True:
+        if rds.set(_lease_key(k), token, nx=True, px=LEASE_TTL_MS):
+            try:
+                data = rds.get(k)  # filled while we were acquiring?
+                if data:
+                    _count("coalesced_remote", k)
+                    return _decode(k, data)[0]
+                _count("loads", k)
+                return _store(k, ttl_hours, stale_hours, loader, tags)
+            finally:
+                _release(k, token)
+
+        time.sleep(LEASE_POLL_S)
+        data = rds.get(k)
+        if data:
+            _count("coalesced_remote", k)
+            return _decode(k, data)[0]
+        if time.monotonic() > deadline:
+            print(f"⚠️ Cache lease wait timed out for {k}; loading anyway")
+            _count("lease_timeouts", k)
+            _count("loads", k)
+            return _store(k, ttl_hours, stale_hours, loader, tags)
+
+def get_or_set(
+    name: str,
+    params: dict,
+    ttl_hours: float,
+    loader,
+    stale_hours: Optional[float] = None,
+    tags: Tags = None,
+):
+    """
+    Cached `loader()` result under (name, params). Fresh for `ttl_hours`, then
+    served stale for up to `stale_hours` more (default: none) while a
+    background refresh runs; only a cold or hard-expired key waits on the loader.
+    `tags` (or tags(value)) name what the entry depends on, for invalidate_tags.
+    """
+    k = _key(name, params)
+    hit = _lookup(k)
+    if hit:
+        value, soft, delta = hit
+        reason = _needs_refresh(soft, delta)
+        if reason:
+            _note_refresh(k, reason)
+            _schedule_refresh(k, ttl_hours, stale_hours, loader, tags)
+        else:
+            print(f"[CACHE HIT] {k}")
+        return value
+    print(f"[CACHE MISS] {k}")
+
+    with _inflight_lock:
+        fut = _inflight.get(k)
+        leader = fut is None
+        if leader:
+            fut = _inflight[k] = Future()
+    if not leader:
+        _count("coalesced_local", k)
+        return fut.result()
+
+    try:
+        value = _load_under_lease(k, ttl_hours, stale_hours, loader, tags)
+        fut.set_result(value)
+        return value
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(k, None)
+
+# ───────────────────  ASYNC  ────────────────────
+async def _astore(k: str, ttl_hours: float, stale_hours: Optional[float], loader, tags: Tags = None):
+    start = time.perf_counter()
+    value = await loader()
+    delta = time.perf_counter() - start
+    metrics.CACHE_LOAD_SECONDS.observe(delta, k.split(":", 1)[0])
+    payload, ex, soft, size = _wrap(value, ttl_hours, stale_hours, delta)
+    async with ards.pipeline(transaction=False) as pipe:
+        pipe.set(k, payload, ex=ex)
+        _tag_entry(pipe, k, _resolve_tags(tags, value), ex)
+        pipe.publish(INVALIDATE_CHANNEL, _invalidation(k))
+        await pipe.execute()
+    l1.put(k, value, size, L1_TTL_S, soft, delta)
+    return value
+
+async def _arefresh(k: str, ttl_hours: float, stale_hours: Optional[float], loader, tags: Tags = None):
+    token = uuid.uuid4().hex
+    try:
+        if not await ards.set(_lease_key(k), token, nx=True, px=LEASE_TTL_MS):
+            return
+        try:
+            _count("refreshes", k)
+            await _astore(k, ttl_hours, stale_hours, loader, tags)
+        finally:
+            await ards.eval(_RELEASE_LUA, 1, _lease_key(k), token)
+    except Exception as e:
+        print(f"⚠️ Background refresh failed for {k}: {e}")
+    finally:
+        _refreshing.discard(k)
+
+def _aschedule_refresh(k: str, ttl_hours: float, stale_hours: Optional[float], loader, tags: Tags = None):
+    if k in _refreshing:
+        return
+    _refreshing.add(k)
+    task = asyncio.get_running_loop().create_task(_arefresh(k, ttl_hours, stale_hours, loader, tags))
+    _arefresh_tasks.add(task)  # keep a reference until it finishes
+    task.add_done_callback(_arefresh_tasks.discard)
+
+async def _aload_under_lease(k: str, ttl_hours: float, stale_hours: Optional[float], loader, tags: Tags = None):
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LEASE_TTL_MS / 1000
+    while True:
+        if await ards.set(_lease_key(k), token, nx=True, px=LEASE_TTL_MS):
+            try:
+                data = await ards.get(k)
+                if data:
+                    _count("coalesced_remote", k)
+                    return _decode(k, data)[0]
+                _count("loads", k)
+                return await _astore(k, ttl_hours, stale_hours, loader, tags)
+            finally:
+                await ards.eval(_RELEASE_LUA, 1, _lease_key(k), token)
+
+        await asyncio.sleep(LEASE_POLL_S)
+        data = await ards.get(k)
+        if data:
+            _count("coalesced_remote", k)
+            return _decode(k, data)[0]
+        if time.monotonic() > deadline:
+            print(f"⚠️ Cache lease wait timed out for {k}; loading anyway")
+            _count("lease_timeouts", k)
+            _count("loads", k)
+            return await _astore(k, ttl_hours, stale_hours, loader, tags)
+
+async def get_or_set_async(
+    name: str,
+    params: dict,
+    ttl_hours: float,
+    loader,
+    stale_hours: Optional[float] = None,
+    tags: Tags = None,
+):
+    """Same as get_or_set, for async handlers; `loader` is an async callable."""
+    k = _key(name, params)
+    hit = await _alookup(k)
+    if hit:
+        value, soft, delta = hit
+        reason = _needs_refresh(soft, delta)
+        if reason:
+            _note_refresh(k, reason)
+            _aschedule_refresh(k, ttl_hours, stale_hours, loader, tags)
+        else:
+            print(f"[CACHE HIT] {k}")
+        return value
+    print(f"[CACHE MISS] {k}")
+
+    fut = _ainflight.get(k)
+    if fut is not None:
+        _count("coalesced_local", k)
+        return await asyncio.shield(fut)
+
+    fut = _ainflight[k] = asyncio.get_running_loop().create_future()
+    try:
+        value = await _aload_under_lease(k, ttl_hours, stale_hours, loader, tags)
+        fut.set_result(value)
+        return value
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved when nobody was waiting
+        raise
+    finally:
+        _ainflight.pop(k, None)
+
+# ───────────────────  BATCH  ────────────────────
+# Many keys per round trip: L1 first, one MGET for the rest, one pipeline to
+# claim leases on the misses, and one to write them back (and release the
+# leases). Same single-flight and SWR rules as get_or_set, per key: a miss
+# another worker holds the lease on is waited for, not loaded twice, and a
+# stale key is refreshed by whoever wins its lease. A cached None reads as a miss.
+BatchTags = Optional[Callable[[dict, Any], Iterable[str]]]  # tags(params, value) for each entry
+
+def _l1_split(keys: List[str]):
+    hits, rest = {}, []
+    for i, k in enumerate(keys):
+        entry = l1.get(k)
+        if entry is not None:
+            _count("l1_hits", k)
+            hits[i] = (entry.value, entry.soft, entry.delta)
+        else:
+            rest.append(i)
+    return hits, rest
+
+def _merge_fetched(keys: List[str], hits: dict, rest: List[int], raw: list) -> dict:
+    for i, data in zip(rest, raw):
+        if data:
+            _count("l2_hits", keys[i])
+            hits[i] = _decode(keys[i], data)
+        else:
+            _count("misses", keys[i])
+    return hits
+
+def _batch_tags(tags: BatchTags, params_list: Sequence[dict], values: Sequence) -> Optional[List[List[str]]]:
+    if tags is None:
+        return None
+    return [list(tags(p, v)) for p, v in zip(params_list, values)]
+
+def _encode_many(keys: List[str], values: Sequence, ttl_hours: float, stale_hours: Optional[float], delta: float):
+    if keys and delta:
+        metrics.CACHE_LOAD_SECONDS.observe(delta, keys[0].split(":", 1)[0])
+    entries = []
+    for k, value in zip(keys, values):
+        payload, ex, soft, size = _wrap(value, ttl_hours, stale_hours, delta)
+        l1.put(k, value, size, L1_TTL_S, soft, delta)
+        entries.append((k, payload, ex))
+    return entries
+
+def _queue_writes(pipe, keys, values, ttl_hours, stale_hours, delta, tag_lists, token):
+    """SET (+ tags, + broadcast) each entry, releasing our lease on it if we hold one."""
+    for j, (k, payload, ex) in enumerate(_encode_many(keys, values, ttl_hours, stale_hours, delta)):
+        pipe.set(k, payload, ex=ex)
+        if tag_lists:
+            _tag_entry(pipe, k, tag_lists[j], ex)
+        pipe.publish(INVALIDATE_CHANNEL, _invalidation(k))
+        if token:
+            pipe.eval(_RELEASE_LUA, 1, _lease_key(k), token)
+
+def _queue_claims(pipe, keys: List[str], idx: Sequence[int], token: str, recheck: bool):
+    for i in idx:
+        pipe.set(_lease_key(keys[i]), token, nx=True, px=LEASE_TTL_MS)
+        if recheck:
+            pipe.get(keys[i])  # filled since our MGET?
+
+def _split_claims(idx: Sequence[int], res: list, recheck: bool) -> Tuple[List[int], dict]:
+    """(indexes whose lease we now hold, {index: payload} for keys already filled)."""
+    step = 2 if recheck else 1
+    owned = [i for i, ok in zip(idx, res[0::step]) if ok]
+    filled = {i: data for i, data in zip(idx, res[1::2]) if data} if recheck else {}
+    return owned, filled
+
+def _take_filled(keys: List[str], filled: dict, values: dict):
+    for i, data in filled.items():
+        _count("coalesced_remote", keys[i])
+        values[i] = _decode(keys[i], data)[0]
+
+def _stale_indexes(keys: List[str], hits: dict) -> List[int]:
+    stale = []
+    for i, (_, soft, delta) in hits.items():
+        reason = _needs_refresh(soft, delta)
+        if reason:
+            _note_refresh(keys[i], reason)
+            stale.append(i)
+    return stale
+
+def _claim_refresh(keys: List[str]) -> List[int]:
+    """Indexes of keys no one in this process is refreshing yet (now claimed)."""
+    with _inflight_lock:
+        free = [i for i, k in enumerate(keys) if k not in _refreshing]
+        _refreshing.update(keys[i] for i in free)
+    return free
+
+# sync
+def _claim(keys: List[str], idx: Sequence[int], token: str, recheck: bool = True):
+    pipe = rds.pipeline(transaction=False)
+    _queue_claims(pipe, keys, idx, token, recheck)
+    return _split_claims(idx, pipe.execute(), recheck)
+
+def _release_many(keys: List[str], idx: Sequence[int], token: str):
+    pipe = rds.pipeline(transaction=False)
+    for i in idx:
+        pipe.eval(_RELEASE_LUA, 1, _lease_key(keys[i]), token)
+    pipe.execute()
+
+def _get_entries(keys: List[str]) -> dict:
+    hits, rest = _l1_split(keys)
+    if rest:
+        raw = rds.mget([keys[i] for i in rest])
+        _merge_fetched(keys, hits, rest, raw)
+    return hits
+
+def _set_entries(
+    keys: List[str], values: Sequence, ttl_hours: float, stale_hours: Optional[float],
+    delta: float = 0.0, tag_lists: Optional[List[List[str]]] = None, token: Optional[str] = None,
+):
+    pipe = rds.pipeline(transaction=False)
+    _queue_writes(pipe, keys, values, ttl_hours, stale_hours, delta, tag_lists, token)
+    pipe.execute()
+
+def _load_entries(keys, params_list, idx, ttl_hours, stale_hours, loader, tags, token=None) -> dict:
+    """Run the loader for `idx` and store the results, releasing our leases either way."""
+    try:
+        start = time.perf_counter()
+        wanted = [params_list[i] for i in idx]
+        values = loader(wanted)
+        _set_entries(
+            [keys[i] for i in idx], values, ttl_hours, stale_hours,
+            time.perf_counter() - start, _batch_tags(tags, wanted, values), token,
+        )
+    except BaseException:
+        if token:
+            _release_many(keys, idx, token)
+        raise
+    return dict(zip(idx, values))
+
+def _load_many_under_lease(keys, params_list, missing, ttl_hours, stale_hours, loader, tags) -> dict:
+    """Values for the `missing` indexes: load those we win leases on, wait for the rest."""
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LEASE_TTL_MS / 1000
+    values, pending = {}, list(missing)
+    while True:
+        owned, filled = _claim(keys, pending, token)
+        _take_filled(keys, filled, values)
+        if any(i in values for i in owned):
+            _release_many(keys, [i for i in owned if i in values], token)
+        load = [i for i in owned if i not in values]
+        if load:
+            _count("loads", keys[load[0]])
+            values.update(_load_entries(keys, params_list, load, ttl_hours, stale_hours, loader, tags, token))
+
+        pending = [i for i in pending if i not in values]
+        if not pending:
+            return values
+        if time.monotonic() > deadline:
+            print(f"⚠️ Cache lease wait timed out for {len(pending)} keys; loading anyway")
+            _count("lease_timeouts", keys[pending[0]])
+            values.update(_load_entries(keys, params_list, pending, ttl_hours, stale_hours, loader, tags))
+            return values
+        time.sleep(LEASE_POLL_S)
+
+def get_many(name: str, params_list: Sequence[dict]) -> List[Any]:
+    """Cached values for each params, None where missing; one Redis round trip."""
+    keys = [_key(name, p) for p in params_list]
+    hits = _get_entries(keys)
+    return [hits[i][0] if i in hits else None for i in range(len(keys))]
+
+def set_many(
+    name: str, items: Sequence[Tuple[dict, Any]], ttl_hours: float,
+    stale_hours: Optional[float] = None, tags: BatchTags = None,
+):
+    """Store (params, value) pairs in one pipelined round trip."""
+    params_list, values = [p for p, _ in items], [v for _, v in items]
+    _set_entries(
+        [_key(name, p) for p in params_list], values, ttl_hours, stale_hours,
+        tag_lists=_batch_tags(tags, params_list, values),
+    )
+
+def _refresh_many(keys: List[str], params_list: list, ttl_hours: float, stale_hours: Optional[float], loader, tags: BatchTags):
+    token = uuid.uuid4().hex
+    try:
+        owned, _ = _claim(keys, range(len(keys)), token, recheck=False)
+        if owned:  # the rest are being refreshed by another worker
+            _count("refreshes", keys[owned[0]])
+            _load_entries(keys, params_list, owned, ttl_hours, stale_hours, loader, tags, token)
+    except Exception as e:
+        print(f"⚠️ Background refresh failed for {len(keys)} keys: {e}")
+    finally:
+        with _inflight_lock:
+            _refreshing.difference_update(keys)
+
+def get_or_set_many(
+    name: str,
+    params_list: Sequence[dict],
+    ttl_hours: float,
+    loader: Callable[[List[dict]], Sequence],
+    stale_hours: Optional[float] = None,
+    tags: BatchTags = None,
+) -> List[Any]:
+    """
+    Batch get_or_set: `loader(missing_params)` returns values in the same
+    order. It normally runs once per call, again only for keys whose lease
+    another worker gave up without storing them. Stale hits are served and
+    refreshed together in the background. tags(params, value) tags each entry.
+    """
+    keys = [_key(name, p) for p in params_list]
+    hits = _get_entries(keys)
+
+    stale = _stale_indexes(keys, hits)
+    if stale:
+        claimed = [stale[j] for j in _claim_refresh([keys[i] for i in stale])]
+        if claimed:
+            _refresh_pool.submit(
+                _refresh_many, [keys[i] for i in claimed], [params_list[i] for i in claimed],
+                ttl_hours, stale_hours, loader, tags,
+            )
+
+    missing = [i for i in range(len(keys)) if i not in hits]
+    if missing:
+        print(f"[CACHE MISS] {name} x{len(missing)}")
+        loaded = _load_many_under_lease(keys, params_list, missing, ttl_hours, stale_hours, loader, tags)
+        for i, value in loaded.items():
+            hits[i] = (value, None, 0.0)
+    return [hits[i][0] for i in range(len(keys))]
+
+# async twins
+async def _aclaim(keys: List[str], idx: Sequence[int], token: str, recheck: bool = True):
+    async with ards.pipeline(transaction=False) as pipe:
+        _queue_claims(pipe, keys, idx, token, recheck)
+        return _split_claims(idx, await pipe.execute(), recheck)
+
+async def _arelease_many(keys: List[str], idx: Sequence[int], token: str):
+    async with ards.pipeline(transaction=False) as pipe:
+        for i in idx:
+            pipe.eval(_RELEASE_LUA, 1, _lease_key(keys[i]), token)
+        await pipe.execute()
+
+async def _aget_entries(keys: List[str]) -> dict:
+    hits, rest = _l1_split(keys)
+    if rest:
+        raw = await ards.mget([keys[i] for i in rest])
+        _merge_fetched(keys, hits, rest, raw)
+    return hits
+
+async def _aset_entries(
+    keys: List[str], values: Sequence, ttl_hours: float, stale_hours: Optional[float],
+    delta: float = 0.0, tag_lists: Optional[List[List[str]]] = None, token: Optional[str] = None,
+):
+    async with ards.pipeline(transaction=False) as pipe:
+        _queue_writes(pipe, keys, values, ttl_hours, stale_hours, delta, tag_lists, token)
+        await pipe.execute()
+
+async def _aload_entries(keys, params_list, idx, ttl_hours, stale_hours, loader, tags, token=None) -> dict:
+    try:
+        start = time.perf_counter()
+        wanted = [params_list[i] for i in idx]
+        values = await loader(wanted)
+        await _aset_entries(
+            [keys[i] for i in idx], values, ttl_hours, stale_hours,
+            time.perf_counter() - start, _batch_tags(tags, wanted, values), token,
+        )
+    except BaseException:
+        if token:
+            await _arelease_many(keys, idx, token)
+        raise
+    return dict(zip(idx, values))
+
+async def _aload_many_under_lease(keys, params_list, missing, ttl_hours, stale_hours, loader, tags) -> dict:
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LEASE_TTL_MS / 1000
+    values, pending = {}, list(missing)
+    while True:
+        owned, filled = await _aclaim(keys, pending, token)
+        _take_filled(keys, filled, values)
+        if any(i in values for i in owned):
+            await _arelease_many(keys, [i for i in owned if i in values], token)
+        load = [i for i in owned if i not in values]
+        if load:
+            _count("loads", keys[load[0]])
+            values.update(await _aload_entries(keys, params_list, load, ttl_hours, stale_hours, loader, tags, token))
+
+        pending = [i for i in pending if i not in values]
+        if not pending:
+            return values
+        if time.monotonic() > deadline:
+            print(f"⚠️ Cache lease wait timed out for {len(pending)} keys; loading anyway")
+            _count("lease_timeouts", keys[pending[0]])
+            values.update(await _aload_entries(keys, params_list, pending, ttl_hours, stale_hours, loader, tags))
+            return values
+        await asyncio.sleep(LEASE_POLL_S)
+
+async def get_many_async(name: str, params_list: Sequence[dict]) -> List[Any]:
+    keys = [_key(name, p) for p in params_list]
+    hits = await _aget_entries(keys)
+    return [hits[i][0] if i in hits else None for i in range(len(keys))]
+
+async def set_many_async(
+    name: str, items: Sequence[Tuple[dict, Any]], ttl_hours: float,
+    stale_hours: Optional[float] = None, tags: BatchTags = None,
+):
+    params_list, values = [p for p, _ in items], [v for _, v in items]
+    await _aset_entries(
+        [_key(name, p) for p in params_list], values, ttl_hours, stale_hours,
+        tag_lists=_batch_tags(tags, params_list, values),
+    )
+
+async def _arefresh_many(keys: List[str], params_list: list, ttl_hours: float, stale_hours: Optional[float], loader, tags: BatchTags):
+    token = uuid.uuid4().hex
+    try:
+        owned, _ = await _aclaim(keys, range(len(keys)), token, recheck=False)
+        if owned:
+            _count("refreshes", keys[owned[0]])
+            await _aload_entries(keys, params_list, owned, ttl_hours, stale_hours, loader, tags, token)
+    except Exception as e:
+        print(f"⚠️ Background refresh failed for {len(keys)} keys: {e}")
+    finally:
+        _refreshing.difference_update(keys)
+
+async def get_or_set_many_async(
+    name: str,
+    params_list: Sequence[dict],
+    ttl_hours: float,
+    loader,
+    stale_hours: Optional[float] = None,
+    tags: BatchTags = None,
+) -> List[Any]:
+    """Same as get_or_set_many, for async handlers; `loader` is an async callable."""
+    keys = [_key(name, p) for p in params_list]
+    hits = await _aget_entries(keys)
+
+    stale = _stale_indexes(keys, hits)
+    if stale:
+        claimed = [stale[j] for j in _claim_refresh([keys[i] for i in stale])]
+        if claimed:
+            task = asyncio.get_running_loop().create_task(_arefresh_many(
+                [keys[i] for i in claimed], [params_list[i] for i in claimed],
+                ttl_hours, stale_hours, loader, tags,
+            ))
+            _arefresh_tasks.add(task)
+            task.add_done_callback(_arefresh_tasks.discard)
+
+    missing = [i for i in range(len(keys)) if i not in hits]
+    if missing:
+        print(f"[CACHE MISS] {name} x{len(missing)}")
+        loaded = await _aload_many_under_lease(keys, params_list, missing, ttl_hours, stale_hours, loader, tags)
+        for i, value in loaded.items():
+            hits[i] = (value, None, 0.0)
+    return [hits[i][0] for i in range(len(keys))]
@@ -0,0 +1,177 @@
+# services/response_cache.py
+"""
+Durable on-disk cache for third-party detail lookups.
+
+Place details, Foursquare details/tips and name searches barely change from
+one run to the next, yet every script re-fetched (and re-paid for) them.
+This keeps them in one SQLite file shared by every script and worker on the
+machine, so a re-run or a run resumed after a crash only pays for what it
+hasn't seen.
+
+Rows are one field of one response — (endpoint, key, field) — each with its
+own expiry, so hours can go stale after a week while an address is kept for
+months, and a caller asking for fields A+B when A is cached only fetches B.
+A lookup that came back "not found" is remembered too, for a shorter time.
+Values are stored as JSON; a cached None means the provider had no value.
+
+SQLite runs in WAL mode so concurrent readers never block on a writer.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+from core.config import get_settings
+from core.metrics import CACHE_LOOKUPS
+
+cfg = get_settings()
+
+DAY = 86400
+DEFAULT_TTL_S = 14 * DAY
+NOT_FOUND_TTL_S = 3 * DAY
+FIELD_TTL_S = {
+    # Google Place Details
+    "opening_hours": 7 * DAY,
+    "rating": 7 * DAY,
+    "user_ratings_total": 7 * DAY,
+    "price_level": 30 * DAY,
+    "website": 30 * DAY,
+    "editorial_summary": 60 * DAY,
+    "types": 60 * DAY,
+    "name": 60 * DAY,
+    "formatted_address": 180 * DAY,
+    "geometry": 180 * DAY,
+    # Foursquare
+    "tips": 14 * DAY,
+    "popularity": 7 * DAY,
+    "fsq_id": 90 * DAY,
+    "place_id": 90 * DAY,
+}
+_NOT_FOUND = "!not_found"  # reserved field name for negative entries
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    endpoint TEXT NOT NULL,
+    key      TEXT NOT NULL,
+    field    TEXT NOT NULL,
+    value    BLOB,
+    expires  REAL NOT NULL,
+    PRIMARY KEY (endpoint, key, field)
+) WITHOUT ROWID
+"""
+
+Fetch = Callable[[List[str]], Optional[dict]]
+AsyncFetch = Callable[[List[str]], Awaitable[Optional[dict]]]
+
+
+class ResponseCache:
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self._local = threading.local()  # sqlite3 connections are per thread
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ───────────────────  READ / WRITE  ────────────────────
+    def lookup(self, endpoint: str, key: str, fields: Sequence[str]) -> Tuple[Optional[dict], List[str]]:
+        """
+        (fresh cached fields, fields still to fetch). (None, []) means the key
+        is cached as not found.
+        """
+        if not self.enabled:
+            return {}, list(fields)
+        wanted = list(dict.fromkeys(fields)) + [_NOT_FOUND]
+        placeholders = ",".join("?" * len(wanted))
+        rows = self._conn().execute(
+            "SELECT field, value FROM responses WHERE endpoint = ? AND key = ? AND expires > ?"
+            f" AND field IN ({placeholders})",
+            (endpoint, key, time.time(), *wanted),
+        ).fetchall()
+        found = {field: orjson.loads(value) for field, value in rows}
+        if _NOT_FOUND in found:
+            CACHE_LOOKUPS.inc(endpoint, "disk")
+            return None, []
+        missing = [f for f in wanted[:-1] if f not in found]
+        CACHE_LOOKUPS.inc(endpoint, "miss" if missing else "disk")
+        return found, missing
+
+    def store(self, endpoint: str, key: str, values: Dict[str, object], ttl_s: Optional[float] = None):
+        if not self.enabled or not values:
+            return
+        now = time.time()
+        rows = [
+            (endpoint, key, field, orjson.dumps(value), now + (ttl_s or FIELD_TTL_S.get(field, DEFAULT_TTL_S)))
+            for field, value in values.items()
+        ]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM responses WHERE endpoint = ? AND key = ? AND field = ?", (endpoint, key, _NOT_FOUND))
+            conn.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def store_not_found(self, endpoint: str, key: str, ttl_s: float = NOT_FOUND_TTL_S):
+        if not self.enabled:
+            return
+        self._conn().execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (endpoint, key, _NOT_FOUND, b"null", time.time() + ttl_s),
+        )
+
+    def invalidate(self, endpoint: str, key: str):
+        if self.enabled:
+            self._conn().execute("DELETE FROM responses WHERE endpoint = ? AND key = ?", (endpoint, key))
+
+    def purge_expired(self) -> int:
+        if not self.enabled:
+            return 0
+        return self._conn().execute("DELETE FROM responses WHERE expires <= ?", (time.time(),)).rowcount
+
+    # ───────────────────  READ-THROUGH  ────────────────────
+    def _merge(self, endpoint: str, key: str, found: dict, missing: List[str], fetched: Optional[dict]) -> Optional[dict]:
+        if fetched is None:
+            self.store_not_found(endpoint, key)
+            return None
+        fetched = {f: fetched.get(f) for f in missing}
+        self.store(endpoint, key, fetched)
+        return found | fetched
+
+    def fields(self, endpoint: str, key: str, fields: Sequence[str], fetch: Fetch) -> Optional[dict]:
+        """
+        `fields` for `key`, calling fetch(missing_fields) only for what isn't
+        cached. fetch returns {field: value} or None for "not found"; its
+        exceptions propagate and nothing is cached.
+        """
+        found, missing = self.lookup(endpoint, key, fields)
+        if found is None:
+            return None
+        if not missing:
+            return found
+        return self._merge(endpoint, key, found, missing, fetch(missing))
+
+    async def afields(self, endpoint: str, key: str, fields: Sequence[str], fetch: AsyncFetch) -> Optional[dict]:
+        found, missing = self.lookup(endpoint, key, fields)
+        if found is None:
+            return None
+        if not missing:
+            return found
+        return self._merge(endpoint, key, found, missing, await fetch(missing))
+
+
+response_cache = ResponseCache(cfg.RESPONSE_CACHE_PATH, cfg.RESPONSE_CACHE_ENABLED)
@@ -0,0 +1,193 @@
+# services/venue_filters.py
+"""
+Discover filters and the bitmap index that evaluates them.
+
+Each indexed attribute value (category name, price level, half-point rating
+bucket, nightlife flag) maps to a bitmap — a Python int whose bit i is set
+when slot i of the venue index has that value. The planner ANDs the predicate
+bitmaps smallest-first, so combined filters shrink the candidate set before
+any distance math runs and get cheaper, not more expensive.
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.hours import venue_open_at
+
+
+# ───────────────────  FILTERS  ────────────────────
+def category_matches(needle: str, name) -> bool:
+    """The one category rule, for both the bitmap and row-at-a-time paths:
+    `needle` is contained in a single category name, case-insensitive."""
+    return needle.lower() in str(name).lower()
+
+
+@dataclass(frozen=True)
+class VenueFilters:
+    category: Optional[str] = None
+    price_levels: Tuple[int, ...] = ()
+    min_rating: Optional[float] = None
+    nightlife: Optional[bool] = None
+    open_at: Optional[datetime] = None  # naive = each venue's local wall time
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.category or self.price_levels or self.min_rating is not None
+            or self.nightlife is not None or self.open_at is not None
+        )
+
+    def matches(self, data: dict) -> bool:
+        """Row-at-a-time check, for paths that don't have a bitmap index."""
+        if self.category and not any(category_matches(self.category, c) for c in data.get("categories") or []):
+            return False
+        if self.price_levels and data.get("price_level") not in self.price_levels:
+            return False
+        if self.min_rating is not None and (data.get("rating") is None or data["rating"] < self.min_rating):
+            return False
+        if self.nightlife is not None and bool(data.get("is_nightlife")) != self.nightlife:
+            return False
+        if self.open_at is not None and not venue_open_at(data, self.open_at):
+            return False
+        return True
+
+    def residual(self) -> Optional[Callable[[dict], bool]]:
+        """Per-row check for what the bitmap planner can't answer (opening hours)."""
+        if self.open_at is None:
+            return None
+        return lambda data: venue_open_at(data, self.open_at)
+
+
+# ───────────────────  BITMAPS  ────────────────────
+def _rating_bucket(rating: float) -> int:
+    return math.floor(rating * 2)  # half-point buckets
+
+
+def bitmap_from_slots(slots, size: int) -> int:
+    mask = np.zeros(size, dtype=bool)
+    mask[slots] = True
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def bitmap_to_mask(bitmap: int, size: int) -> np.ndarray:
+    raw = np.frombuffer(bitmap.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[:size].astype(bool)
+
+
+class BitmapIndex:
+    def __init__(self, rows: List[dict]):
+        self.size = 0
+        self.all = 0  # live slots
+        self.categories: Dict[str, int] = {}
+        self.price: Dict[int, int] = {}
+        self.rating: Dict[int, int] = {}
+        self.nightlife = 0
+        self._ratings = np.full(len(rows), np.nan)
+        self._category_cache: Dict[str, int] = {}
+
+        for slot, data in enumerate(rows):
+            self.add(slot, data)
+
+    def copy(self) -> "BitmapIndex":
+        """Independent copy to mutate while readers keep using this one."""
+        clone = BitmapIndex([])
+        clone.size, clone.all, clone.nightlife = self.size, self.all, self.nightlife
+        clone.categories, clone.price, clone.rating = dict(self.categories), dict(self.price), dict(self.rating)
+        clone._ratings = self._ratings.copy()
+        return clone
+
+    @staticmethod
+    def _keys(data: dict):
+        """(table name, value) pairs a venue contributes bits to."""
+        for cat in data.get("categories") or []:
+            yield "categories", str(cat).lower()
+        if data.get("price_level") is not None:
+            yield "price", data["price_level"]
+        if data.get("rating") is not None:
+            yield "rating", _rating_bucket(data["rating"])
+
+    def add(self, slot: int, data: dict):
+        bit = 1 << slot
+        for table, key in self._keys(data):
+            bitmaps = getattr(self, table)
+            bitmaps[key] = bitmaps.get(key, 0) | bit
+        if data.get("is_nightlife"):
+            self.nightlife |= bit
+        if slot >= len(self._ratings):
+            grown = np.full(max(slot + 1, 2 * len(self._ratings)), np.nan)
+            grown[: len(self._ratings)] = self._ratings
+            self._ratings = grown
+        if data.get("rating") is not None:
+            self._ratings[slot] = data["rating"]
+        self.all |= bit
+        self.size = max(self.size, slot + 1)
+        self._category_cache.clear()
+
+    def remove(self, slot: int, data: dict):
+        keep = ~(1 << slot)
+        for table, key in self._keys(data):
+            bitmaps = getattr(self, table)
+            bits = bitmaps.get(key, 0) & keep
+            if bits:
+                bitmaps[key] = bits
+            else:
+                bitmaps.pop(key, None)
+        self.nightlife &= keep
+        self.all &= keep
+        self._ratings[slot] = np.nan
+        self._category_cache.clear()
+
+    def category_bitmap(self, needle: str) -> int:
+        """Union of every category whose name contains `needle` (case-insensitive)."""
+        needle = needle.lower()
+        bm = self._category_cache.get(needle)
+        if bm is None:
+            bm = 0
+            for name, bits in self.categories.items():
+                if category_matches(needle, name):
+                    bm |= bits
+            self._category_cache[needle] = bm
+        return bm
+
+    def rating_bitmap(self, min_rating: float) -> int:
+        """Whole buckets above the threshold, plus the exact matches from its own bucket."""
+        edge = _rating_bucket(min_rating)
+        bm = 0
+        for b, bits in self.rating.items():
+            if b > edge:
+                bm |= bits
+        edge_bits = self.rating.get(edge, 0)
+        if edge_bits:
+            slots = np.flatnonzero(bitmap_to_mask(edge_bits, self.size))
+            bm |= bitmap_from_slots(slots[self._ratings[slots] >= min_rating], self.size)
+        return bm
+
+    def plan(self, filters: VenueFilters) -> Optional[int]:
+        """
+        Bitmap of the slots passing every filter, or None when nothing is filtered.
+        Predicates are intersected most-selective first and bail out once empty.
+        """
+        predicates = []
+        if filters.category:
+            predicates.append(self.category_bitmap(filters.category))
+        if filters.price_levels:
+            bm = 0
+            for level in filters.price_levels:
+                bm |= self.price.get(level, 0)
+            predicates.append(bm)
+        if filters.min_rating is not None:
+            predicates.append(self.rating_bitmap(filters.min_rating))
+        if filters.nightlife is not None:
+            predicates.append(self.nightlife if filters.nightlife else self.all & ~self.nightlife)
+        if not predicates:
+            return None
+
+        predicates.sort(key=int.bit_count)
+        result = self.all
+        for bm in predicates:
+            result &= bm
+            if not result:
+                break
+        return result
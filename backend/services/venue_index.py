@@ -0,0 +1,297 @@
+# services/venue_index.py
+"""
+Process-resident spatial index over the flat `venues` collection.
+
+Venues are bucketed into a fixed lat/lng grid once at startup, so a radius
+query only visits the handful of cells overlapping the search circle instead
+of streaming every Firestore document on every request. Coordinates live in
+contiguous arrays and candidates are measured in one batched pass (services/geo.py).
+"""
+import heapq
+import math
+import sys
+from collections import defaultdict
+from threading import RLock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.timing import note, span
+from services.geo import bounding_box, coords_array, within_radius, DISCOVER_RADIUS_M
+from services.pagination import CursorKey
+from services.venue_filters import BitmapIndex, VenueFilters, bitmap_to_mask
+
+# ───────────────────  CONSTANTS  ────────────────────
+CELL_DEG = 0.1                # ~11 km of latitude per grid cell
+
+# Fields the discover endpoint serves straight from the index
+INDEX_FIELDS = [
+    "name", "location", "categories", "city", "price_level", "rating", "is_nightlife",
+    "hours_intervals", "timezone",
+]
+
+Cell = Tuple[int, int]
+
+
+# ───────────────────  HELPERS  ────────────────────
+def _coords(data: dict) -> Optional[Tuple[float, float]]:
+    loc = data.get("location") or {}
+    lat, lng = loc.get("lat"), loc.get("lng")
+    if lat is None or lng is None:
+        return None
+    return float(lat), float(lng)
+
+
+# ───────────────────  INDEX  ────────────────────
+class VenueIndex:
+    """
+    Slots are append-only between rebuilds: a deleted venue leaves a tombstone
+    rather than having its slot reused, so a query holding an older snapshot
+    never sees a slot change identity under it. Tombstones are compacted away
+    once they pile up.
+
+    Readers take references to the arrays, lists and bitmaps under the lock
+    and use them after releasing it. A change batch therefore never mutates
+    those in place: under the lock it swaps in private copies (_fork) and
+    edits only those, so a snapshot taken earlier never changes under a reader.
+    """
+
+    def __init__(self, cell_deg: float = CELL_DEG):
+        self.cell_deg = cell_deg
+        self.version = 0
+        self.ready = False
+        self._lock = RLock()
+        self._ids: List[Optional[str]] = []
+        self._data: List[Optional[dict]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._lat = np.empty(0, dtype=np.float64)
+        self._lng = np.empty(0, dtype=np.float64)
+        self._cells: Dict[Cell, np.ndarray] = {}
+        self._bitmaps = BitmapIndex([])
+        self._tombstones = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def get(self, venue_id: str) -> Optional[dict]:
+        with self._lock:
+            slot = self._slot_of.get(venue_id)
+            return None if slot is None else self._data[slot]
+
+    def memory_stats(self) -> dict:
+        """Rough footprint of the arrays and bitmaps (venue dicts themselves not counted)."""
+        with self._lock:
+            bitmaps = self._bitmaps
+            tables = [bitmaps.categories, bitmaps.price, bitmaps.rating]
+            return {
+                "venues": len(self._slot_of),
+                "slots": len(self._ids),
+                "tombstones": self._tombstones,
+                "version": self.version,
+                "cells": len(self._cells),
+                "coord_bytes": self._lat.nbytes + self._lng.nbytes,
+                "cell_bytes": sum(a.nbytes for a in self._cells.values()),
+                "bitmap_bytes": sum(sys.getsizeof(b) for t in tables for b in t.values())
+                + sys.getsizeof(bitmaps.nightlife) + sys.getsizeof(bitmaps.all),
+            }
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def _next_version(self, version: Optional[int]) -> int:
+        # Callers may pass a version derived from the data (e.g. the replica's
+        # fingerprint), which is kept as-is so workers agree; else just count
+        return self.version + 1 if version is None else version
+
+    def load(self, items: List[Tuple[str, dict]], version: Optional[int] = None):
+        """(Re)build from (venue_id, data) pairs."""
+        ids, data, points = [], [], []
+        for venue_id, d in items:
+            coords = _coords(d)
+            if coords is None:
+                continue  # can't place it on the map
+            ids.append(venue_id)
+            data.append(d)
+            points.append(coords)
+
+        lats, lngs = coords_array(points)
+        buckets = defaultdict(list)
+        for slot, (lat, lng) in enumerate(points):
+            buckets[self._cell(lat, lng)].append(slot)
+        cells = {cell: np.asarray(slots, dtype=np.intp) for cell, slots in buckets.items()}
+        bitmaps = BitmapIndex(data)
+
+        with self._lock:
+            self._ids, self._data = ids, data
+            self._slot_of = {venue_id: slot for slot, venue_id in enumerate(ids)}
+            self._lat, self._lng = lats, lngs
+            self._cells = cells
+            self._bitmaps = bitmaps
+            self._tombstones = 0
+            self.version = self._next_version(version)
+            self.ready = True
+
+    def build(self, docs: Iterable, version: Optional[int] = None):
+        """(Re)build from Firestore document snapshots."""
+        self.load([(doc.id, doc.to_dict() or {}) for doc in docs], version)
+
+    # ───────────────────  INCREMENTAL  ────────────────────
+    def _fork(self):
+        """Copy everything a change batch mutates; snapshots already handed out stay frozen."""
+        self._ids, self._data = list(self._ids), list(self._data)
+        self._lat, self._lng = self._lat.copy(), self._lng.copy()
+        self._cells = dict(self._cells)
+        self._bitmaps = self._bitmaps.copy()
+
+    def _cell_add(self, cell: Cell, slot: int):
+        self._cells[cell] = np.append(self._cells.get(cell, np.empty(0, dtype=np.intp)), slot)
+
+    def _cell_remove(self, cell: Cell, slot: int):
+        remaining = self._cells[cell][self._cells[cell] != slot]
+        if len(remaining):
+            self._cells[cell] = remaining
+        else:
+            del self._cells[cell]
+
+    def _remove(self, venue_id: str):
+        slot = self._slot_of.pop(venue_id, None)
+        if slot is None:
+            return
+        self._cell_remove(self._cell(self._lat[slot], self._lng[slot]), slot)
+        self._bitmaps.remove(slot, self._data[slot])
+        self._ids[slot], self._data[slot] = None, None
+        self._tombstones += 1
+
+    def _upsert(self, venue_id: str, data: dict):
+        coords = _coords(data)
+        if coords is None:
+            self._remove(venue_id)  # lost its location → no longer on the map
+            return
+
+        slot = self._slot_of.get(venue_id)
+        if slot is None:
+            slot = len(self._ids)
+            self._ids.append(venue_id)
+            self._data.append(data)
+            self._slot_of[venue_id] = slot
+            if slot >= len(self._lat):
+                cap = max(16, 2 * len(self._lat))
+                self._lat = np.resize(self._lat, cap)
+                self._lng = np.resize(self._lng, cap)
+        else:
+            old_cell = self._cell(self._lat[slot], self._lng[slot])
+            if old_cell != self._cell(*coords):
+                self._cell_remove(old_cell, slot)
+            self._bitmaps.remove(slot, self._data[slot])
+            self._data[slot] = data
+
+        cell = self._cell(*coords)
+        self._lat[slot], self._lng[slot] = coords
+        if slot not in self._cells.get(cell, ()):
+            self._cell_add(cell, slot)
+        self._bitmaps.add(slot, data)
+
+    def apply_changes(self, changes: Iterable[Tuple[str, Optional[dict]]], version: Optional[int] = None):
+        """
+        Apply (venue_id, data) changes as one copy-on-write batch; data=None deletes. Sets the
+        version once per batch (to `version` if given, else the next count), and compacts when tombstones exceed a quarter of the slots.
+        """
+        with self._lock:
+            self._fork()
+            for venue_id, data in changes:
+                if data is None:
+                    self._remove(venue_id)
+                else:
+                    self._upsert(venue_id, data)
+            self.version = self._next_version(version)
+
+            if self._tombstones > max(64, len(self._ids) // 4):
+                live = [(vid, d) for vid, d in zip(self._ids, self._data) if vid is not None]
+                self.load(live, self.version)
+
+    def cells_for(self, lat: float, lng: float, radius_m: float) -> List[Cell]:
+        """Grid cells overlapping the bounding box of the search circle."""
+        lat_lo, lat_hi, lng_lo, lng_hi = bounding_box(lat, lng, radius_m)
+        i_lo, j_lo = self._cell(lat_lo, lng_lo)
+        i_hi, j_hi = self._cell(lat_hi, lng_hi)
+        return [(i, j) for i in range(i_lo, i_hi + 1) for j in range(j_lo, j_hi + 1)]
+
+    def _candidates(self, lat: float, lng: float, radius_m: float, filters: Optional[VenueFilters] = None):
+        """Snapshot of (ids, data, slots, dists) for every venue inside the circle."""
+        with self._lock:
+            ids, data = self._ids, self._data
+            lats, lngs = self._lat, self._lng
+            bitmaps = self._bitmaps
+            hits = [self._cells[c] for c in self.cells_for(lat, lng, radius_m) if c in self._cells]
+
+        # Attribute filters run first, as bitmaps, so distance math only sees survivors
+        allowed = bitmaps.plan(filters) if filters else None
+        if not hits or allowed == 0:
+            return ids, data, np.empty(0, dtype=np.intp), np.empty(0)
+        slots = np.concatenate(hits)
+        if allowed is not None:
+            slots = slots[bitmap_to_mask(allowed, bitmaps.size)[slots]]
+        pos, dists = within_radius(lat, lng, lats[slots], lngs[slots], radius_m)
+        return ids, data, slots[pos], dists
+
+    def query(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: float = DISCOVER_RADIUS_M,
+        predicate: Optional[Callable[[dict], bool]] = None,
+    ) -> List[dict]:
+        """Venues within `radius_m` of (lat, lng), nearest first."""
+        ids, data, slots, dists = self._candidates(lat, lng, radius_m)
+
+        nearby = []
+        for i in np.argsort(dists, kind="stable"):
+            venue = data[slots[i]]
+            if venue is None:
+                continue  # tombstone of a deleted venue
+            if predicate and not predicate(venue):
+                continue
+            nearby.append(venue | {"id": ids[slots[i]], "distance": float(dists[i])})
+        return nearby
+
+    def top_k(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        after: Optional[CursorKey] = None,
+        radius_m: float = DISCOVER_RADIUS_M,
+        predicate: Optional[Callable[[dict], bool]] = None,
+        filters: Optional[VenueFilters] = None,
+    ) -> List[dict]:
+        """
+        The k nearest venues ordered by (distance, id), resuming strictly after
+        `after` when given. Only the k winners are materialized as dicts.
+        """
+        with span("index_candidates"):
+            ids, data, slots, dists = self._candidates(lat, lng, radius_m, filters)
+        note(candidates=len(slots))
+        residual = filters.residual() if filters else None
+        if after is not None:
+            keep = dists >= after[0]
+            slots, dists = slots[keep], dists[keep]
+
+        def rows():
+            for slot, dist in zip(slots.tolist(), dists.tolist()):
+                key = (dist, ids[slot])
+                if key[1] is None:
+                    continue  # tombstone of a deleted venue
+                if after is not None and key <= after:
+                    continue
+                if predicate and not predicate(data[slot]):
+                    continue
+                if residual and not residual(data[slot]):
+                    continue
+                yield key + (slot,)
+
+        with span("index_rank"):
+            best = heapq.nsmallest(k, rows())
+            return [data[slot] | {"id": venue_id, "distance": dist} for dist, venue_id, slot in best]
+
+
+venue_index = VenueIndex()
@@ -0,0 +1,97 @@
+# services/venue_replica.py
+"""
+Live in-process replica of the flat `venues` collection.
+
+The first `on_snapshot` delivery loads the whole collection into the venue
+index; every later delivery carries only the documents the enrichment scripts
+touched, which are applied to the index incrementally. The dataset version
+is a fingerprint of the data itself — each document's id and update time,
+XORed together — so every worker holding the same documents agrees on it, no
+matter when it started or how its deliveries were batched. Cursors and ETags
+build on it. Listeners hear about each applied batch, e.g. to drop cached tiles for venues
+edited by something other than our own write paths.
+"""
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.venue_index import VenueIndex, INDEX_FIELDS
+
+Change = Tuple[str, Optional[dict], Optional[dict]]  # (venue_id, old data, new data); None = absent
+ChangeListener = Callable[[List[Change], int], None]
+
+
+def _project(data: Optional[dict]) -> dict:
+    # Listeners can't use .select(), so trim to what the index serves
+    return {k: v for k, v in (data or {}).items() if k in INDEX_FIELDS}
+
+
+def _stamp(doc) -> int:
+    """63-bit hash of one document's id and last update time."""
+    raw = f"{doc.id}@{getattr(doc, 'update_time', None)}".encode()
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big") >> 1
+
+
+def dataset_version(docs: Iterable) -> int:
+    """The version of a full collection read; the same on every worker for the same documents."""
+    version = 0
+    for doc in docs:
+        version ^= _stamp(doc)
+    return version
+
+
+class VenueReplica:
+    def __init__(self, index: VenueIndex, collection):
+        self.index = index
+        self.collection = collection
+        self._watch = None
+        self._loaded = threading.Event()
+        self._listeners: List[ChangeListener] = []
+        self._stamps: Dict[str, int] = {}  # venue_id -> _stamp, to XOR out on change
+        self._version = 0
+
+    def subscribe(self, listener: ChangeListener):
+        """listener(changes, version) runs on the watch thread after each incremental batch is applied."""
+        self._listeners.append(listener)
+
+    def start(self, timeout: float = 30.0) -> bool:
+        """Subscribe and block until the initial load lands (or `timeout` passes)."""
+        self._watch = self.collection.on_snapshot(self._on_snapshot)
+        return self._loaded.wait(timeout)
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def _on_snapshot(self, docs, changes, read_time):
+        if not self._loaded.is_set():
+            self._stamps = {doc.id: _stamp(doc) for doc in docs}
+            self._version = dataset_version(docs)
+            self.index.load([(doc.id, _project(doc.to_dict())) for doc in docs], self._version)
+            self._loaded.set()
+            print(f"📦 Venue replica loaded {len(self.index)} venues (v{self.index.version})")
+            return
+
+        batch = [
+            (change.document.id, None if change.type.name == "REMOVED" else _project(change.document.to_dict()))
+            for change in changes
+        ]
+        if not batch:
+            return
+        for change in changes:
+            venue_id = change.document.id
+            self._version ^= self._stamps.pop(venue_id, 0)
+            if change.type.name != "REMOVED":
+                self._stamps[venue_id] = _stamp(change.document)
+                self._version ^= self._stamps[venue_id]
+
+        changed = [(venue_id, self.index.get(venue_id), data) for venue_id, data in batch]
+        self.index.apply_changes(batch, self._version)
+        print(f"↻ Venue replica applied {len(batch)} change(s) (v{self.index.version})")
+
+        for listener in self._listeners:
+            try:
+                listener(changed, self.index.version)
+            except Exception as e:
+                print(f"⚠️ Replica listener error: {e}")
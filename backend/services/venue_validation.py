@@ -1,8 +1,7 @@
 # services/venue_validation.py
 import re
-from datetime import time
-from typing import Optional
 from services.instagram import validate_instagram
+from services.hours import closes_late, hours_intervals
 
 # ───────────────────  CONSTANTS  ────────────────────
 WHITELIST = {
@@ -66,38 +65,17 @@ def _count_kw(text: str) -> int:
 def _is_beauty_salon(text: str) -> bool:
     return "salon" in text and any(word in text for word in BEAUTY_TERMS)
 
-def _has_late_hours(hours: Optional[dict]) -> bool:
+def _has_late_hours(v: dict) -> bool:
     """
     Returns True if venue ever closes 23:00‑06:00.
 
-    Accepts these per‑day shapes:
-      [('11:00', '02:00')]        # normal pair
-      ['11:00-02:00']             # single string
-      ['11:00', '02:00']          # orphaned 2‑item list
-    Silently ignores malformed blocks.
+    Uses the precomputed `hours_intervals` when the venue has them, else
+    parses `hours` (Google text or the older ISO pair shapes) on the spot.
     """
-    if not hours:
-        return False
-
-    for blocks in hours.values():
-        for block in blocks:
-            # case 1: tuple/list pair
-            if isinstance(block, (list, tuple)) and len(block) == 2:
-                _, close_str = block
-            # case 2: single 'open-close' string
-            elif isinstance(block, str) and "-" in block:
-                _, close_str = block.split("-", 1)
-            else:
-                continue  # unknown → skip
-
-            try:
-                close_t = time.fromisoformat(close_str)
-            except ValueError:
-                continue
-
-            if close_t >= time(23, 0) or close_t < time(6, 0):
-                return True
-    return False
+    intervals = v.get("hours_intervals")
+    if intervals is None:
+        intervals = hours_intervals(v.get("hours"))
+    return bool(intervals) and closes_late(intervals)
 
 # ───────────────────  MAIN  ────────────────────
 # services/venue_validation.py
@@ -107,7 +85,6 @@ def validate_venue(v: dict) -> bool:
     types  = [t.lower() for t in v.get("types", [])]
     cats   = [c.lower() for c in v.get("categories", [])]
     site   = v.get("website", "")
-    hours  = v.get("hours")  # dict or None
     blob   = " ".join([name, *types, *cats])
 
     # 0. Whitelist wins
@@ -143,7 +120,7 @@ def validate_venue(v: dict) -> bool:
         score += 15
 
     # 7. Late night hours
-    if _has_late_hours(hours):
+    if _has_late_hours(v):
         score += 10
 
     return score >= THRESHOLD
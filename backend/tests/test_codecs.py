@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from services.codecs import MAGIC, Codec
+
+VENUES = [
+    {"name": f"Bar {i}", "location": {"lat": 34.1, "lng": -118.3}, "tips": ["great drinks"] * 5, "rating": 8.4}
+    for i in range(50)
+]
+
+@pytest.mark.parametrize("serializer", ["msgpack", "json"])
+@pytest.mark.parametrize("compression", ["auto", "zlib", "none"])
+def test_round_trip(serializer, compression):
+    codec = Codec(serializer, compression)
+    data, size = codec.encode(VENUES)
+    assert data.startswith(MAGIC)
+    assert Codec.decode(data) == (VENUES, size)
+
+def test_small_values_skip_compression():
+    codec = Codec("msgpack", "zlib", compress_min=1024)
+    small, _ = codec.encode({"a": 1})
+    large, _ = codec.encode(VENUES)
+    assert small[1] & 0xF0 == 0
+    assert large[1] & 0xF0 == 0x10
+    assert len(large) < len(json.dumps(VENUES)) / 4
+
+def test_reads_legacy_json_text():
+    legacy = json.dumps(VENUES)
+    assert Codec.decode(legacy)[0] == VENUES
+    assert Codec.decode(legacy.encode())[0] == VENUES
+
+def test_msgpack_keeps_int_keys():
+    data, _ = Codec("msgpack").encode({1: "a"})
+    assert Codec.decode(data)[0] == {1: "a"}
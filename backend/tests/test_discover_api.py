@@ -0,0 +1,172 @@
+import importlib
+import sys
+import threading
+import time
+import types
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services import redis_cache
+from services.geo import geohash_encode, GEOHASH_PRECISION
+from services.local_cache import LocalCache
+from test_redis_cache import AsyncFakeRedis, FakeRedis
+
+
+def _venue(venue_id, lat, lng, **extra):
+    data = {
+        "name": venue_id, "location": {"lat": lat, "lng": lng}, "city": "Los Angeles",
+        "geohash": geohash_encode(lat, lng, GEOHASH_PRECISION), **extra,
+    }
+    return SimpleNamespace(id=venue_id, to_dict=lambda: data)
+
+DOCS = [
+    _venue(f"v{i}", 34.10 + i * 0.002, -118.34 + (i % 3) * 0.002, categories=["Cocktail Bar" if i % 2 else "Nightclub"])
+    for i in range(12)
+]
+
+
+class FakeQuery:
+    """collection.where(geohash >= lo).where(geohash < hi).select(...).stream(), over DOCS."""
+
+    def __init__(self, store, bounds=()):
+        self.store, self.bounds = store, bounds
+
+    def where(self, field, op, value):
+        return type(self)(self.store, self.bounds + (value,))
+
+    def select(self, fields):
+        return self
+
+    def _matching(self):
+        self.store.queries += 1
+        self.store.gate.wait(1)
+        lo, hi = self.bounds
+        return [d for d in DOCS if lo <= d.to_dict()["geohash"] < hi]
+
+    def stream(self):
+        return iter(self._matching())
+
+
+class AsyncFakeQuery(FakeQuery):
+    async def _stream(self):
+        for doc in self._matching():
+            yield doc
+
+    def stream(self):
+        return self._stream()
+
+
+class FakeFirestore:
+    def __init__(self, query=FakeQuery):
+        self.query, self.queries, self.gate = query, 0, threading.Event()
+        self.gate.set()
+
+    def collection(self, name):
+        return self.query(self)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    db, async_db = FakeFirestore(), FakeFirestore(AsyncFakeQuery)
+    monkeypatch.setitem(sys.modules, "services.firestore_utils", types.SimpleNamespace(db=db, async_db=async_db))
+    venues = importlib.import_module("app.api.venues")
+    venues_async = importlib.import_module("app.api.venues_async")
+    monkeypatch.setattr(venues, "db", db)
+    monkeypatch.setattr(venues_async, "async_db", async_db)
+    monkeypatch.setattr(venues.cfg, "VENUE_INDEX_ENABLED", False)
+
+    monkeypatch.setattr(redis_cache, "rds", FakeRedis())
+    monkeypatch.setattr(redis_cache, "ards", AsyncFakeRedis())
+    monkeypatch.setattr(redis_cache, "LEASE_POLL_S", 0.005)
+    monkeypatch.setattr(redis_cache, "_stats", redis_cache.Counter())
+    monkeypatch.setattr(redis_cache, "l1", LocalCache(1 << 20))
+
+    app = FastAPI()
+    app.include_router(venues.router, prefix="/api")
+    app.include_router(venues_async.router, prefix="/api/async")
+    return SimpleNamespace(client=TestClient(app), venues=venues, db=db, async_db=async_db)
+
+def _ids(res):
+    return [v["id"] for v in res.json()]
+
+def test_stale_cells_are_served_while_one_refresh_runs(api, monkeypatch):
+    stale_windows = []
+    wrap = redis_cache._wrap
+    monkeypatch.setattr(redis_cache, "_wrap", lambda v, ttl, stale, d: stale_windows.append(stale) or wrap(v, ttl, stale, d))
+    first = _ids(api.client.get("/api/venues/discover", params={"lat": 34.1, "lng": -118.34, "limit": 50}))
+    cells = api.db.queries
+    assert first and set(stale_windows) == {api.venues.cfg.TILE_CACHE_STALE_HOURS}
+    assert api.venues.cfg.TILE_CACHE_STALE_HOURS > 0
+
+    for k in [k for k in redis_cache.rds.data if k.startswith("venue_cell:")]:  # past soft expiry
+        redis_cache.rds.data[k] = wrap(redis_cache._unwrap(redis_cache.rds.data[k])[0], -1, 1, 0.0)[0]
+    redis_cache.l1.clear()
+
+    loads = []
+    load_cells = api.venues._load_cells
+    monkeypatch.setattr(api.venues, "_load_cells", lambda params: loads.append(len(params)) or load_cells(params))
+    api.db.gate.clear()  # hold the refresh in Firestore
+    for _ in range(3):
+        assert _ids(api.client.get("/api/venues/discover", params={"lat": 34.1, "lng": -118.34, "limit": 50})) == first
+    api.db.gate.set()
+    for _ in range(100):
+        if api.db.queries == 2 * cells:
+            break
+        time.sleep(0.01)
+    assert loads == [cells]  # one batched refresh for every stale cell
+
+def test_cells_are_tagged_by_geohash_only_and_a_write_evicts_its_cell(api):
+    params = {"lat": 34.1, "lng": -118.34, "limit": 50}
+    api.client.get("/api/venues/discover", params=params)
+    cells = api.db.queries
+    assert {k.split(":")[1] for k in redis_cache.rds.data if k.startswith("tag:")} == {"geo"}
+
+    assert redis_cache.invalidate_venue("v0", DOCS[0].to_dict()) == 1
+    redis_cache.l1.clear()
+    api.client.get("/api/venues/discover", params=params)
+    assert api.db.queries == cells + 1  # only the written venue's cell is reloaded
+
+@pytest.fixture(params=["cells", "index"])
+def source(request, api, monkeypatch):
+    if request.param == "index":
+        from services.venue_index import VenueIndex
+        index = VenueIndex()
+        index.build(DOCS, version=42)
+        monkeypatch.setattr(api.venues, "venue_index", index)
+        monkeypatch.setattr(importlib.import_module("app.api.venues_async"), "venue_index", index)
+        monkeypatch.setattr(api.venues.cfg, "VENUE_INDEX_ENABLED", True)
+    return request.param
+
+def _walk(client, path, **params):
+    """Every page of a discover query, following X-Next-Cursor: [(ids, cursor)]."""
+    pages, cursor = [], None
+    while True:
+        res = client.get(path, params={"lat": 34.1, "lng": -118.34, "limit": 4, **params, **({"cursor": cursor} if cursor else {})})
+        assert res.status_code == 200
+        cursor = res.headers.get("X-Next-Cursor")
+        pages.append((_ids(res), cursor))
+        if not cursor:
+            return pages
+
+@pytest.mark.parametrize("params", [{}, {"category": "bar"}, {"category": "club", "fields": "name"}])
+def test_async_router_pages_like_the_sync_one(api, source, params):
+    sync = _walk(api.client, "/api/venues/discover", **params)
+    redis_cache.rds.data.clear()  # make the async router load its own cells
+    redis_cache.l1.clear()
+    async_ = _walk(api.client, "/api/async/venues/discover", **params)
+    assert async_ == sync
+    assert (api.async_db.queries > 0) is (source == "cells")
+    assert len(sync) > 1 and sum(len(ids) for ids, _ in sync) == len({i for ids, _ in sync for i in ids})
+
+def test_async_router_refuses_bad_and_stale_cursors_like_the_sync_one(api, source):
+    from services.pagination import encode_cursor
+
+    other_version = encode_cursor(100.0, "v1", 7)
+    for path in ("/api/venues/discover", "/api/async/venues/discover"):
+        base = {"lat": 34.1, "lng": -118.34}
+        assert api.client.get(path, params={**base, "cursor": "not-a-cursor"}).status_code == 400
+        assert api.client.get(path, params={**base, "cursor": other_version}).status_code == 409
+        assert api.client.get(path, params={**base, "limit": 0}).status_code == 422
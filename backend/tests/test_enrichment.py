@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+import services.enrichment as enrichment
+from core.quota import QuotaExceeded
+from core.rate_limiter import RateLimited
+from services.enrichment import ProviderGates, map_unordered
+
+async def _collect(gen):
+    return [pair async for pair in gen]
+
+def test_map_unordered_bounds_concurrency_and_yields_as_completed():
+    running, peak = 0, 0
+
+    async def work(n):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01 * (5 - n))  # later items finish first
+        running -= 1
+        if n == 3:
+            raise ValueError("bad venue")
+        return n * 10
+
+    results = asyncio.run(_collect(map_unordered(work, range(5), concurrency=5)))
+    assert [item for item, _ in results] == [4, 3, 2, 1, 0]
+    assert isinstance(dict(results)[3], ValueError)
+    assert dict(results)[2] == 20
+
+    peak = 0
+    asyncio.run(_collect(map_unordered(work, range(10), concurrency=3)))
+    assert peak == 3
+
+def test_closing_map_unordered_cancels_in_flight_work():
+    cancelled = []
+
+    async def work(n):
+        try:
+            await asyncio.sleep(0 if n == 0 else 10)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        return n
+
+    async def first_only():
+        gen = map_unordered(work, range(4), concurrency=4)
+        item, _ = await gen.__anext__()
+        await gen.aclose()
+        return item
+
+    assert asyncio.run(first_only()) == 0
+    assert sorted(cancelled) == [1, 2, 3]
+
+@pytest.fixture
+def fake_calls(monkeypatch):
+    charged, in_flight, peak = [], {"n": 0}, {"n": 0}
+
+    async def aget_json(api, url, **kwargs):
+        in_flight["n"] += 1
+        peak["n"] = max(peak["n"], in_flight["n"])
+        await asyncio.sleep(0.01)
+        in_flight["n"] -= 1
+        return {"url": url}
+
+    async def tokens(api, timeout):
+        return api != "throttled"
+
+    monkeypatch.setattr(enrichment.http_client, "aget_json", aget_json)
+    monkeypatch.setattr(enrichment, "acquire_async", tokens)
+    monkeypatch.setattr(enrichment, "charge", lambda endpoint, cost=None: charged.append(endpoint))
+    return charged, peak
+
+def test_gates_cap_each_provider_and_charge_every_call(fake_calls):
+    charged, peak = fake_calls
+
+    async def run():
+        gates = ProviderGates({"google": 2})
+        return await asyncio.gather(*(gates.get_json("google", "google_details", f"u{i}") for i in range(6)))
+
+    assert [r["url"] for r in asyncio.run(run())] == [f"u{i}" for i in range(6)]
+    assert charged == ["google_details"] * 6
+    assert peak["n"] == 2
+
+def test_gates_raise_when_no_token_or_no_budget(fake_calls, monkeypatch):
+    async def throttled():
+        gates = ProviderGates({"throttled": 1})
+        monkeypatch.setattr(enrichment, "RATE_LIMITED", {"throttled"})
+        await gates.get_json("throttled", "google_details", "u")
+
+    with pytest.raises(RateLimited):
+        asyncio.run(throttled())
+
+    def broke(endpoint, cost=None):
+        raise QuotaExceeded("google daily budget reached")
+    monkeypatch.setattr(enrichment, "charge", broke)
+    with pytest.raises(QuotaExceeded):
+        asyncio.run(ProviderGates().get_json("google", "google_details", "u"))
+
+def test_batch_writer_commits_in_batches_and_invalidates(monkeypatch):
+    commits, invalidated = [], []
+
+    class Batch:
+        def __init__(self):
+            self.updates = []
+
+        def update(self, ref, updates):
+            self.updates.append((ref, updates))
+
+        def commit(self):
+            commits.append(self.updates)
+
+    class Doc:
+        def __init__(self, i):
+            self.id = f"v{i}"
+            self.reference = f"ref/{self.id}"
+
+    db = type("DB", (), {"batch": staticmethod(Batch)})()
+    monkeypatch.setattr(enrichment, "invalidate_venue", lambda venue_id, data: invalidated.append(venue_id))
+
+    async def run():
+        writer = enrichment.BatchWriter(db, size=2)
+        for i in range(3):
+            await writer.add(Doc(i), {"city": "LA"}, {"rating": i})
+        assert len(commits) == 1  # the third waits for flush
+        await writer.flush()
+        return writer.written
+
+    assert asyncio.run(run()) == 3
+    assert [len(c) for c in commits] == [2, 1]
+    assert commits[1] == [("ref/v2", {"rating": 2})]
+    assert invalidated == ["v0", "v1", "v2"]
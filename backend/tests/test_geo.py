@@ -0,0 +1,43 @@
+import numpy as np
+
+from services.geo import haversine_m, within_radius, geohash_encode, geohash_bbox, expanded_bbox
+
+def test_haversine_known_distance():
+    # Hollywood & Highland → Santa Monica Pier is ~18 km
+    assert 17_000 < haversine_m(34.1016, -118.3387, 34.0094, -118.4973) < 19_000
+
+def test_within_radius_matches_scalar():
+    lats = np.array([34.10, 34.50, 33.90, 36.00])
+    lngs = np.array([-118.34, -118.34, -118.20, -118.34])
+    pos, dists = within_radius(34.10, -118.34, lats, lngs, radius_m=48_280)
+    assert list(pos) == [0, 1, 2]
+    for i, d in zip(pos, dists):
+        assert abs(d - haversine_m(34.10, -118.34, lats[i], lngs[i])) < 0.01
+
+def test_geohash_encode_reference_values():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash_encode(34.0983, -118.3452, 5) == "9q5cf"
+
+def test_geohash_bbox_contains_point():
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bbox(geohash_encode(34.0983, -118.3452, 6))
+    assert lat_lo <= 34.0983 <= lat_hi and lng_lo <= -118.3452 <= lng_hi
+
+def test_expanded_bbox_covers_radius_from_tile_corner():
+    tile = geohash_encode(34.0983, -118.3452, 5)
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bbox(tile)
+    e_lat_lo, e_lat_hi, e_lng_lo, e_lng_hi = expanded_bbox(tile, 48_280)
+    # A venue 48 km due east of the tile's NE corner is still inside the box
+    assert haversine_m(lat_hi, lng_hi, lat_hi, e_lng_hi) >= 48_279
+    assert haversine_m(lat_lo, lng_lo, e_lat_lo, lng_lo) >= 48_279
+
+def test_geohash_cover_contains_every_point_in_box():
+    import random
+    from services.geo import bounding_box, geohash_cover
+    box = bounding_box(34.0983, -118.3452, 48_280)
+    cover = geohash_cover(*box)
+    assert 1 <= len(cover) <= 9
+    rnd = random.Random(0)
+    for _ in range(500):
+        lat, lng = rnd.uniform(box[0], box[1]), rnd.uniform(box[2], box[3])
+        gh = geohash_encode(lat, lng, 9)
+        assert any(gh.startswith(p) for p in cover)
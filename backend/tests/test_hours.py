@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from services.hours import (
+    MINUTES_PER_DAY, hours_intervals, is_open_at, minute_of_week, parse_day, venue_open_at,
+)
+from services.venue_validation import _has_late_hours
+
+FRI = 4 * MINUTES_PER_DAY
+
+def test_google_text_with_inherited_meridiem():
+    assert parse_day("5:00 – 10:00 PM") == [(17 * 60, 22 * 60)]
+    assert parse_day("12:00 – 10:00 AM, 5:00 – 10:00 PM") == [(0, 600), (1020, 1320)]
+    assert parse_day("Open 24 hours") == [(0, MINUTES_PER_DAY)]
+    assert parse_day("Closed") == []
+
+def test_past_midnight_and_week_wrap():
+    iv = hours_intervals({"friday": "5:00 PM – 2:00 AM", "sunday": "8:00 PM – 3:00 AM"})
+    assert iv == [0, 180, FRI + 1020, FRI + MINUTES_PER_DAY + 120, 6 * MINUTES_PER_DAY + 1200, 7 * MINUTES_PER_DAY]
+    assert is_open_at(iv, FRI + 1020)                       # opens on the minute
+    assert is_open_at(iv, FRI + MINUTES_PER_DAY + 60)       # 1 AM Saturday
+    assert not is_open_at(iv, FRI + MINUTES_PER_DAY + 120)  # closed at 2 AM
+    assert is_open_at(iv, 90)                               # Monday 1:30 AM, from Sunday night
+
+def test_unparseable_hours_are_unknown():
+    assert hours_intervals(None) is None
+    assert hours_intervals({"monday": "See website"}) is None
+    assert hours_intervals({"monday": "Closed"}) == []
+
+def test_open_at_uses_venue_timezone():
+    venue = {"hours_intervals": hours_intervals({"friday": "5:00 PM – 2:00 AM"}), "city": "Los Angeles"}
+    # Saturday 08:30 UTC is Saturday 01:30 in Los Angeles (PDT)
+    assert venue_open_at(venue, datetime(2025, 7, 19, 8, 30, tzinfo=timezone.utc))
+    assert not venue_open_at(venue, datetime(2025, 7, 19, 10, 30, tzinfo=timezone.utc))
+    assert minute_of_week(datetime(2025, 7, 18, 23, 0)) == FRI + 23 * 60  # naive = local
+    assert not venue_open_at({"city": "Los Angeles"}, datetime(2025, 7, 19, 8, 30, tzinfo=timezone.utc))
+
+def test_late_hours_accepts_old_and_new_shapes():
+    assert _has_late_hours({"hours": {"friday": [("11:00", "02:00")]}})
+    assert _has_late_hours({"hours": {"friday": ["11:00-02:00"]}})
+    assert _has_late_hours({"hours": {"friday": "5:00 PM – 12:00 AM"}})
+    assert not _has_late_hours({"hours": {"friday": "11:00 AM – 10:00 PM"}})
+    assert _has_late_hours({"hours_intervals": hours_intervals({"saturday": "9:00 PM – 2:00 AM"})})
@@ -0,0 +1,73 @@
+import httpx
+import pytest
+
+import services.http_client as http_client
+from core.metrics import OUTBOUND_REQUESTS
+from services.http_client import UpstreamError, backoff
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Route the 'test' API through a scripted transport; sleeps are recorded, not taken."""
+    sleeps = []
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+    monkeypatch.setattr(http_client, "_clients", {})
+
+    def install(*responses):
+        queue = list(responses)
+        seen = []
+        def handler(request):
+            seen.append(request)
+            step = queue.pop(0)
+            if isinstance(step, Exception):
+                raise step
+            return step
+        http_client._clients["test"] = httpx.Client(transport=httpx.MockTransport(handler))
+        return seen, sleeps
+    return install
+
+def test_success_passes_params_and_reuses_the_client(serve):
+    seen, sleeps = serve(httpx.Response(200, json={"ok": 1}), httpx.Response(200, json={"ok": 2}))
+    assert http_client.get_json("test", "https://api.test/x", params={"q": "bar & grill"}) == {"ok": 1}
+    assert http_client.get_json("test", "https://api.test/x") == {"ok": 2}
+    assert seen[0].url.params["q"] == "bar & grill"
+    assert sleeps == []
+
+def test_retries_5xx_then_succeeds(serve):
+    seen, sleeps = serve(httpx.Response(503), httpx.Response(502), httpx.Response(200, json={}))
+    before = OUTBOUND_REQUESTS.values().get(("test", "5xx"), 0)
+    assert http_client.get_json("test", "https://api.test/x") == {}
+    assert len(seen) == 3 and len(sleeps) == 2
+    assert OUTBOUND_REQUESTS.values()[("test", "5xx")] - before == 2
+
+def test_honors_retry_after(serve):
+    _, sleeps = serve(httpx.Response(429, headers={"Retry-After": "7"}), httpx.Response(200, json={}))
+    http_client.get("test", "https://api.test/x")
+    assert sleeps == [7.0]
+
+def test_transport_errors_retry_and_then_raise(serve):
+    timeout = httpx.ConnectTimeout("slow")
+    seen, sleeps = serve(timeout, timeout, timeout)
+    with pytest.raises(UpstreamError) as err:
+        http_client.get("test", "https://api.test/x", retries=2)
+    assert err.value.api == "test" and err.value.status is None
+    assert len(seen) == 3 and len(sleeps) == 2
+
+def test_client_errors_are_not_retried(serve):
+    seen, _ = serve(httpx.Response(404))
+    with pytest.raises(UpstreamError) as err:
+        http_client.get("test", "https://api.test/x")
+    assert err.value.status == 404 and len(seen) == 1
+
+def test_backoff_is_jittered_and_capped():
+    for attempt in range(10):
+        delay = backoff(attempt)
+        assert 0 <= delay <= min(http_client.BACKOFF_MAX_S, http_client.BACKOFF_BASE_S * 2 ** attempt)
+    assert backoff(0, retry_after=3) == 3
+    assert backoff(0, retry_after=60) == 60  # never earlier than the server asked
+
+def test_retry_after_beyond_budget_gives_up(serve):
+    seen, sleeps = serve(httpx.Response(429, headers={"Retry-After": "60"}), httpx.Response(200, json={}))
+    with pytest.raises(UpstreamError) as err:
+        http_client.get("test", "https://api.test/x")
+    assert err.value.status == 429
+    assert len(seen) == 1 and sleeps == []
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.metrics import MetricsMiddleware, router as metrics_router
+from core.metrics import (
+    HTTP_REQUESTS, OUTBOUND_REQUESTS, REGISTRY, Counter, Histogram, render_prometheus, track_outbound,
+)
+
+@pytest.fixture
+def scratch():
+    made = []
+    def make(cls, *args, **kwargs):
+        metric = cls(*args, **kwargs)
+        made.append(metric)
+        return metric
+    yield make
+    for metric in made:
+        REGISTRY.remove(metric)
+
+def test_counter_sums_across_threads(scratch):
+    c = scratch(Counter, "t_hits_total", "test", ["ns"])
+    def work():
+        for _ in range(1000):
+            c.inc("venues")
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    c.inc("tiles", amount=2)
+    assert c.values() == {("venues",): 8000, ("tiles",): 2}
+    assert 't_hits_total{ns="venues"} 8000' in c.render()
+
+def test_histogram_buckets_are_cumulative(scratch):
+    h = scratch(Histogram, "t_seconds", "test", ["ns"], buckets=(0.1, 1))
+    for v in (0.05, 0.1, 0.5, 3):
+        h.observe(v, "tiles")
+    lines = h.render()
+    assert 't_seconds_bucket{ns="tiles",le="0.1"} 2' in lines
+    assert 't_seconds_bucket{ns="tiles",le="1"} 3' in lines
+    assert 't_seconds_bucket{ns="tiles",le="+Inf"} 4' in lines
+    assert 't_seconds_count{ns="tiles"} 4' in lines
+    assert 't_seconds_sum{ns="tiles"} 3.65' in lines
+
+def test_label_values_are_escaped(scratch):
+    c = scratch(Counter, "t_escape_total", "test", ["route"])
+    c.inc('a"b\\c')
+    assert c.render() == ['t_escape_total{route="a\\"b\\\\c"} 1']
+
+def test_track_outbound_outcomes():
+    before = OUTBOUND_REQUESTS.values()
+    with track_outbound("t_api") as call:
+        call.status = 429
+    with track_outbound("t_api"):
+        pass
+    with pytest.raises(TimeoutError):
+        with track_outbound("t_api"):
+            raise TimeoutError
+    after = OUTBOUND_REQUESTS.values()
+    for outcome in ("4xx", "ok", "error"):
+        assert after[("t_api", outcome)] - before.get(("t_api", outcome), 0) == 1
+
+def test_middleware_labels_route_template():
+    app = FastAPI()
+    app.include_router(metrics_router)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/t/venues/{venue_id}")
+    def venue(venue_id: str):
+        return {"id": venue_id}
+
+    client = TestClient(app)
+    client.get("/t/venues/abc")
+    client.get("/t/venues/xyz")
+    client.get("/t/nope")
+
+    counts = HTTP_REQUESTS.values()
+    assert counts[("/t/venues/{venue_id}", "GET", "200")] >= 2
+    assert ("/t/venues/abc", "GET", "200") not in counts
+    assert counts[("unmatched", "GET", "404")] >= 1
+
+    body = client.get("/metrics").text
+    assert body == body.rstrip("\n") + "\n"
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'route="/t/venues/{venue_id}"' in body
+    assert render_prometheus().startswith("# HELP")
@@ -0,0 +1,55 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from services.pagination import StaleCursor, encode_cursor, decode_cursor, next_cursor, resume_after, top_k
+from services.venue_index import VenueIndex
+
+def test_cursor_roundtrip():
+    token = encode_cursor(1234.5678, "ChIJabc", 7)
+    assert decode_cursor(token) == ((1234.5678, "ChIJabc"), 7)
+
+@pytest.mark.parametrize("token", ["", "zz", "bm90IGpzb24", encode_cursor(1.0, "a", 1)[:-3]])
+def test_malformed_cursor_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+def test_cursor_from_another_version_is_refused():
+    token = encode_cursor(12.5, "a", 7)
+    assert resume_after(token, 7) == (12.5, "a")
+    with pytest.raises(StaleCursor):
+        resume_after(token, 8)
+    with pytest.raises(ValueError):
+        resume_after("zz", 7)
+
+def test_top_k_resumes_after_key_with_ties():
+    venues = [{"id": vid, "distance": d} for vid, d in [("b", 5.0), ("a", 5.0), ("c", 1.0), ("d", 9.0)]]
+    first = top_k(venues, 2)
+    assert [v["id"] for v in first] == ["c", "a"]
+    rest = top_k(venues, 2, after=(first[-1]["distance"], first[-1]["id"]))
+    assert [v["id"] for v in rest] == ["b", "d"]
+
+def test_next_cursor_stops_on_short_page():
+    assert next_cursor([{"id": "a", "distance": 1.0}], limit=2, version=1) is None
+    assert next_cursor([], limit=0, version=1) is None
+
+def test_index_pages_concatenate_to_full_query():
+    rnd = random.Random(1)
+    docs = []
+    for i in range(200):
+        data = {"name": f"v{i}", "location": {"lat": 34.1 + rnd.uniform(-0.2, 0.2), "lng": -118.3 + rnd.uniform(-0.2, 0.2)}}
+        docs.append(SimpleNamespace(id=f"v{i}", to_dict=lambda d=data: d))
+    index = VenueIndex()
+    index.build(docs)
+
+    pages, after = [], None
+    while True:
+        page = index.top_k(34.1, -118.3, 25, after=after)
+        pages.extend(page)
+        token = next_cursor(page, 25, index.version)
+        if not token:
+            break
+        after, _ = decode_cursor(token)
+
+    assert [v["id"] for v in pages] == [v["id"] for v in index.query(34.1, -118.3)]
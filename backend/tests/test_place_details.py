@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+import services.google_places as google_places
+import services.place_details as place_details
+from services.enrichment import ProviderGates
+from services.place_details import CORE_FIELDS, HOURS, PRICE_LEVEL, SUMMARY, details_updates, fan_out, plan, union_fields
+from services.response_cache import ResponseCache
+
+DETAILS = {
+    "website": "https://bar.example",
+    "editorial_summary": {"overview": "Rooftop cocktails."},
+    "opening_hours": {"weekday_text": [
+        f"{day}: 5:00 PM – 2:00 AM" for day in
+        ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+    ]},
+    "price_level": 3,
+    "formatted_address": "1 Main St",
+    "geometry": {"location": {"lat": 34.05, "lng": -118.25}},
+    "types": ["bar"],
+    "rating": 4.4,
+    "name": "Bar",
+}
+
+@pytest.fixture
+def google(tmp_path, monkeypatch):
+    requests = []
+
+    def get_json(api, url, params=None, **kwargs):
+        requests.append(params["fields"].split(","))
+        return {"status": "OK", "result": {f: DETAILS[f] for f in params["fields"].split(",")}}
+
+    async def gated_get_json(self, api, endpoint, url, cost=None, **kwargs):
+        return get_json(api, url, **kwargs)
+
+    monkeypatch.setattr(google_places, "response_cache", ResponseCache(str(tmp_path / "r.sqlite3")))
+    monkeypatch.setattr(google_places.http_client, "get_json", get_json)
+    monkeypatch.setattr(google_places, "charge", lambda endpoint, cost=None: None)
+    monkeypatch.setattr(ProviderGates, "get_json", gated_get_json)
+    return requests
+
+def test_union_keeps_each_field_once():
+    fields = union_fields([SUMMARY, CORE_FIELDS, PRICE_LEVEL])
+    assert fields[:2] == ["website", "editorial_summary"]
+    assert len(fields) == len(set(fields))
+    assert set(fields) == set(SUMMARY.fields) | set(CORE_FIELDS.fields)
+
+def test_plan_skips_steps_with_nothing_to_do():
+    venue = {"place_id": "p1", "website": "w", "summary": "s", "price_level": 2, "hours": None}
+    assert plan(venue, [SUMMARY, HOURS, PRICE_LEVEL]) == [HOURS]
+    assert plan({"hours": None}) == []  # no place_id, nothing to ask Google
+
+def test_fan_out_gives_each_step_its_fields():
+    venue = {"place_id": "p1", "city": "Los Angeles", "website": "https://own.example"}
+    updates = fan_out([SUMMARY, HOURS, PRICE_LEVEL], DETAILS, venue)
+    assert "website" not in updates  # the venue's own website wins
+    assert updates["summary"] == "Rooftop cocktails."
+    assert updates["hours"]["friday"] == "5:00 PM – 2:00 AM"
+    assert updates["timezone"] == "America/Los_Angeles"
+    assert updates["price_level"] == 3
+    assert fan_out([SUMMARY, HOURS], None, venue) == {}
+
+def test_one_request_per_venue_for_every_step(google):
+    venue = {"place_id": "p1", "city": "Los Angeles"}
+    updates = details_updates(venue)
+    assert len(google) == 1
+    assert set(google[0]) == set(union_fields([SUMMARY, HOURS, PRICE_LEVEL, CORE_FIELDS]))
+    assert {"website", "summary", "hours", "price_level", "address", "lat", "types", "rating"} <= set(updates)
+
+    # single-step callers are now served from the response cache
+    assert google_places.place_details("p1", HOURS.fields) == {"opening_hours": DETAILS["opening_hours"]}
+    assert len(google) == 1
+
+def test_fetch_batch_plans_per_venue(google):
+    venues = [
+        {"place_id": "p1", "website": "w", "summary": "s", "hours": {"monday": "x"}, "price_level": None},
+        {"place_id": "p2", "website": "w", "summary": "s", "hours": {"monday": "x"}, "price_level": 1},
+        {"name": "no place id"},
+    ]
+
+    async def run():
+        gates = ProviderGates()
+        return [pair async for pair in place_details.fetch_batch(gates, venues, steps=[SUMMARY, HOURS, PRICE_LEVEL])]
+
+    results = asyncio.run(run())
+    assert [(v["place_id"], u) for v, u in results] == [("p1", {"price_level": 3})]
+    assert google == [["price_level"]]
@@ -0,0 +1,60 @@
+import threading
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.api.debug as debug
+from core.profiler import collapsed, memory_snapshot, sample_stacks, stop_memory_tracing
+
+def _spin_until(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampler_sees_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin_until, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        counts = sample_stacks(0.1, 0.002)
+    finally:
+        stop.set()
+        worker.join()
+
+    spinning = {s: n for s, n in counts.items() if s.startswith("spinner;")}
+    assert spinning
+    assert all("test_profiler.py:_spin_until" in s for s in spinning)
+    assert not any("sample_stacks" in s for s in counts)  # the sampler skips itself
+
+    lines = collapsed(counts).splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+def test_memory_snapshot_starts_tracing_first():
+    assert not tracemalloc.is_tracing()
+    try:
+        assert memory_snapshot() is None
+        hoard = [bytearray(1024) for _ in range(200)]
+        snap = memory_snapshot(top=5)
+        assert snap["traced_bytes"] >= 200 * 1024
+        assert any("test_profiler.py" in row["site"] for row in snap["top"])
+        del hoard
+    finally:
+        stop_memory_tracing()
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_endpoints_are_guarded(monkeypatch, enabled):
+    monkeypatch.setattr(debug.cfg, "DEV_MODE", False)
+    monkeypatch.setattr(debug.cfg, "DEBUG_ENDPOINTS", enabled)
+    app = FastAPI()
+    app.include_router(debug.router)
+    client = TestClient(app)
+
+    resp = client.get("/debug/profile?seconds=0.05")
+    assert resp.status_code == (200 if enabled else 404)
+    if enabled:
+        assert resp.headers["content-type"].startswith("text/plain")
+        body = client.get("/debug/memory").json()
+        assert body["venue_index"]["venues"] >= 0
+        assert "l1_bytes" in body["l1_cache"]
+        assert client.delete("/debug/memory").json() == {"tracing": False}
@@ -0,0 +1,72 @@
+import pytest
+import redis
+
+import core.quota as quota
+from core.quota import BATCH, QuotaExceeded, charge, google_details_cost, run_report, script_run
+
+class DownRedis:
+    def eval(self, *args):
+        raise redis.ConnectionError("refused")
+    def lpush(self, *args):
+        raise redis.ConnectionError("refused")
+
+class HashRedis:
+    def __init__(self, fields):
+        self.fields = fields
+    def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.fields.items()}
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    monkeypatch.setattr(quota, "_rds", DownRedis())
+    monkeypatch.setattr(quota, "_redis_down_until", 0.0)
+    monkeypatch.setattr(quota, "_local", quota.defaultdict(lambda: quota.defaultdict(int)))
+    monkeypatch.setattr(quota, "_priority", quota.SERVING)
+    monkeypatch.setattr(quota.cfg, "GOOGLE_DAILY_BUDGET_USD", 0.1)
+    monkeypatch.setattr(quota.cfg, "QUOTA_BATCH_SHARE", 0.5)
+    quota._run.clear()
+
+def test_details_cost_follows_field_tiers():
+    assert google_details_cost(["place_id", "geometry"]) == pytest.approx(0.017)
+    assert google_details_cost(["opening_hours"]) == pytest.approx(0.020)
+    assert google_details_cost(["website", "price_level"]) == pytest.approx(0.025)
+
+def test_serving_calls_get_the_whole_budget():
+    for _ in range(3):
+        charge("google_nearby")  # 3 × $0.032 = $0.096
+    with pytest.raises(QuotaExceeded):
+        charge("google_nearby")
+    assert run_report()["endpoints"]["google_nearby"] == {"calls": 3, "usd": pytest.approx(0.096), "denied": 1}
+
+def test_batch_calls_stop_at_their_share():
+    charge("google_nearby", priority=BATCH)
+    with pytest.raises(QuotaExceeded):
+        charge("google_nearby", priority=BATCH)  # $0.064 > $0.05
+    charge("google_nearby")  # serving still has room
+
+def test_providers_have_separate_budgets():
+    for _ in range(3):
+        charge("google_nearby")
+    charge("fsq_search")  # doesn't raise: Google's spend isn't Foursquare's
+
+def test_script_run_charges_as_batch_and_reports(capsys):
+    with pytest.raises(QuotaExceeded):
+        with script_run("add_hours"):
+            charge("google_details", google_details_cost(["opening_hours"]))
+            charge("google_details", google_details_cost(["opening_hours"]))
+            charge("google_details", google_details_cost(["opening_hours"]))
+    out = capsys.readouterr().out
+    assert "add_hours: $0.04" in out
+    assert "google_details: 2 calls, $0.04, 1 over budget" in out
+    assert quota._priority == quota.SERVING
+
+def test_daily_spend_reads_the_day_hash(monkeypatch):
+    monkeypatch.setattr(quota, "_rds", HashRedis({
+        "google:micros": 81_000,
+        "google_nearby:calls": 2, "google_nearby:micros": 64_000,
+        "google_details:calls": 1, "google_details:micros": 17_000, "google_details:denied": 4,
+    }))
+    spend = quota.daily_spend("2026-10-18")
+    assert spend["day"] == "2026-10-18"
+    assert spend["providers"]["google"] == {"usd": 0.081, "budget_usd": 0.1}
+    assert spend["endpoints"]["google_details"] == {"calls": 1, "usd": 0.017, "denied": 4}
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+import redis
+
+import core.rate_limiter as rl
+from core.rate_limiter import RateLimiter, TokenBucket
+
+class ScriptedRedis:
+    """Answers the token-bucket script with canned wait times (ms)."""
+    def __init__(self, waits):
+        self.waits = list(waits)
+        self.calls = []
+
+    def eval(self, script, numkeys, key, rate, capacity):
+        self.calls.append((key, rate, capacity))
+        return self.waits.pop(0)
+
+class DownRedis:
+    calls = 0
+    def eval(self, *args):
+        self.calls += 1
+        raise redis.ConnectionError("refused")
+
+def test_bucket_refills_continuously():
+    bucket = TokenBucket(capacity=2, window_s=0.2)  # one token per 100 ms
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    wait = bucket.take()
+    assert 0 < wait <= 0.1
+    time.sleep(wait)
+    assert bucket.take() == 0
+
+def test_acquire_sleeps_for_the_advertised_wait():
+    client = ScriptedRedis([40, 0])
+    limiter = RateLimiter("google", limit=90, window_s=60, client=client)
+    start = time.monotonic()
+    assert limiter.acquire(timeout=1)
+    assert time.monotonic() - start >= 0.04
+    key, rate, capacity = client.calls[0]
+    assert key == "ratelimit:google" and capacity == 90
+    assert rate == pytest.approx(90 / 60_000)
+
+def test_acquire_gives_up_when_the_wait_exceeds_the_timeout():
+    limiter = RateLimiter("google", client=ScriptedRedis([5_000]))
+    start = time.monotonic()
+    assert not limiter.acquire(timeout=0.5)
+    assert time.monotonic() - start < 0.1  # no point sleeping when it can't succeed
+    assert not RateLimiter("google", client=ScriptedRedis([1])).try_acquire()
+
+def test_falls_back_to_local_bucket_when_redis_is_down(monkeypatch):
+    client = DownRedis()
+    limiter = RateLimiter("fsq", limit=3, window_s=60, client=client)
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert client.calls == 1  # backs off Redis instead of retrying every call
+
+    monkeypatch.setattr(limiter, "_redis_down_until", 0.0)
+    limiter._client = ScriptedRedis([0])
+    assert limiter.try_acquire()  # back on the shared budget
+
+def test_limiter_registry_applies_overrides(monkeypatch):
+    monkeypatch.setattr(rl, "_limiters", {})
+    monkeypatch.setattr(rl, "LIMITS", {"instagram": 10})
+    assert rl.limiter("instagram").limit == 10
+    assert rl.limiter("google").limit == rl.CALL_LIMIT
+    assert rl.limiter("google") is rl.limiter("google")
@@ -0,0 +1,427 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import redis_cache
+from services.local_cache import LocalCache
+
+
+class FakeRedis:
+    """Just enough of redis-py for the cache: strings, sets, PUBLISH, pipelines and the lease script."""
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self.round_trips = 0
+        self.lock = threading.Lock()
+
+    def get(self, k):
+        return self.data.get(k)
+
+    def set(self, k, v, nx=False, px=None, ex=None):
+        with self.lock:
+            if nx and k in self.data:
+                return None
+            self.data[k] = v
+            return True
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def delete(self, *keys):
+        for k in keys:
+            self.data.pop(k, None)
+
+    def sadd(self, k, member):
+        self.data.setdefault(k, set()).add(member)
+
+    def smembers(self, k):
+        return {m.encode() for m in self.data.get(k, set())}
+
+    def expire(self, k, seconds, nx=False, gt=False):
+        return True
+
+    def publish(self, channel, message):
+        self.published.append(message)
+
+    def eval(self, script, numkeys, k, token):
+        with self.lock:
+            if self.data.get(k) == token:
+                del self.data[k]
+                return 1
+            return 0
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.ops = redis, []
+
+    def set(self, *args, **kw):
+        self.ops.append(("set", args, kw))
+
+    def publish(self, *args):
+        self.ops.append(("publish", args, {}))
+
+    def __getattr__(self, op):  # sadd, expire, smembers, delete
+        return lambda *args, **kw: self.ops.append((op, args, kw))
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [FakeRedis.__dict__[op](self.redis, *args, **kw) for op, args, kw in self.ops]
+
+
+class AsyncFakePipeline(FakePipeline):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def execute(self):
+        return FakePipeline.execute(self)
+
+
+class AsyncFakeRedis(FakeRedis):
+    async def get(self, k):
+        return FakeRedis.get(self, k)
+
+    async def set(self, k, v, **kw):
+        return FakeRedis.set(self, k, v, **kw)
+
+    async def eval(self, *args):
+        return FakeRedis.eval(self, *args)
+
+    async def publish(self, *args):
+        return FakeRedis.publish(self, *args)
+
+    async def mget(self, keys):
+        return FakeRedis.mget(self, keys)
+
+    def pipeline(self, transaction=True):
+        return AsyncFakePipeline(self)
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    monkeypatch.setattr(redis_cache, "rds", FakeRedis())
+    monkeypatch.setattr(redis_cache, "ards", AsyncFakeRedis())
+    monkeypatch.setattr(redis_cache, "LEASE_POLL_S", 0.005)
+    monkeypatch.setattr(redis_cache, "_stats", redis_cache.Counter())
+    monkeypatch.setattr(redis_cache, "l1", LocalCache(1 << 20))
+
+
+def test_concurrent_misses_run_the_loader_once():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"venues": [1, 2, 3]}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(redis_cache.get_or_set("t", {"a": 1}, 1, loader)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"venues": [1, 2, 3]}] * 8
+    assert redis_cache.cache_stats()["suppressed"] == 7
+    assert not redis_cache.rds.data.get("lease:" + redis_cache._key("t", {"a": 1}))
+
+
+def test_waits_on_another_workers_lease():
+    k = redis_cache._key("t", {"a": 2})
+    redis_cache.rds.set("lease:" + k, "other-worker")
+    threading.Timer(0.03, lambda: redis_cache.rds.set(k, '"theirs"')).start()
+
+    assert redis_cache.get_or_set("t", {"a": 2}, 1, lambda: "ours") == "theirs"
+    assert redis_cache.cache_stats()["coalesced_remote"] == 1
+
+
+def test_loader_errors_reach_every_waiter_and_release_the_lease():
+    def loader():
+        time.sleep(0.02)
+        raise RuntimeError("firestore down")
+
+    errors = []
+
+    def call():
+        try:
+            redis_cache.get_or_set("t", {"a": 3}, 1, loader)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(errors) == 4
+    assert redis_cache.rds.data == {}
+
+
+def test_async_single_flight():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return [1]
+
+    async def main():
+        return await asyncio.gather(*(redis_cache.get_or_set_async("t", {"a": 4}, 1, loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == [[1]] * 5
+    assert len(calls) == 1
+    assert redis_cache.cache_stats()["coalesced_local"] == 4
+
+
+def _put(name, params, value, soft_in, delta=0.0):
+    k = redis_cache._key(name, params)
+    redis_cache.rds.data[k] = redis_cache.json.dumps(
+        {redis_cache.ENVELOPE: 1, "v": value, "soft": time.time() + soft_in, "delta": delta}
+    )
+    return k
+
+
+def test_stale_value_is_served_while_refreshing_in_background():
+    k = _put("t", {"a": 5}, "old", soft_in=-1)
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return "new"
+
+    assert redis_cache.get_or_set("t", {"a": 5}, 1, loader) == "old"
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if redis_cache._unwrap(redis_cache.rds.data[k])[0] == "new":
+            break
+        time.sleep(0.01)
+    assert redis_cache.get_or_set("t", {"a": 5}, 1, lambda: "unused") == "new"
+    assert redis_cache.cache_stats()["stale_served"] == 1
+
+
+def test_early_refresh_probability_rises_near_expiry(monkeypatch):
+    fires = lambda soft_in, delta: sum(
+        redis_cache._needs_refresh(time.time() + soft_in, delta) == "early" for _ in range(500)
+    )
+    assert fires(3600, 0.5) == 0          # far from expiry: never
+    assert 0 < fires(0.5, 0.5) < 500      # within one load time: sometimes
+    assert fires(0.5, 0.0) == 0           # unknown load time: no early refresh
+    monkeypatch.setattr(redis_cache, "EARLY_REFRESH_BETA", 0)
+    assert fires(0.01, 5.0) == 0
+
+
+def test_plain_json_from_before_swr_still_reads():
+    redis_cache.rds.data[redis_cache._key("t", {"a": 6})] = '{"venues": []}'
+    assert redis_cache.get_or_set("t", {"a": 6}, 1, lambda: "unused") == {"venues": []}
+
+
+def test_hard_expiry_is_ttl_plus_stale_window():
+    _, ex, _, _ = redis_cache._wrap([], 1, None, 0.1)
+    assert ex == 3600  # no stale window unless asked for
+    _, ex, _, _ = redis_cache._wrap([], 1, 0.25, 0.1)
+    assert ex == 4500
+
+
+def test_l1_serves_repeat_hits_without_redis():
+    redis_cache.get_or_set("t", {"a": 7}, 1, lambda: [1, 2])
+    redis_cache.rds.data.clear()  # L1 alone answers now
+    assert redis_cache.get_or_set("t", {"a": 7}, 1, lambda: "unused") == [1, 2]
+    stats = redis_cache.cache_stats()
+    assert (stats["misses"], stats["l1_hits"]) == (1, 1)
+
+
+def test_invalidation_from_another_worker_drops_l1_copy():
+    k = _put("t", {"a": 8}, "v1", soft_in=60)
+    assert redis_cache.get_or_set("t", {"a": 8}, 1, lambda: "unused") == "v1"
+    assert redis_cache.l1.get(k) is not None
+
+    redis_cache._on_invalidate({"data": redis_cache.json.dumps({"k": k, "from": "other"})})
+    assert redis_cache.l1.get(k) is None
+
+    redis_cache.invalidate("t", {"a": 8})
+    assert k not in redis_cache.rds.data
+    assert redis_cache.json.loads(redis_cache.rds.published[-1])["k"] == k
+
+
+def test_lru_respects_byte_budget_and_ttl():
+    cache = LocalCache(max_bytes=100)
+    cache.put("a", "A", 40, ttl_s=60)
+    cache.put("b", "B", 40, ttl_s=60)
+    cache.get("a")                       # a is now most recent
+    cache.put("c", "C", 40, ttl_s=60)    # evicts b
+    assert cache.get("b") is None and cache.get("a").value == "A"
+    assert cache.bytes == 80 and cache.evictions == 1
+    cache.put("d", "D", 500, ttl_s=60)   # larger than the whole budget
+    assert cache.get("d") is None
+    cache.put("e", "E", 1, ttl_s=-1)
+    assert cache.get("e") is None
+
+
+def test_get_or_set_many_loads_only_missing_keys_in_one_batch():
+    redis_cache.set_many("fsq", [({"id": "a"}, {"v": "A"})], 1)
+    redis_cache.l1.clear()
+    batches = []
+
+    def loader(params_list):
+        batches.append([p["id"] for p in params_list])
+        return [{"v": p["id"].upper()} for p in params_list]
+
+    params = [{"id": i} for i in ("a", "b", "c")]
+    trips = redis_cache.rds.round_trips
+    assert redis_cache.get_or_set_many("fsq", params, 1, loader) == [{"v": "A"}, {"v": "B"}, {"v": "C"}]
+    assert batches == [["b", "c"]]
+    assert redis_cache.rds.round_trips - trips == 3  # MGET, claim leases, write + release
+    assert not [k for k in redis_cache.rds.data if k.startswith("lease:")]
+
+    redis_cache.l1.clear()
+    assert redis_cache.get_many("fsq", params + [{"id": "z"}]) == [{"v": "A"}, {"v": "B"}, {"v": "C"}, None]
+
+
+def test_batch_entries_are_tagged_per_params():
+    tags = lambda params, value: [f"geo:{params['cell']}"]
+    redis_cache.get_or_set_many("cell", [{"cell": "9q5"}, {"cell": "9qh"}], 1, lambda ps: [[p["cell"]] for p in ps], tags=tags)
+    redis_cache.set_many("cell", [({"cell": "9q8"}, ["sf"])], 1, tags=tags)
+
+    assert redis_cache.invalidate_tags(["geo:9q5", "geo:9q8"]) == 2
+    assert redis_cache.get_many("cell", [{"cell": c} for c in ("9q5", "9qh", "9q8")]) == [None, ["9qh"], None]
+
+
+def test_batch_miss_waits_for_a_key_another_worker_is_loading():
+    held = redis_cache._key("cell", {"cell": "b"})
+    redis_cache.rds.data["lease:" + held] = "other-worker"
+    batches = []
+
+    def other_worker_finishes():
+        time.sleep(0.03)
+        redis_cache.set_many("cell", [({"cell": "b"}, "B from elsewhere")], 1)
+        redis_cache.rds.delete("lease:" + held)
+
+    def loader(params_list):
+        batches.append([p["cell"] for p in params_list])
+        return [p["cell"].upper() for p in params_list]
+
+    t = threading.Thread(target=other_worker_finishes)
+    t.start()
+    got = redis_cache.get_or_set_many("cell", [{"cell": "a"}, {"cell": "b"}], 1, loader)
+    t.join()
+    assert got == ["A", "B from elsewhere"]
+    assert batches == [["a"]]
+    assert redis_cache.cache_stats()["coalesced_remote"] == 1
+
+
+def test_batch_refresh_skips_keys_leased_elsewhere(monkeypatch):
+    monkeypatch.setattr(redis_cache, "_refresh_pool", SimpleNamespace(submit=lambda fn, *a: fn(*a)))
+    params = [{"cell": "a"}, {"cell": "b"}]
+    redis_cache.get_or_set_many("cell", params, 1, lambda ps: ["old"] * len(ps))
+    redis_cache.l1.clear()
+    for p in params:  # push both past their soft expiry
+        k = redis_cache._key("cell", p)
+        payload, ex, _, _ = redis_cache._wrap("old", -1, 1, 0.0)
+        redis_cache.rds.data[k] = payload
+    redis_cache.rds.data["lease:" + redis_cache._key("cell", params[1])] = "other-worker"
+
+    refreshed = []
+    def loader(ps):
+        refreshed.extend(p["cell"] for p in ps)
+        return ["new"] * len(ps)
+
+    assert redis_cache.get_or_set_many("cell", params, 1, loader) == ["old", "old"]  # stale served
+    assert refreshed == ["a"]
+
+
+def test_async_batch_api():
+    async def loader(params_list):
+        return [p["id"] * 2 for p in params_list]
+
+    async def main():
+        await redis_cache.set_many_async("t", [({"id": "x"}, "cached")], 1)
+        redis_cache.l1.clear()
+        got = await redis_cache.get_or_set_many_async("t", [{"id": "x"}, {"id": "y"}], 1, loader)
+        return got, await redis_cache.get_many_async("t", [{"id": "y"}])
+
+    assert asyncio.run(main()) == (["cached", "yy"], ["yy"])
+
+
+def test_venue_write_evicts_only_tiles_under_its_geohash():
+    redis_cache.get_or_set("venue_tile", {"tile": "9q5ct"}, 1, lambda: ["hollywood"], tags=["geo:9q5c", "geo:9q5f"])
+    redis_cache.get_or_set("venue_tile", {"tile": "9q5cg"}, 1, lambda: ["weho"], tags=lambda v: ["geo:9q5cg"])
+    redis_cache.get_or_set("venue_tile", {"tile": "9qh0"}, 1, lambda: ["pasadena"], tags=["geo:9qh0"])
+
+    evicted = redis_cache.invalidate_venue("v1", {"geohash": "9q5cgt0zz"})
+    assert evicted == 2
+    keys = [redis_cache._key("venue_tile", {"tile": t}) for t in ("9q5ct", "9q5cg", "9qh0")]
+    assert [k in redis_cache.rds.data for k in keys] == [False, False, True]
+    assert redis_cache.l1.get(keys[0]) is None and redis_cache.l1.get(keys[2]) is not None
+
+
+def test_moved_venue_invalidates_old_and_new_location():
+    old = {"location": {"lat": 34.10, "lng": -118.34}}
+    new = {"location": {"lat": 37.77, "lng": -122.42}}
+    tags = set(redis_cache.venue_write_tags(old)) | set(redis_cache.venue_write_tags(new))
+    redis_cache.get_or_set("t", {"sf": 1}, 1, lambda: 1, tags=["geo:9q8y"])
+    redis_cache.get_or_set("t", {"la": 1}, 1, lambda: 1, tags=["geo:9q5c"])
+    assert {"geo:9q5c", "geo:9q8y"} <= tags and all(t.startswith("geo:") for t in tags)
+    assert redis_cache.venue_write_tags({"name": "no location"}) == []
+    assert redis_cache.invalidate_venue("v", old, new) == 2
+
+
+def test_failed_nearby_fetch_is_not_cached(monkeypatch):
+    from services import google_places
+
+    calls = []
+    def get_json(api, url, params=None, **kwargs):
+        calls.append(url)
+        raise google_places.UpstreamError("google", "HTTP 503", 503)
+
+    monkeypatch.setattr(google_places.cfg, "APIS_ENABLED", True)
+    monkeypatch.setattr(google_places, "acquire", lambda api, timeout=None: True)
+    monkeypatch.setattr(google_places, "charge", lambda endpoint, cost=None: None)
+    monkeypatch.setattr(google_places.http_client, "get_json", get_json)
+
+    assert google_places.get_google_venues(34.1, -118.3) == []
+    assert google_places.get_google_venues(34.1, -118.3) == []
+    assert len(calls) == 2  # the failure wasn't stored as an empty result
+    assert not any(k.startswith("google_nearby") for k in redis_cache.rds.data)
+
+
+def test_nearby_search_serves_stale_while_one_refresh_runs(monkeypatch):
+    from services import google_places
+
+    stale_windows, loads = [], []
+    wrap = redis_cache._wrap
+    monkeypatch.setattr(redis_cache, "_wrap", lambda v, ttl, stale, d: stale_windows.append(stale) or wrap(v, ttl, stale, d))
+    started, release = threading.Event(), threading.Event()
+
+    def fetch(lat, lng, radius=2000):
+        loads.append((lat, lng))
+        started.set()
+        release.wait(1)
+        return ["new"]
+
+    monkeypatch.setattr(google_places, "_fetch_nearby", fetch)
+    k = _put("google_nearby", {"lat": 34.1, "lng": -118.3, "r": 2000}, ["old"], soft_in=-1)
+
+    assert [google_places.get_google_venues(34.1, -118.3) for _ in range(5)] == [["old"]] * 5
+    assert started.wait(1)
+    release.set()
+    for _ in range(100):
+        if redis_cache._unwrap(redis_cache.rds.data[k])[0] == ["new"]:
+            break
+        time.sleep(0.01)
+    assert len(loads) == 1
+    assert stale_windows == [google_places.cfg.CACHE_STALE_HOURS] and stale_windows[0] > 0
@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+
+import services.foursquare as foursquare
+import services.google_places as google_places
+import services.response_cache as response_cache_module
+from services.response_cache import ResponseCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.sqlite3"))
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1_000_000.0}
+    monkeypatch.setattr(response_cache_module.time, "time", lambda: now["t"])
+    return now
+
+def test_only_missing_fields_are_fetched(cache):
+    asked = []
+
+    def fetch(missing):
+        asked.append(missing)
+        return {"website": "https://bar.example", "rating": 4.5, "extra": "ignored"}
+
+    assert cache.fields("google_details", "p1", ["website"], fetch) == {"website": "https://bar.example"}
+    assert cache.fields("google_details", "p1", ["website", "rating"], fetch) == {
+        "website": "https://bar.example", "rating": 4.5,
+    }
+    assert cache.fields("google_details", "p1", ["rating", "website"], fetch)["rating"] == 4.5
+    assert asked == [["website"], ["rating"]]
+
+def test_fields_expire_on_their_own_ttl(cache, clock):
+    cache.store("google_details", "p1", {"opening_hours": {"open_now": True}, "geometry": {"location": {}}})
+    clock["t"] += 8 * response_cache_module.DAY  # hours last a week, geometry months
+    found, missing = cache.lookup("google_details", "p1", ["opening_hours", "geometry"])
+    assert missing == ["opening_hours"]
+    assert "geometry" in found
+
+def test_missing_values_are_cached_as_none(cache):
+    calls = []
+    fetch = lambda missing: calls.append(missing) or {}
+    assert cache.fields("google_details", "p1", ["price_level"], fetch) == {"price_level": None}
+    assert cache.fields("google_details", "p1", ["price_level"], fetch) == {"price_level": None}
+    assert len(calls) == 1
+
+def test_not_found_is_cached_until_it_expires(cache, clock):
+    calls = []
+    fetch = lambda missing: calls.append(missing)
+    assert cache.fields("google_find_place", "nowhere bar", ["place_id"], fetch) is None
+    assert cache.fields("google_find_place", "nowhere bar", ["place_id"], fetch) is None
+    assert len(calls) == 1
+
+    clock["t"] += response_cache_module.NOT_FOUND_TTL_S + 1
+    assert cache.fields("google_find_place", "nowhere bar", ["place_id"], lambda m: {"place_id": "p9"}) == {
+        "place_id": "p9",
+    }
+    assert cache.lookup("google_find_place", "nowhere bar", ["place_id"]) == ({"place_id": "p9"}, [])
+
+def test_failed_fetch_caches_nothing(cache):
+    def boom(missing):
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.fields("google_details", "p1", ["website"], boom)
+    assert cache.lookup("google_details", "p1", ["website"]) == ({}, ["website"])
+
+def test_async_fetch_and_purge(cache, clock):
+    async def fetch(missing):
+        return {"tips": ["great patio"]}
+
+    assert asyncio.run(cache.afields("fsq_tips", "f1", ["tips"], fetch)) == {"tips": ["great patio"]}
+    clock["t"] += 30 * response_cache_module.DAY
+    assert cache.purge_expired() == 1
+
+def test_disabled_cache_always_fetches(tmp_path):
+    cache = ResponseCache(str(tmp_path / "off.sqlite3"), enabled=False)
+    calls = []
+    for _ in range(2):
+        cache.fields("google_details", "p1", ["website"], lambda m: calls.append(m) or {"website": None})
+    assert len(calls) == 2
+    assert not (tmp_path / "off.sqlite3").exists()
+
+def test_place_details_only_pays_for_uncached_fields(cache, monkeypatch):
+    charged, requested = [], []
+
+    def get_json(api, url, params=None, **kwargs):
+        requested.append(params["fields"])
+        return {"status": "OK", "result": {f: f.upper() for f in params["fields"].split(",")}}
+
+    monkeypatch.setattr(google_places, "response_cache", cache)
+    monkeypatch.setattr(google_places.http_client, "get_json", get_json)
+    monkeypatch.setattr(google_places, "charge", lambda endpoint, cost=None: charged.append(cost))
+
+    assert google_places.place_details("p1", ["website"]) == {"website": "WEBSITE"}
+    assert google_places.place_details("p1", ["website", "opening_hours"]) == {
+        "website": "WEBSITE", "opening_hours": "OPENING_HOURS",
+    }
+    assert google_places.place_details("p1", ["opening_hours"]) == {"opening_hours": "OPENING_HOURS"}
+    assert requested == ["website", "opening_hours"]
+    assert charged == [pytest.approx(0.02), pytest.approx(0.02)]
+
+def test_place_details_not_found_is_negative_cached(cache, monkeypatch):
+    calls = []
+
+    def get_json(api, url, params=None, **kwargs):
+        calls.append(params)
+        return {"status": "NOT_FOUND"}
+
+    monkeypatch.setattr(google_places, "response_cache", cache)
+    monkeypatch.setattr(google_places.http_client, "get_json", get_json)
+    monkeypatch.setattr(google_places, "charge", lambda endpoint, cost=None: None)
+
+    assert google_places.place_details("gone", ["website"]) is None
+    assert google_places.place_details("gone", ["opening_hours"]) is None
+    assert len(calls) == 1
+
+def test_places_error_status_raises():
+    with pytest.raises(google_places.UpstreamError):
+        google_places.places_result({"status": "OVER_QUERY_LIMIT", "error_message": "slow down"})
+
+def test_invalid_request_raises_and_caches_nothing(cache, monkeypatch):
+    monkeypatch.setattr(google_places, "response_cache", cache)
+    monkeypatch.setattr(google_places.http_client, "get_json", lambda api, url, params=None, **kw: {"status": "INVALID_REQUEST"})
+    monkeypatch.setattr(google_places, "charge", lambda endpoint, cost=None: None)
+
+    with pytest.raises(google_places.UpstreamError):
+        google_places.place_details("bad", ["website"])
+    assert cache.lookup("google_details", "bad", ["website"]) == ({}, ["website"])
+
+@pytest.mark.parametrize("status,cached", [(404, True), (400, False)])
+def test_foursquare_caches_only_404_as_not_found(cache, monkeypatch, status, cached):
+    def get_json(api, url, **kwargs):
+        raise foursquare.UpstreamError("foursquare", f"HTTP {status}", status)
+
+    monkeypatch.setattr(foursquare, "response_cache", cache)
+    monkeypatch.setattr(foursquare.http_client, "get_json", get_json)
+    monkeypatch.setattr(foursquare, "charge", lambda endpoint, cost=None: None)
+
+    if cached:
+        assert foursquare.place_details("f1", ["website"]) is None
+    else:
+        with pytest.raises(foursquare.UpstreamError):
+            foursquare.place_details("f1", ["website"])
+    assert (cache.lookup("fsq_details", "f1", ["website"]) == ({}, ["website"])) is not cached
+
+def test_lookups_wait_on_the_shared_rate_limit(cache, monkeypatch):
+    charged, waited = [], []
+
+    def acquire(api, timeout=None):
+        waited.append((api, timeout))
+        return False
+
+    monkeypatch.setattr(google_places, "response_cache", cache)
+    monkeypatch.setattr(google_places, "acquire", acquire)
+    monkeypatch.setattr(google_places, "charge", lambda endpoint, cost=None: charged.append(endpoint))
+    monkeypatch.setattr(foursquare, "response_cache", cache)
+    monkeypatch.setattr(foursquare, "acquire", acquire)
+    monkeypatch.setattr(foursquare, "charge", lambda endpoint, cost=None: charged.append(endpoint))
+
+    for lookup in (
+        lambda: google_places.place_details("p1", ["website"]),
+        lambda: google_places.find_place_id("bar, LA"),
+        lambda: google_places.text_search("bar", "34,-118", 500),
+        lambda: foursquare.place_details("f1", ["website"]),
+        lambda: foursquare.find_fsq_id({"query": "bar"}, wait=5),
+    ):
+        with pytest.raises(google_places.RateLimited):
+            lookup()
+    assert charged == []  # no token, no charge, nothing cached
+    assert [api for api, _ in waited] == ["google"] * 3 + ["foursquare"] * 2
+    assert waited[-1] == ("foursquare", 5)
+    assert cache.lookup("google_details", "p1", ["website"]) == ({}, ["website"])
@@ -0,0 +1,88 @@
+import gzip
+
+import orjson
+import pytest
+from starlette.requests import Request
+
+from app import responses
+from app.responses import etag_matches, json_response, parse_fields, project, query_etag
+
+BIG = [{"id": f"v{i}", "name": "x" * 40, "distance": i} for i in range(40)]
+
+def _request(path="/api/venues/discover", query="", **headers):
+    return Request({
+        "type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+    })
+
+@pytest.mark.parametrize("header,matches", [
+    ('W/"7-abc"', True),
+    ("*", True),
+    ('"other", W/"7-abc"', True),
+    ('"7-abc"', True),          # weak comparison ignores W/
+    ('W/"7-abd", "x"', False),
+    ("", False),
+])
+def test_if_none_match(header, matches):
+    request = _request(if_none_match=header) if header else _request()
+    assert etag_matches(request, 'W/"7-abc"') is matches
+    res = json_response(request, BIG, {"X-Dataset-Version": "7"}, etag='W/"7-abc"')
+    assert res.status_code == (304 if matches else 200)
+    assert res.headers["ETag"] == 'W/"7-abc"' and res.headers["X-Dataset-Version"] == "7"
+    if matches:
+        assert res.body == b""
+
+def test_body_etag_round_trips_without_a_precomputed_tag():
+    etag = json_response(_request(), BIG).headers["ETag"]
+    assert json_response(_request(if_none_match=etag), BIG).status_code == 304
+
+@pytest.fixture
+def fake_brotli(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", type("Brotli", (), {"compress": staticmethod(lambda b, quality: b"br:" + b)}))
+
+@pytest.mark.parametrize("accept,coding", [
+    ("gzip", "gzip"),
+    ("br, gzip", "br"),
+    ("gzip, br;q=0", "gzip"),
+    ("br; q=0.0, gzip;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+])
+def test_encoding_negotiation(fake_brotli, accept, coding):
+    res = json_response(_request(accept_encoding=accept), BIG)
+    assert res.headers.get("Content-Encoding") == coding
+    assert res.headers["Vary"] == "Accept-Encoding"
+    body = {"gzip": gzip.decompress, "br": lambda b: b[3:], None: lambda b: b}[coding](res.body)
+    assert orjson.loads(body) == BIG
+
+def test_gzip_without_brotli_installed(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    assert json_response(_request(accept_encoding="br, gzip"), BIG).headers["Content-Encoding"] == "gzip"
+
+def test_small_bodies_are_not_compressed(monkeypatch):
+    small = [{"id": "v1"}]
+    res = json_response(_request(accept_encoding="gzip"), small)
+    assert "Content-Encoding" not in res.headers and res.headers["Vary"] == "Accept-Encoding"
+
+    size = len(orjson.dumps(small))
+    monkeypatch.setattr(responses, "COMPRESS_MIN_BYTES", size)
+    assert json_response(_request(accept_encoding="gzip"), small).headers["Content-Encoding"] == "gzip"
+    monkeypatch.setattr(responses, "COMPRESS_MIN_BYTES", size + 1)
+    assert "Content-Encoding" not in json_response(_request(accept_encoding="gzip"), small).headers
+
+def test_projection_always_keeps_id_and_distance():
+    venues = [{"id": "v1", "distance": 12.5, "name": "Bar", "rating": 4.2, "hours": {}}]
+    assert project(venues, parse_fields("name, rating")) == [{"id": "v1", "distance": 12.5, "name": "Bar", "rating": 4.2}]
+    assert project(venues, parse_fields(" , ")) == [{"id": "v1", "distance": 12.5}]
+    assert project(venues, parse_fields(None)) == venues
+    assert parse_fields("") is None
+
+def test_query_etag_ignores_param_order():
+    a = query_etag(3, _request(query="lat=34.1&lng=-118.3&price_level=1&price_level=2"))
+    b = query_etag(3, _request(query="price_level=1&lng=-118.3&price_level=2&lat=34.1"))
+    assert a == b and a.startswith('W/"3-')
+    assert query_etag(4, _request(query="lat=34.1&lng=-118.3&price_level=1&price_level=2")) != a
+    assert query_etag(3, _request(query="lat=34.1&lng=-118.3&price_level=1&price_level=2"), "12:00") != a
+    assert query_etag(3, _request(path="/api/async/venues/discover", query="lat=34.1&lng=-118.3")) != query_etag(
+        3, _request(query="lat=34.1&lng=-118.3")
+    )
@@ -0,0 +1,54 @@
+import json
+import logging
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.timing import TimingMiddleware, current, note, span
+
+def _app(slow_ms):
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware, slow_ms=slow_ms)
+
+    @app.get("/t/discover")
+    def discover(lat: float):
+        with span("firestore"):
+            time.sleep(0.01)
+        with span("sort"):
+            pass
+        with span("sort"):
+            pass
+        note(candidates=42)
+        return {"ok": True}
+
+    return app
+
+def test_server_timing_header_lists_spans():
+    resp = TestClient(_app(slow_ms=10_000)).get("/t/discover?lat=34.1")
+    parts = [p.strip() for p in resp.headers["server-timing"].split(",")]
+    names = [p.split(";")[0] for p in parts]
+    assert names == ["firestore", "sort", "total"]
+    firestore_ms = float(parts[0].split("dur=")[1])
+    assert firestore_ms >= 10
+
+def test_slow_requests_are_logged(caplog):
+    with caplog.at_level(logging.WARNING, logger="clubview.slow_requests"):
+        TestClient(_app(slow_ms=0)).get("/t/discover?lat=34.1")
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["event"] == "slow_request"
+    assert record["route"] == "/t/discover"
+    assert record["params"] == {"lat": "34.1"}
+    assert record["notes"] == {"candidates": 42}
+    assert record["status"] == 200
+    assert set(record["spans_ms"]) == {"firestore", "sort"}
+
+def test_fast_requests_are_not_logged(caplog):
+    with caplog.at_level(logging.WARNING, logger="clubview.slow_requests"):
+        TestClient(_app(slow_ms=10_000)).get("/t/discover?lat=34.1")
+    assert not caplog.records
+
+def test_helpers_are_noops_outside_a_request():
+    assert current() is None
+    with span("anything"):
+        note(candidates=1)
@@ -0,0 +1,64 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from services.venue_filters import BitmapIndex, VenueFilters, bitmap_to_mask
+
+CATEGORIES = ["Bar", "Cocktail Bar", "Nightclub", "Lounge", "Karaoke Bar", "Pub"]
+
+def _rows(n=300, seed=0):
+    rnd = random.Random(seed)
+    return [
+        {
+            "categories": rnd.sample(CATEGORIES, rnd.randint(0, 2)),
+            "price_level": rnd.choice([None, 1, 2, 3, 4]),
+            "rating": rnd.choice([None, round(rnd.uniform(5, 9.9), 1)]),
+            "is_nightlife": rnd.random() < 0.4,
+        }
+        for _ in range(n)
+    ]
+
+FILTERS = [
+    VenueFilters(category=c, price_levels=p, min_rating=r, nightlife=nl)
+    for c, p, r, nl in itertools.product(
+        [None, "bar", "nope"], [(), (1, 3)], [None, 7.0, 8.3], [None, True, False]
+    )
+]
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_plan_matches_row_at_a_time(filters):
+    rows = _rows()
+    index = BitmapIndex(rows)
+    bitmap = index.plan(filters)
+    if not filters:
+        assert bitmap is None
+        return
+    expected = [i for i, row in enumerate(rows) if filters.matches(row)]
+    assert list(np.flatnonzero(bitmap_to_mask(bitmap, len(rows)))) == expected
+
+@pytest.mark.parametrize("needle", ["bar", "BAR", "cocktail bar", "bar night", "club lounge", " "])
+def test_category_rule_is_the_same_on_both_paths(needle):
+    rows = [{"categories": ["Cocktail Bar", "Nightclub"]}, {"categories": ["Lounge"]}, {"categories": []}]
+    filters = VenueFilters(category=needle)
+    bitmap = BitmapIndex(rows).plan(filters)
+    expected = [i for i, row in enumerate(rows) if filters.matches(row)]
+    assert list(np.flatnonzero(bitmap_to_mask(bitmap, len(rows)))) == expected
+
+def test_empty_predicate_short_circuits():
+    index = BitmapIndex(_rows())
+    assert index.plan(VenueFilters(category="nope", nightlife=True)) == 0
+
+def test_open_at_is_a_residual_not_a_bitmap():
+    from datetime import datetime
+    from services.hours import hours_intervals
+    rows = [
+        {"categories": ["Bar"], "hours_intervals": hours_intervals({"friday": "5:00 PM – 2:00 AM"})},
+        {"categories": ["Bar"], "hours_intervals": hours_intervals({"friday": "11:00 AM – 4:00 PM"})},
+        {"categories": ["Bar"]},
+    ]
+    filters = VenueFilters(category="bar", open_at=datetime(2025, 7, 18, 23, 30))
+    assert list(np.flatnonzero(bitmap_to_mask(BitmapIndex(rows).plan(filters), 3))) == [0, 1, 2]
+    assert [filters.residual()(row) for row in rows] == [True, False, False]
+    assert [filters.matches(row) for row in rows] == [True, False, False]
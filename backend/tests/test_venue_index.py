@@ -0,0 +1,196 @@
+from types import SimpleNamespace
+
+from services.venue_index import VenueIndex
+
+def _doc(venue_id, lat, lng, update_time=None, **extra):
+    data = {"name": venue_id, "location": {"lat": lat, "lng": lng}, **extra}
+    return SimpleNamespace(id=venue_id, to_dict=lambda: data, update_time=update_time)
+
+def _index(*docs):
+    index = VenueIndex()
+    index.build(docs)
+    return index
+
+def test_query_sorted_and_radius_bounded():
+    index = _index(
+        _doc("weho", 34.0900, -118.3617),
+        _doc("hollywood", 34.1016, -118.3387),
+        _doc("sf", 37.7749, -122.4194),
+    )
+    results = index.query(34.0983, -118.3452, radius_m=10_000)
+    assert [v["id"] for v in results] == ["hollywood", "weho"]
+    assert results[0]["distance"] < results[1]["distance"]
+
+def test_query_crosses_cell_boundaries():
+    # Straddle a grid line: both venues must be found from either side
+    index = _index(_doc("a", 34.0999, -118.30), _doc("b", 34.1001, -118.30))
+    assert {v["id"] for v in index.query(34.0999, -118.30, radius_m=500)} == {"a", "b"}
+
+def test_predicate_and_missing_location():
+    index = _index(
+        _doc("bar", 34.10, -118.34, categories=["Bar"]),
+        _doc("club", 34.10, -118.34, categories=["Nightclub"]),
+        SimpleNamespace(id="nowhere", to_dict=lambda: {"name": "nowhere", "location": {}}),
+    )
+    assert len(index) == 2
+    results = index.query(34.10, -118.34, predicate=lambda d: "Bar" in d["categories"])
+    assert [v["id"] for v in results] == ["bar"]
+
+def test_build_bumps_version():
+    index = VenueIndex()
+    assert not index.ready
+    index.build([])
+    index.build([_doc("a", 34.1, -118.3)])
+    assert index.ready and index.version == 2
+
+def _ids(results):
+    return [v["id"] for v in results]
+
+def test_apply_changes_matches_rebuild():
+    from services.venue_filters import VenueFilters
+    index = _index(
+        _doc("a", 34.10, -118.34, categories=["Bar"]),
+        _doc("b", 34.11, -118.34, categories=["Nightclub"]),
+        _doc("c", 34.12, -118.34, categories=["Bar"]),
+    )
+    before = index.version
+    index.apply_changes([
+        ("a", None),                                                               # delete
+        ("b", {"name": "b", "location": {"lat": 34.30, "lng": -118.10}, "categories": ["Bar"]}),  # move cells
+        ("d", {"name": "d", "location": {"lat": 34.10, "lng": -118.34}, "categories": ["Bar"]}),  # insert
+        ("c", {"name": "c", "location": {}}),                                      # lost its location
+    ])
+    assert index.version > before
+    assert len(index) == 2
+    assert _ids(index.query(34.10, -118.34)) == ["d", "b"]
+    assert _ids(index.top_k(34.10, -118.34, 5, filters=VenueFilters(category="bar"))) == ["d", "b"]
+    assert _ids(index.top_k(34.10, -118.34, 5, filters=VenueFilters(category="club"))) == []
+
+def test_given_version_is_kept_as_is():
+    index = VenueIndex()
+    index.load([], version=1_000)
+    index.apply_changes([], version=500)  # a data fingerprint, not a clock
+    assert index.version == 500
+    index.apply_changes([])
+    assert index.version == 501
+
+def test_tombstones_compact():
+    index = _index(*[_doc(f"v{i}", 34.1, -118.3) for i in range(100)])
+    index.apply_changes([(f"v{i}", None) for i in range(80)])
+    assert len(index) == 20 and len(index._ids) == 20
+    assert len(index.query(34.1, -118.3)) == 20
+
+def test_memory_stats_track_tombstones():
+    index = _index(_doc("a", 34.10, -118.34), _doc("b", 34.11, -118.34))
+    index.apply_changes([("a", None)])
+    stats = index.memory_stats()
+    assert (stats["venues"], stats["slots"], stats["tombstones"]) == (1, 2, 1)
+    assert stats["coord_bytes"] >= 2 * 2 * 8
+
+def test_change_batches_leave_earlier_snapshots_untouched():
+    index = _index(_doc("a", 34.10, -118.34, categories=["Bar"], rating=4.0), _doc("b", 34.10, -118.34))
+    with index._lock:
+        ids, data, lats, bitmaps = index._ids, index._data, index._lat, index._bitmaps
+    before = (list(ids), list(data), lats.copy(), dict(bitmaps.categories), bitmaps.all)
+
+    index.apply_changes([
+        ("a", None),
+        ("b", {"name": "b", "location": {"lat": 34.20, "lng": -118.30}, "categories": ["Club"]}),
+        ("c", {"name": "c", "location": {"lat": 34.10, "lng": -118.34}}),
+    ])
+    assert (ids, data, dict(bitmaps.categories), bitmaps.all) == (before[0], before[1], before[3], before[4])
+    assert (lats == before[2]).all()
+    assert _ids(index.query(34.10, -118.34, radius_m=100)) == ["c"]
+
+def test_queries_stay_consistent_during_live_updates():
+    import sys
+    import threading
+    from services.venue_filters import VenueFilters
+
+    index = _index(*(
+        _doc(f"v{i}", 34.10 + i * 1e-4, -118.34, categories=[f"Cat{i % 7}", "Bar"], rating=3 + i % 5 * 0.4)
+        for i in range(300)
+    ))
+    filters = VenueFilters(category="cat3", min_rating=3.5)
+    stop, errors = threading.Event(), []
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            n = 300 + i % 50
+            index.apply_changes([
+                (f"v{n}", {"name": f"v{n}", "location": {"lat": 34.10, "lng": -118.34},
+                           "categories": [f"Cat{i % 11}"], "rating": 4.0}),
+                (f"v{i % 300}", None if i % 3 == 0 else {
+                    "name": f"v{i % 300}", "location": {"lat": 34.11, "lng": -118.34},
+                    "categories": ["Cat3"], "rating": 4.5}),
+            ])
+            i += 1
+
+    def reader():
+        try:
+            for _ in range(300):
+                for v in index.top_k(34.10, -118.34, 20, radius_m=5_000, filters=filters):
+                    assert any("cat3" in c.lower() for c in v["categories"]) and v["rating"] >= 3.5
+        except Exception as e:  # surfaced below; a thread's exception is otherwise lost
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads often enough to hit the races
+    try:
+        for t in threads:
+            t.start()
+        for t in threads[1:]:
+            t.join()
+    finally:
+        stop.set()
+        threads[0].join()
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+def test_replica_reports_old_and_new_data_to_listeners():
+    from services.venue_replica import VenueReplica
+
+    def change(kind, doc):
+        return SimpleNamespace(type=SimpleNamespace(name=kind), document=doc)
+
+    index, heard = VenueIndex(), []
+    replica = VenueReplica(index, collection=None)
+    replica.subscribe(lambda changes, version: heard.append(changes))
+    replica._on_snapshot([_doc("a", 34.10, -118.34), _doc("b", 34.20, -118.30)], [], None)
+    assert heard == []  # the initial load isn't a change
+
+    replica._on_snapshot([], [
+        change("MODIFIED", _doc("a", 34.50, -118.34)),
+        change("REMOVED", _doc("b", 34.20, -118.30)),
+    ], None)
+    (changes,) = heard
+    assert [(vid, old["location"]["lat"], new and new["location"]["lat"]) for vid, old, new in changes] == [
+        ("a", 34.10, 34.50), ("b", 34.20, None),
+    ]
+
+def test_workers_with_the_same_data_agree_on_version_and_cursors():
+    from services.pagination import next_cursor, resume_after
+    from services.venue_replica import VenueReplica
+
+    def change(kind, doc):
+        return SimpleNamespace(type=SimpleNamespace(name=kind), document=doc)
+
+    docs = [_doc(f"v{i}", 34.10 + i * 1e-3, -118.34, update_time=f"t{i}") for i in range(6)]
+    moved = _doc("v1", 34.30, -118.34, update_time="t9")
+
+    # worker A loaded early and heard the edit and the delete as changes
+    a = VenueReplica(VenueIndex(), collection=None)
+    a._on_snapshot(docs, [], "read-time-a")
+    a._on_snapshot([], [change("MODIFIED", moved)], "read-time-a2")
+    a._on_snapshot([], [change("REMOVED", docs[5])], "read-time-a3")
+    # worker B started later and loaded the same data in one go
+    b = VenueReplica(VenueIndex(), collection=None)
+    b._on_snapshot([docs[0], moved, *docs[2:5]], [], "read-time-b")
+
+    assert a.index.version == b.index.version != 0
+    page = a.index.top_k(34.10, -118.34, 2)
+    token = next_cursor(page, 2, a.index.version)
+    after = resume_after(token, b.index.version)
+    assert _ids(b.index.top_k(34.10, -118.34, 2, after=after)) == ["v3", "v4"]